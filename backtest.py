@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Vectorized backtester for the slippage-tolerance heuristics.
+
+Replays pool-reserve history recorded by pool_history.py and evaluates the
+tolerance rules used by `RonProxy.add_stake`/`remove_stake`, plus parameter
+grids, across many trade sizes and netuids at once. Runs fully offline.
+
+For every sampled block the trade is quoted against that block's reserves,
+the rule picks a tolerance and limit price, and the order executes against
+the reserves `latency` blocks later with `allow_partial=False`: it fills only
+if the pool price after the swap stays within the limit.
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+from pool_history import load_history
+from pool_state import DEFAULT_FEE_RATE, U16_MAX, buy_alpha, sell_alpha
+
+# Multipliers currently hardcoded in RonProxy
+ADD_MULTIPLIER = 1.7
+REMOVE_MULTIPLIER = 3
+ALL_MULTIPLIER = 5
+
+
+@dataclass(frozen=True)
+class Setting:
+    side: str
+    tolerance: float
+    multiplier: float
+    latency: int
+    always: bool = False
+
+    def label(self) -> str:
+        rule = 'all' if self.always else 'bump'
+        return f"{self.side} tol={self.tolerance:g} {rule}x{self.multiplier:g} lat={self.latency}"
+
+    def is_live(self) -> bool:
+        """Whether this is the rule RonProxy applies today."""
+        if self.always:
+            return self.side == 'add' and self.multiplier == ALL_MULTIPLIER
+        live = ADD_MULTIPLIER if self.side == 'add' else REMOVE_MULTIPLIER
+        return self.multiplier == live
+
+
+def add_tolerance(tao_in, alpha_in, price, size, setting: Setting, fee: float) -> np.ndarray:
+    """
+    Tolerance chosen by the add_stake rule.
+
+    Base slippage is the percentage `_calculate_slippage_add` reports: ideal
+    alpha at spot price versus alpha received after fee and curve.
+    """
+    received, _ = buy_alpha(tao_in, alpha_in, size, fee)
+    ideal = size / price
+    slippage_pct = 100 * (ideal - received) / ideal
+    bumped = slippage_pct / 100 * setting.multiplier
+    if setting.always:
+        return bumped
+    return np.where(setting.tolerance * 100 < slippage_pct, bumped, setting.tolerance)
+
+
+def remove_tolerance(tao_in, alpha, setting: Setting) -> np.ndarray:
+    """
+    Tolerance chosen by the remove_stake rule.
+
+    remove_stake overrides the slippage with `amount / (tao_in + amount)`
+    (a fraction, compared against `tolerance * 100`); this reproduces that as is.
+    """
+    slippage = alpha / (tao_in + alpha)
+    bumped = slippage / 100 * setting.multiplier
+    if setting.always:
+        return bumped
+    return np.where(setting.tolerance * 100 < slippage, bumped, setting.tolerance)
+
+
+def evaluate(tao, alpha, price, sizes, setting: Setting, fee: float, stride: int, chunk: int) -> dict:
+    """
+    Evaluate one setting over the whole history.
+
+    Args:
+        tao: TAO reserves, shape (blocks, netuids), in TAO
+        alpha: Alpha reserves, shape (blocks, netuids), in alpha
+        price: Spot prices, shape (blocks, netuids)
+        sizes: Trade sizes in TAO notional
+        setting: Rule parameters
+        fee: Swap fee as a fraction of the input
+        stride: Evaluate every `stride`-th block
+        chunk: Blocks per vectorized chunk
+
+    Returns:
+        dict of per-(netuid, size) arrays: trades, fills, realized slippage sum, tolerance sum
+    """
+    n_netuids = tao.shape[1]
+    size = np.asarray(sizes, dtype=np.float64)[None, None, :]
+    shape = (n_netuids, size.shape[2])
+    totals = {
+        'trades': np.zeros(shape),
+        'fills': np.zeros(shape),
+        'slippage': np.zeros(shape),
+        'tolerance': np.zeros(shape),
+    }
+    quote_blocks = np.arange(0, tao.shape[0] - setting.latency, stride)
+
+    for start in range(0, len(quote_blocks), chunk):
+        q = quote_blocks[start:start + chunk]
+        e = q + setting.latency
+        tao_q, alpha_q, price_q = tao[q][..., None], alpha[q][..., None], price[q][..., None]
+        tao_e, alpha_e = tao[e][..., None], alpha[e][..., None]
+        valid = (tao_q > 0) & (alpha_q > 0) & (tao_e > 0) & (alpha_e > 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if setting.side == 'add':
+                tolerance = add_tolerance(tao_q, alpha_q, price_q, size, setting, fee)
+                limit = price_q * (1 + tolerance)
+                received, post_price = buy_alpha(tao_e, alpha_e, size, fee)
+                filled = valid & (post_price <= limit)
+                slippage = size / received / price_q - 1
+            else:
+                sold = size / price_q
+                tolerance = remove_tolerance(tao_q, sold, setting)
+                limit = price_q * (1 - tolerance)
+                received, post_price = sell_alpha(tao_e, alpha_e, sold, fee)
+                filled = valid & (post_price >= limit)
+                slippage = 1 - received / sold / price_q
+
+        valid = np.broadcast_to(valid, filled.shape)
+        totals['trades'] += valid.sum(axis=0)
+        totals['fills'] += filled.sum(axis=0)
+        totals['slippage'] += np.where(filled, slippage, 0).sum(axis=0)
+        totals['tolerance'] += np.where(valid, tolerance, 0).sum(axis=0)
+    return totals
+
+
+def build_grid(args: argparse.Namespace) -> list[Setting]:
+    grid = []
+    for side in args.sides:
+        multipliers = args.multipliers or [ADD_MULTIPLIER if side == 'add' else REMOVE_MULTIPLIER]
+        for tolerance in args.tols:
+            for latency in args.latency:
+                for multiplier in multipliers:
+                    grid.append(Setting(side, tolerance, multiplier, latency))
+                if side == 'add' and args.include_all:
+                    grid.append(Setting(side, tolerance, ALL_MULTIPLIER, latency, always=True))
+    return grid
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Backtest slippage-tolerance rules against recorded pool history",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--data', type=str, default='data/pools', help='Directory written by pool_history.py')
+    parser.add_argument('--netuids', type=int, nargs='*', help='Subnet IDs to evaluate (default: all recorded)')
+    parser.add_argument('--sides', type=str, nargs='+', default=['add', 'remove'], choices=['add', 'remove'],
+                        help='Trade directions to evaluate')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[10, 50, 100, 500, 1000],
+                        help='Trade sizes in TAO notional')
+    parser.add_argument('--tols', type=float, nargs='+', default=[0.005], help='User tolerances (--tol)')
+    parser.add_argument('--multipliers', type=float, nargs='*',
+                        help='Tolerance multipliers to try (default: the live rule per side)')
+    parser.add_argument('--latency', type=int, nargs='+', default=[1], help='Inclusion latency in blocks')
+    parser.add_argument('--include-all', action='store_true', help='Also evaluate the --all rule for add')
+    parser.add_argument('--fee-rate', type=int, default=DEFAULT_FEE_RATE, help='Swap fee in parts of u16::MAX')
+    parser.add_argument('--stride', type=int, default=1, help='Evaluate every n-th block')
+    parser.add_argument('--chunk', type=int, default=20000, help='Blocks per vectorized chunk')
+    parser.add_argument('--by', type=str, choices=['none', 'size', 'netuid'], default='none',
+                        help='Break results down by trade size or netuid')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    parser = create_parser()
+    args = parser.parse_args()
+
+    history = load_history(args.data)
+    recorded = np.unique(history['netuid'])
+    if len(recorded) == 0:
+        print(f"Error: No history in {args.data}")
+        sys.exit(1)
+    rows = len(history['netuid']) - len(history['netuid']) % len(recorded)
+
+    def matrix(column: str) -> np.ndarray:
+        return np.asarray(history[column][:rows]).reshape(-1, len(recorded))
+
+    columns = np.arange(len(recorded))
+    if args.netuids:
+        missing = set(args.netuids) - set(recorded.tolist())
+        if missing:
+            print(f"Error: Netuids {sorted(missing)} are not recorded in {args.data}")
+            sys.exit(1)
+        columns = np.searchsorted(recorded, args.netuids)
+    netuids = recorded[columns]
+
+    tao = matrix('tao_in')[:, columns] / 1e9
+    alpha = matrix('alpha_in')[:, columns] / 1e9
+    price = matrix('price')[:, columns]
+    blocks = matrix('block')[:, 0]
+    fee = args.fee_rate / U16_MAX
+    print(f"Blocks {blocks[0]}..{blocks[-1]} ({len(blocks)}), netuids {netuids.tolist()}, sizes {args.sizes}")
+    print("")
+
+    header = f"{'':2}{'setting':<40}{'group':>12}{'trades':>10}{'fill %':>9}{'slip bps':>10}{'tol bps':>9}"
+    print(header)
+    print("-" * len(header))
+    for setting in build_grid(args):
+        totals = evaluate(tao, alpha, price, args.sizes, setting, fee, args.stride, args.chunk)
+        if args.by == 'size':
+            groups = [(f"{s:g} TAO", (slice(None), i)) for i, s in enumerate(args.sizes)]
+        elif args.by == 'netuid':
+            groups = [(f"netuid {n}", (i, slice(None))) for i, n in enumerate(netuids)]
+        else:
+            groups = [('all', (slice(None), slice(None)))]
+        marker = '* ' if setting.is_live() else '  '
+        for group, index in groups:
+            trades = totals['trades'][index].sum()
+            fills = totals['fills'][index].sum()
+            fill_rate = 100 * fills / trades if trades else 0
+            slippage = 1e4 * totals['slippage'][index].sum() / fills if fills else float('nan')
+            tolerance = 1e4 * totals['tolerance'][index].sum() / trades if trades else float('nan')
+            print(f"{marker}{setting.label():<40}{group:>12}{int(trades):>10}{fill_rate:>9.2f}"
+                  f"{slippage:>10.1f}{tolerance:>9.1f}")
+    print("")
+    print("* = rule currently used by RonProxy")
+
+
+if __name__ == "__main__":
+    main()
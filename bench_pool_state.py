@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark PoolState against subtensor.all_subnets().
+
+Measures fetch time, retained memory and per-netuid quote throughput for the
+DynamicInfo object list and the array-backed pool table.
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+import bittensor as bt
+from bittensor.utils.balance import Balance
+from substrateinterface import SubstrateInterface
+from modules import RPC_ENDPOINTS
+from pool_state import PoolState
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pool-state table against the DynamicInfo list",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--network', type=str, default='finney', help='Network name (test/finney)')
+    parser.add_argument('--rounds', type=int, default=3, help='Number of fetch rounds')
+    parser.add_argument('--quotes', type=int, default=100000, help='Number of quotes for the throughput test')
+    return parser
+
+
+def measure(fetch) -> tuple[object, float, int]:
+    """
+    Run `fetch` once and return (result, seconds, retained bytes).
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fetch()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained
+
+
+def quote_throughput(lookup, netuids: list[int], quotes: int) -> float:
+    """
+    Quotes per second for tao->alpha swaps on random netuids.
+    """
+    amount = Balance.from_tao(10)
+    picks = [random.choice(netuids) for _ in range(quotes)]
+    start = time.perf_counter()
+    for netuid in picks:
+        lookup(netuid).tao_to_alpha_with_slippage(amount)
+    return quotes / (time.perf_counter() - start)
+
+
+def main():
+    """Main entry point."""
+    parser = create_parser()
+    args = parser.parse_args()
+
+    if args.network not in RPC_ENDPOINTS:
+        print(f"Error: Invalid network '{args.network}'")
+        sys.exit(1)
+
+    subtensor = bt.subtensor(network=args.network)
+    substrate = SubstrateInterface(
+        url=RPC_ENDPOINTS[args.network],
+        ss58_format=42,
+        type_registry_preset='substrate-node-template',
+    )
+
+    for round_no in range(1, args.rounds + 1):
+        subnets, list_time, list_bytes = measure(subtensor.all_subnets)
+        pools, table_time, table_bytes = measure(lambda: PoolState.from_substrate(substrate))
+        print(f"Round {round_no}:")
+        print(f"  all_subnets(): {len(subnets)} subnets, {list_time*1000:.1f} ms, {list_bytes/1024:.1f} KiB retained")
+        print(f"  PoolState:     {len(pools)} subnets, {table_time*1000:.1f} ms, {table_bytes/1024:.1f} KiB retained "
+              f"({pools.nbytes} bytes of arrays)")
+
+    netuids = [int(n) for n in pools.netuid]
+    by_netuid = {info.netuid: info for info in subnets}
+    list_qps = quote_throughput(by_netuid.__getitem__, netuids, args.quotes)
+    table_qps = quote_throughput(pools.__getitem__, netuids, args.quotes)
+    print(f"Quote throughput:")
+    print(f"  DynamicInfo: {list_qps:,.0f} quotes/s")
+    print(f"  PoolView:    {table_qps:,.0f} quotes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Streaming non-interactive order executor.
+
+Orders arrive as JSON lines (from a file or stdin), one per line:
+
+    {"id": "a1", "side": "add", "netuid": 5, "hotkey": "5...", "amount": 1.0, "tolerance": 0.01}
+    {"id": "r1", "side": "remove", "netuid": 5, "hotkey": "5...", "all": true}
+    {"id": "s1", "side": "swap", "netuid": 5, "dest_netuid": 7, "hotkey": "5...", "amount": 10}
+
+`amount` is TAO for add and alpha for remove/swap. Each order is checked
+against an `OrderPolicy` when it is read, so nothing prompts. Orders read
+during a block share one pool snapshot and one stake read. They are
+released through the `RateLimitScheduler`, which broadcasts them with
+consecutive nonces and settles them on later blocks. One JSON result line
+is written per order as soon as it resolves.
+"""
+
+import contextlib
+import json
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+from bittensor.utils.balance import Balance
+from modules import RonProxy, stake_events
+from pool_state import buy_alpha, sell_alpha, quote_swap
+from rate_limits import RateLimitScheduler, staking_slots
+
+SIDES = ('add', 'remove', 'swap')
+DEFAULT_TOLERANCE = 0.005
+# Blocks in a row an order may wait on failed snapshot reads before it is rejected
+MAX_SNAPSHOT_RETRIES = 3
+
+
+@dataclass
+class OrderPolicy:
+    max_tao: float = 10.0
+    max_total_tao: float = 100.0
+    max_tolerance: float = 0.05
+    default_tolerance: float = DEFAULT_TOLERANCE
+    netuids: list[int] | None = None
+    hotkeys: list[str] | None = None
+    allow_partial: bool = False
+
+    @classmethod
+    def load(cls, path: str) -> "OrderPolicy":
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def check(self, order: dict) -> str | None:
+        """Static checks done as soon as the order is read. Returns the rejection reason or None."""
+        side = order.get('side')
+        if side not in SIDES:
+            return f"side must be one of {', '.join(SIDES)}"
+        if not isinstance(order.get('netuid'), int) or not order.get('hotkey'):
+            return "netuid and hotkey are required"
+        if side == 'swap' and not isinstance(order.get('dest_netuid'), int):
+            return "dest_netuid is required for swaps"
+        if order.get('all'):
+            if side == 'add':
+                return "all is only valid for remove/swap"
+        elif not isinstance(order.get('amount'), (int, float)) or order['amount'] <= 0:
+            return "amount must be positive"
+        tolerance = order.get('tolerance', self.default_tolerance)
+        if not isinstance(tolerance, (int, float)) or not 0 <= tolerance <= self.max_tolerance:
+            return f"tolerance {tolerance} is outside [0, {self.max_tolerance}]"
+        netuids = [order['netuid']] + ([order['dest_netuid']] if side == 'swap' else [])
+        if self.netuids is not None and any(netuid not in self.netuids for netuid in netuids):
+            return "netuid not allowed by policy"
+        if self.hotkeys is not None and order['hotkey'] not in self.hotkeys:
+            return "hotkey not allowed by policy"
+        return None
+
+
+@dataclass
+class OrderState:
+    order: dict
+    status: str = 'queued'
+    error: object = None
+    block: int | None = None
+    extrinsic: str | None = None
+    expected: int = 0
+    amount: int = 0
+    notional: float = 0.0
+    quoted_at: float = 0.0
+    quoted_price: float | None = None
+    limit_price: float | None = None
+    events: list = field(default_factory=list)
+    op: object = field(default=None, repr=False)
+
+    def result(self) -> dict:
+        return {
+            'id': self.order.get('id'),
+            'status': self.status,
+            'error': self.error if self.error is None or isinstance(self.error, (str, dict)) else str(self.error),
+            'block': self.block,
+            'extrinsic': self.extrinsic,
+            'expected': self.expected,
+            'events': self.events,
+        }
+
+
+class OrderExecutor:
+    def __init__(self, ron_proxy: RonProxy, policy: OrderPolicy, out=None):
+        """
+        Initialize the OrderExecutor object.
+
+        Args:
+            ron_proxy: Non-interactive RonProxy the orders are submitted through
+            policy: Limits every order is validated against
+            out: Stream the JSON result lines are written to (default stdout)
+        """
+        self.ron_proxy = ron_proxy
+        self.policy = policy
+        self.out = out or sys.stdout
+        self.scheduler = RateLimitScheduler(ron_proxy)
+        self.inbox: queue.Queue = queue.Queue()
+        self.eof = threading.Event()
+        self.active: list[OrderState] = []
+        # Orders whose snapshot read failed, priced first on the next block
+        self.retry: list[OrderState] = []
+        self.snapshot_failures = 0
+        self.total_tao = 0.0
+        self.results = {'done': 0, 'failed': 0, 'rejected': 0, 'dropped': 0}
+        self._out_lock = threading.Lock()
+
+    def emit(self, state: OrderState) -> None:
+        # Rejections are emitted from the reader thread, everything else from the block handler
+        with self._out_lock:
+            self.results[state.status] = self.results.get(state.status, 0) + 1
+            self.out.write(json.dumps(state.result()) + '\n')
+            self.out.flush()
+
+    def read(self, stream) -> None:
+        """Parse and statically validate orders from `stream` into the inbox."""
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                order = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.emit(OrderState(order={'raw': line}, status='rejected', error=f"invalid JSON: {e}"))
+                continue
+            state = OrderState(order=order)
+            state.error = self.policy.check(order) if isinstance(order, dict) else "order must be an object"
+            if state.error is not None:
+                state.status = 'rejected'
+                self.emit(state)
+                continue
+            self.inbox.put(state)
+        self.eof.set()
+
+    def _intake(self, number: int) -> None:
+        """Price every order that arrived since the last block against one snapshot and schedule it."""
+        states, self.retry = self.retry, []
+        while True:
+            try:
+                states.append(self.inbox.get_nowait())
+            except queue.Empty:
+                break
+        if not states:
+            return
+
+        try:
+            block_hash = self.ron_proxy.block_hash_at(number)
+            quoted_at = time.time()
+            pools = self.ron_proxy.load_pool_state(block_hash)
+            stakes = {}
+            if any(state.order.get('all') for state in states):
+                for stake_info in self.ron_proxy.subtensor.get_stake_info_for_coldkey(
+                    coldkey_ss58=self.ron_proxy.delegator,
+                ):
+                    stakes[(stake_info.hotkey_ss58, stake_info.netuid)] = stake_info.stake.rao
+        except Exception as e:
+            self.snapshot_failures += 1
+            print(f"Error: snapshot at block {number}: {e}", file=sys.stderr)
+            if self.snapshot_failures < MAX_SNAPSHOT_RETRIES:
+                self.retry = states
+                return
+            for state in states:
+                state.status, state.error = 'rejected', f"snapshot read failed: {e}"
+                self.emit(state)
+            self.snapshot_failures = 0
+            return
+        self.snapshot_failures = 0
+
+        for state in states:
+            state.quoted_at = quoted_at
+            try:
+                call = self._compose(state, pools, stakes)
+            except Exception as e:
+                state.status, state.error = 'rejected', str(e)
+            if state.status == 'rejected':
+                self.emit(state)
+                continue
+            order = state.order
+            netuids = [order['netuid']] + ([order['dest_netuid']] if order['side'] == 'swap' else [])
+            state.op = self.scheduler.schedule(
+                call,
+                staking_slots(self.ron_proxy.delegator, order['hotkey'], *netuids),
+                label=f"order {order.get('id')}",
+            )
+            self.total_tao += state.notional
+            self.active.append(state)
+
+    def _compose(self, state: OrderState, pools, stakes: dict):
+        """Limit-protected call for an order; sets status 'rejected' when a value check fails."""
+        order = state.order
+        side, netuid, hotkey = order['side'], order['netuid'], order['hotkey']
+        tolerance = order.get('tolerance', self.policy.default_tolerance)
+        allow_partial = order.get('allow_partial', self.policy.allow_partial)
+        pool = self.ron_proxy.quote_pool(pools, netuid)
+
+        if side == 'add':
+            amount = Balance.from_tao(order['amount'])
+        elif order.get('all'):
+            amount = Balance.from_rao(stakes.get((hotkey, netuid), 0), netuid=netuid)
+        else:
+            amount = Balance.from_tao(order['amount'], netuid=netuid)
+        if amount.rao <= 0:
+            state.status, state.error = 'rejected', "nothing to trade"
+            return None
+
+        state.notional = amount.tao if side == 'add' else amount.tao * pool.price_float
+        if state.notional > self.policy.max_tao:
+            state.status, state.error = 'rejected', f"{state.notional:.4f} TAO exceeds max_tao {self.policy.max_tao}"
+            return None
+        if self.total_tao + state.notional > self.policy.max_total_tao:
+            state.status, state.error = 'rejected', f"would exceed max_total_tao {self.policy.max_total_tao}"
+            return None
+
+        state.amount = amount.rao
+        state.quoted_price = pool.price_float
+        if side == 'add':
+            alpha, post_price = buy_alpha(pool.tao_in_rao, pool.alpha_in_rao, amount.rao, pool.fee)
+            state.expected = int(alpha)
+            state.limit_price = float(post_price) * (1 + tolerance) * 1e9 if pool.is_dynamic else pool.price_float * 1e9
+            return self.ron_proxy.compose_add_stake_limit(netuid, hotkey, amount, state.limit_price, allow_partial)
+        if side == 'remove':
+            tao, post_price = sell_alpha(pool.tao_in_rao, pool.alpha_in_rao, amount.rao, pool.fee)
+            state.expected = int(tao)
+            state.limit_price = float(post_price) * (1 - tolerance) * 1e9 if pool.is_dynamic else pool.price_float * 1e9
+            return self.ron_proxy.compose_remove_stake_limit(netuid, hotkey, amount, state.limit_price, allow_partial)
+        dest = self.ron_proxy.quote_pool(pools, order['dest_netuid'])
+        _, alpha_out, post_ratio = quote_swap(pool, dest, amount.rao)
+        state.expected = int(alpha_out)
+        state.quoted_price = pool.price_float / dest.price_float
+        state.limit_price = post_ratio * (1 - tolerance) * 1e9
+        return self.ron_proxy.compose_swap_stake_limit(
+            hotkey, netuid, order['dest_netuid'], amount, state.limit_price, allow_partial,
+        )
+
+    def _resolve(self) -> None:
+        still_active = []
+        for state in self.active:
+            op = state.op
+            state.block, state.extrinsic = op.block, op.extrinsic
+            if op.status in ('queued', 'submitted'):
+                still_active.append(state)
+                continue
+            state.status = op.status
+            state.error = op.error
+            if op.receipt is not None:
+                state.events = stake_events(op.receipt, 'StakeAdded') + stake_events(op.receipt, 'StakeRemoved')
+            if state.status != 'done':
+                # Budget is only spent by orders that executed
+                self.total_tao -= state.notional
+            order = state.order
+            self.ron_proxy._record(
+                f"{order['side']}_stake", order['netuid'], order['hotkey'], state.amount, op.receipt, op.error,
+                quoted_price=state.quoted_price, tolerance=order.get('tolerance', self.policy.default_tolerance),
+                limit_price=state.limit_price, dest_netuid=order.get('dest_netuid'), ts=state.quoted_at,
+                submitted_at=op.submitted_at, included_at=time.time() if op.receipt is not None else None,
+            )
+            self.emit(state)
+        self.active = still_active
+
+    def on_block(self, number: int) -> None:
+        self._intake(number)
+        self.scheduler.on_block(number)
+        self._resolve()
+
+    def done(self) -> bool:
+        return self.eof.is_set() and self.inbox.empty() and not self.retry and not self.active
+
+    def run(self, stream) -> dict:
+        """
+        Execute orders from `stream` until it ends and every order has resolved.
+
+        Returns:
+            count of orders per final status
+        """
+        reader = threading.Thread(target=self.read, args=(stream,), daemon=True)
+        reader.start()
+        substrate = self.ron_proxy.substrate
+        self.scheduler.nonce = substrate.get_account_nonce(self.ron_proxy.proxy_wallet.coldkey.ss58_address)
+
+        def handler(header, update_nr, subscription_id):
+            # Progress output goes to stderr so stdout carries only result lines
+            with contextlib.redirect_stdout(sys.stderr):
+                self.on_block(header['header']['number'])
+            if self.done():
+                return True
+
+        reader.join(timeout=0.1)
+        if not self.done():
+            substrate.subscribe_block_headers(handler)
+        return self.results
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Proxy script for blockchain staking operations.
+"""
+
+import argparse
+import sys
+from modules import RonProxy, MAX_BATCH_CALLS
+
+DELEGATOR = {
+    'jjcom': '5CF3fFYemt9A4DfdPGQiE8rqMYEeG3ioL3dQHkbX97MqmNBE',
+    'atel': '5CHLb1prLQ4MjA6bYbpPfx1gzvaGpeSfXkk84sMDcNXRQDPd',
+}
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Unstake every position of the delegator across all subnets",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    # exit-all command
+    parser.add_argument('--coldkey', type=str, required=True, default='jjcom', help='Name of the wallet')
+    parser.add_argument('--tol', type=float, default=0.05, help='tolerance limit to be used')
+    parser.add_argument('--batch-size', type=int, default=MAX_BATCH_CALLS, help='Calls per batch extrinsic')
+    parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+
+    return parser
+
+def main():
+    """Main entry point."""
+    network = 'finney'
+    # Create parser
+    parser = create_parser()
+    # Parse arguments
+    if len(sys.argv) == 1:
+        parser.print_help()
+        sys.exit(1)
+
+    args = parser.parse_args()
+    if args.coldkey != 'jjcom' and args.coldkey != 'atel':
+        sys.exit(1)
+    proxy_wallet = args.coldkey
+    delegator = DELEGATOR[proxy_wallet]
+
+    # Initialize RonProxy object
+    ron_proxy = RonProxy(
+        proxy_wallet=proxy_wallet,
+        network=network,
+        delegator=delegator,
+    )
+    print(f"Initialized RonProxy object for {network} network")
+
+    try:
+        ron_proxy.exit_all(
+            tolerance=args.tol,
+            batch_size=args.batch_size,
+            confirm=not args.yes,
+        )
+
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Append-only local trade journal.
+
+Every staking, swap and registration operation submitted through RonProxy is
+recorded in an SQLite database in WAL mode, so writers never block readers.
+Entries are indexed by time, by netuid and time, and by delegator and time.
+`history` range queries are answered through these indexes, so they stay
+fast over hundreds of thousands of rows.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+JOURNAL_PATH = 'data/journal.db'
+
+COLUMNS = (
+    ('ts', 'REAL NOT NULL'),            # unix time the operation was quoted
+    ('op', 'TEXT NOT NULL'),            # add_stake, remove_stake, swap_stake, register, ...
+    ('delegator', 'TEXT NOT NULL'),
+    ('netuid', 'INTEGER'),
+    ('dest_netuid', 'INTEGER'),
+    ('hotkey', 'TEXT'),
+    ('amount', 'INTEGER'),              # rao of the input (TAO for add/register, alpha otherwise)
+    ('quoted_price', 'REAL'),           # TAO per alpha before the trade (ratio for swaps)
+    ('realized_price', 'REAL'),
+    ('slippage', 'REAL'),               # adverse move of realized vs quoted, as a fraction
+    ('fee', 'INTEGER'),                 # rao
+    ('tolerance', 'REAL'),
+    ('limit_price', 'INTEGER'),
+    ('status', 'TEXT NOT NULL'),        # done, failed, dropped
+    ('error', 'TEXT'),
+    ('extrinsic', 'TEXT'),
+    ('block', 'INTEGER'),
+    ('submitted_at', 'REAL'),
+    ('included_at', 'REAL'),
+)
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY,
+    {', '.join(f'{name} {kind}' for name, kind in COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS journal_ts ON journal (ts);
+CREATE INDEX IF NOT EXISTS journal_netuid_ts ON journal (netuid, ts);
+CREATE INDEX IF NOT EXISTS journal_delegator_ts ON journal (delegator, ts);
+"""
+
+
+class Journal:
+    def __init__(self, path: str = JOURNAL_PATH):
+        """
+        Initialize the Journal object.
+
+        Args:
+            path: SQLite database file, created with its indexes if missing
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        # WAL with NORMAL sync is durable across process crashes and skips an fsync per commit
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def record(self, **entry) -> int:
+        """
+        Append one entry. Unknown keys are rejected; missing ones are stored as NULL.
+
+        Returns:
+            Row id of the entry
+        """
+        unknown = set(entry) - set(COLUMN_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown journal fields: {', '.join(sorted(unknown))}")
+        entry.setdefault('ts', time.time())
+        names = list(entry)
+        with self.conn:
+            cursor = self.conn.execute(
+                f"INSERT INTO journal ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                [entry[name] for name in names],
+            )
+        return cursor.lastrowid
+
+    def query(self, start: float = None, end: float = None, netuid: int = None, delegator: str = None,
+              hotkey: str = None, op: str = None, limit: int = None) -> list[dict]:
+        """
+        Entries in [start, end) matching the filters, newest first.
+        """
+        where, params = self._where(start, end, netuid, delegator, hotkey, op)
+        sql = f"SELECT id, {', '.join(COLUMN_NAMES)} FROM journal{where} ORDER BY ts DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        cursor = self.conn.execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def summary(self, start: float = None, end: float = None, netuid: int = None, delegator: str = None,
+                hotkey: str = None, op: str = None) -> list[dict]:
+        """
+        Per (op, netuid) counts, volume, fees and mean slippage over the matching entries.
+        """
+        where, params = self._where(start, end, netuid, delegator, hotkey, op)
+        cursor = self.conn.execute(
+            f"SELECT op, netuid, COUNT(*), SUM(status = 'done'), SUM(amount), SUM(fee), AVG(slippage) "
+            f"FROM journal{where} GROUP BY op, netuid ORDER BY op, netuid",
+            params,
+        )
+        names = ('op', 'netuid', 'count', 'done', 'amount', 'fee', 'slippage')
+        return [dict(zip(names, row)) for row in cursor]
+
+    @staticmethod
+    def _where(start, end, netuid, delegator, hotkey, op) -> tuple[str, list]:
+        clauses, params = [], []
+        for clause, value in (
+            ('ts >= ?', start), ('ts < ?', end), ('netuid = ?', netuid),
+            ('delegator = ?', delegator), ('hotkey = ?', hotkey), ('op = ?', op),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def parse_time(value: str) -> float:
+    """Unix seconds, or an ISO date/datetime."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Query the local trade journal",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+    history_parser = subparsers.add_parser('history', help='List or summarize journal entries')
+    history_parser.add_argument('--db', type=str, default=JOURNAL_PATH, help='Journal database')
+    history_parser.add_argument('--since', type=parse_time, help='Start (ISO date or unix time)')
+    history_parser.add_argument('--until', type=parse_time, help='End, exclusive (ISO date or unix time)')
+    history_parser.add_argument('--netuid', type=int, help='Network/subnet ID')
+    history_parser.add_argument('--delegator', type=str, help='Delegator address')
+    history_parser.add_argument('--hotkey', type=str, help='Hotkey address')
+    history_parser.add_argument('--op', type=str, help='Operation (add_stake, remove_stake, swap_stake, register)')
+    history_parser.add_argument('--limit', type=int, default=50, help='Maximum entries to list (0 for all)')
+    history_parser.add_argument('--summary', action='store_true', help='Aggregate per operation and netuid')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    parser = create_parser()
+    args = parser.parse_args()
+    if args.command != 'history':
+        parser.print_help()
+        sys.exit(1)
+    if not os.path.exists(args.db):
+        print(f"Error: No journal at {args.db}")
+        sys.exit(1)
+
+    journal = Journal(args.db)
+    filters = dict(start=args.since, end=args.until, netuid=args.netuid, delegator=args.delegator,
+                   hotkey=args.hotkey, op=args.op)
+    if args.summary:
+        print(f"{'op':<14}{'netuid':>8}{'count':>8}{'done':>8}{'amount':>18}{'fee':>14}{'slippage %':>12}")
+        for row in journal.summary(**filters):
+            slippage = f"{row['slippage'] * 100:.4f}" if row['slippage'] is not None else '-'
+            print(f"{row['op']:<14}{str(row['netuid']):>8}{row['count']:>8}{row['done'] or 0:>8}"
+                  f"{(row['amount'] or 0) / 1e9:>18.9f}{(row['fee'] or 0) / 1e9:>14.9f}{slippage:>12}")
+        return
+
+    for row in journal.query(**filters, limit=args.limit):
+        when = datetime.fromtimestamp(row['ts']).isoformat(sep=' ', timespec='seconds')
+        amount = f"{row['amount'] / 1e9:.9f}" if row['amount'] is not None else '-'
+        price = f"{row['quoted_price']:.9f} -> {row['realized_price']:.9f}" if row['realized_price'] else '-'
+        slippage = f"{row['slippage'] * 100:.4f} %" if row['slippage'] is not None else '-'
+        latency = f"{row['included_at'] - row['submitted_at']:.1f}s" if row['included_at'] and row['submitted_at'] else '-'
+        print(f"{when} {row['op']:<13} netuid {row['netuid']} {amount} price {price} slippage {slippage} "
+              f"{row['status']} block {row['block']} ({latency}) {row['error'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Load test for RonProxy's submission path.
+
+Starts a mock node (mock_node.py) in its own process, then runs N simulated
+traders that share one proxy key. Together they drive add/remove/swap
+limit calls at a target rate through the same path live trading uses:
+compose, Proxy.proxy wrap, sign, nonce handling and websocket submit.
+Traders are open-loop. Latency is measured from each operation's
+scheduled time, so queueing behind a saturated path is counted.
+
+For each target rate the report shows achieved ops/sec, latency
+percentiles, client CPU per op and error rates by kind. Sweeping --rates
+shows where the design saturates.
+"""
+
+import argparse
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+from bittensor.utils.balance import Balance
+from substrateinterface import SubstrateInterface, Keypair
+
+from journal import Journal
+from mock_node import run_mock_node
+from modules import RonProxy
+from verify_call import latest_metadata_path
+
+OPS = ('add', 'remove', 'swap')
+NETUIDS = list(range(1, 33))
+# Seconds for the mock node to load the metadata snapshot
+STARTUP_TIMEOUT = 120
+
+
+class NonceSource:
+    def __init__(self, mode: str, substrate: SubstrateInterface, address: str):
+        """
+        Initialize the NonceSource object.
+
+        Args:
+            mode: 'chain' reads the nonce for every extrinsic (what RonProxy does by default),
+                  'local' hands out consecutive nonces from one shared counter
+            substrate: Connection used to (re)seed the local counter
+            address: Signing account
+        """
+        self.mode = mode
+        self.substrate = substrate
+        self.address = address
+        self.lock = threading.Lock()
+        self.next = substrate.get_account_nonce(address) if mode == 'local' else None
+
+    def take(self):
+        if self.mode != 'local':
+            return None
+        with self.lock:
+            nonce = self.next
+            self.next += 1
+            return nonce
+
+    def failed(self) -> None:
+        """A submission failed and may have left a gap: reseed from the chain."""
+        if self.mode == 'local':
+            with self.lock:
+                self.next = self.substrate.get_account_nonce(self.address)
+
+
+def error_kind(error: Exception) -> str:
+    text = str(error)
+    for code, kind in (('1014', 'priority_too_low'), ('1010', 'outdated'), ('1002', 'invalid')):
+        if code in text or kind.replace('_', ' ') in text.lower():
+            return kind
+    return type(error).__name__
+
+
+class Trader(threading.Thread):
+    def __init__(self, ron_proxy: RonProxy, nonces: NonceSource, rate: float, start_at: float, duration: float,
+                 seed: int, lock: Optional[threading.Lock] = None):
+        """
+        Initialize the Trader object.
+
+        Args:
+            ron_proxy: RonProxy to submit through
+            nonces: Shared nonce source
+            rate: Operations per second for this trader
+            start_at: perf_counter time of the first operation
+            duration: Seconds to generate load for
+            seed: Random seed for the operation mix
+            lock: Held around every RonProxy use when the connection is shared
+        """
+        super().__init__(daemon=True)
+        self.ron_proxy = ron_proxy
+        self.nonces = nonces
+        self.interval = 1.0 / rate
+        self.start_at = start_at
+        self.duration = duration
+        self.rng = random.Random(seed)
+        self.lock = lock
+        self.latencies: list[float] = []
+        self.errors: dict[str, int] = {}
+        self.attempted = 0
+
+    def _compose(self):
+        op = self.rng.choice(OPS)
+        netuid = self.rng.choice(NETUIDS)
+        hotkey = self.ron_proxy.delegator
+        if op == 'add':
+            return self.ron_proxy.compose_add_stake_limit(netuid, hotkey, Balance.from_tao(1), 10**9)
+        if op == 'remove':
+            return self.ron_proxy.compose_remove_stake_limit(netuid, hotkey, Balance.from_tao(1, netuid=netuid), 10**6)
+        dest = self.rng.choice([n for n in NETUIDS if n != netuid])
+        return self.ron_proxy.compose_swap_stake_limit(hotkey, netuid, dest, Balance.from_tao(1, netuid=netuid), 10**8)
+
+    def _submit(self) -> None:
+        call = self._compose()
+        self.ron_proxy._broadcast_proxy_call(call, self.nonces.take())
+
+    def run(self) -> None:
+        scheduled = self.start_at
+        end = self.start_at + self.duration
+        while scheduled < end:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.attempted += 1
+            try:
+                if self.lock is not None:
+                    with self.lock:
+                        self._submit()
+                else:
+                    self._submit()
+                self.latencies.append(time.perf_counter() - scheduled)
+            except Exception as e:
+                kind = error_kind(e)
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+                self.nonces.failed()
+            scheduled += self.interval
+
+
+def make_ron_proxy(url: str, wallet, delegator: str) -> RonProxy:
+    substrate = SubstrateInterface(url=url, ss58_format=42, type_registry_preset='substrate-node-template')
+    ron_proxy = RonProxy(
+        proxy_wallet='loadtest',
+        network='test',
+        delegator=delegator,
+        interactive=False,
+        journal=Journal(':memory:'),
+        substrate=substrate,
+        wallet=wallet,
+    )
+    # Load and decode the metadata before anything is timed
+    ron_proxy.compose_add_stake_limit(1, delegator, Balance.from_tao(1), 10**9)
+    return ron_proxy
+
+
+def run_level(args, rate: float, url: str, wallet, delegator: str) -> dict:
+    """Run one load level and return its measurements."""
+    per_trader = rate / args.traders
+    if args.connections == 'shared':
+        shared = make_ron_proxy(url, wallet, delegator)
+        proxies = [shared] * args.traders
+        lock = threading.Lock()
+    else:
+        proxies = [make_ron_proxy(url, wallet, delegator) for _ in range(args.traders)]
+        lock = None
+    nonce_substrate = SubstrateInterface(url=url, ss58_format=42, type_registry_preset='substrate-node-template')
+    nonces = NonceSource(args.nonce, nonce_substrate, wallet.coldkey.ss58_address)
+
+    start_at = time.perf_counter() + 0.5
+    traders = [
+        Trader(proxies[i], nonces, per_trader, start_at + i * (1.0 / rate), args.duration, seed=i, lock=lock)
+        for i in range(args.traders)
+    ]
+    cpu_before = time.process_time()
+    for trader in traders:
+        trader.start()
+    for trader in traders:
+        trader.join()
+    elapsed = time.perf_counter() - start_at
+    cpu = time.process_time() - cpu_before
+
+    latencies = np.array([latency for trader in traders for latency in trader.latencies])
+    errors = {}
+    for trader in traders:
+        for kind, count in trader.errors.items():
+            errors[kind] = errors.get(kind, 0) + count
+    attempted = sum(trader.attempted for trader in traders)
+    done = len(latencies)
+    return {
+        'rate': rate,
+        'attempted': attempted,
+        'done': done,
+        'ops_per_sec': done / elapsed if elapsed else 0.0,
+        'p50': float(np.percentile(latencies, 50)) if done else None,
+        'p90': float(np.percentile(latencies, 90)) if done else None,
+        'p99': float(np.percentile(latencies, 99)) if done else None,
+        'max': float(latencies.max()) if done else None,
+        'cpu_ms_per_op': 1000 * cpu / attempted if attempted else None,
+        'error_rate': (attempted - done) / attempted if attempted else 0.0,
+        'errors': errors,
+    }
+
+
+def print_report(results: list[dict]) -> None:
+    def ms(value):
+        return f"{value * 1000:.1f}" if value is not None else '-'
+
+    print("")
+    print(f"{'target/s':>9}{'ops/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'cpu ms/op':>11}{'errors':>9}  by kind")
+    for r in results:
+        cpu = f"{r['cpu_ms_per_op']:.2f}" if r['cpu_ms_per_op'] is not None else '-'
+        kinds = ', '.join(f"{kind} {count}" for kind, count in sorted(r['errors'].items()))
+        print(f"{r['rate']:>9g}{r['ops_per_sec']:>9.1f}{ms(r['p50']):>9}{ms(r['p90']):>9}{ms(r['p99']):>9}"
+              f"{ms(r['max']):>9}{cpu:>11}{r['error_rate'] * 100:>8.1f}%  {kinds}")
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Measure RonProxy submission throughput against a local mock node",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--traders', type=int, default=4, help='Simulated traders sharing the proxy key')
+    parser.add_argument('--rates', type=float, nargs='+', default=[5, 10, 20, 50],
+                        help='Target total ops/sec; each is run in turn')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per load level')
+    parser.add_argument('--nonce', choices=('chain', 'local'), default='chain',
+                        help="'chain': read the nonce per extrinsic (current behaviour); 'local': shared counter")
+    parser.add_argument('--connections', choices=('per-trader', 'shared'), default='per-trader',
+                        help='One websocket per trader, or one shared websocket behind a lock')
+    parser.add_argument('--block-time', type=float, default=12.0, help='Mock node seconds between blocks')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock node seconds added per response')
+    parser.add_argument('--port', type=int, default=9955, help='Mock node port')
+    parser.add_argument('--url', type=str, help='Use an already running mock node instead of starting one')
+    parser.add_argument('--metadata', type=str, help='verify_call.py snapshot (default: latest finney)')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    args = create_parser().parse_args()
+    node = None
+    url = args.url
+    if url is None:
+        metadata = args.metadata or latest_metadata_path('finney')
+        if metadata is None:
+            print("Error: No metadata snapshot; run `verify_call.py fetch` first")
+            sys.exit(1)
+        ready = multiprocessing.Event()
+        node = multiprocessing.Process(
+            target=run_mock_node,
+            args=(metadata, '127.0.0.1', args.port, args.block_time, args.latency, ready),
+            daemon=True,
+        )
+        node.start()
+        if not ready.wait(STARTUP_TIMEOUT):
+            print("Error: Mock node did not start")
+            node.terminate()
+            sys.exit(1)
+        url = f"ws://127.0.0.1:{args.port}"
+
+    wallet_key = Keypair.create_from_uri('//Alice')
+    wallet = SimpleNamespace(coldkey=wallet_key, coldkeypub=wallet_key, hotkey=wallet_key)
+    delegator = Keypair.create_from_uri('//Bob').ss58_address
+    print(f"Load test against {url}: {args.traders} traders, nonce={args.nonce}, connections={args.connections}")
+
+    results = []
+    try:
+        for rate in args.rates:
+            result = run_level(args, rate, url, wallet, delegator)
+            results.append(result)
+            print(f"----{rate:g}/s: {result['done']}/{result['attempted']} submitted, "
+                  f"{result['ops_per_sec']:.1f} ops/s")
+        print_report(results)
+        stats = SubstrateInterface(url=url, ss58_format=42).rpc_request('mock_stats', [])['result']
+        print(f"Mock node: {stats}")
+    except KeyboardInterrupt:
+        print("Stopped.")
+        print_report(results)
+    finally:
+        if node is not None:
+            node.terminate()
+
+
+if __name__ == "__main__":
+    main()
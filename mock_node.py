@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Minimal local Subtensor node for load tests.
+
+Serves the JSON-RPC subset SubstrateInterface needs to compose, sign and
+submit extrinsics: runtime version and metadata (from a verify_call.py
+snapshot), block hashes and headers, account nonces, and
+author_submitExtrinsic. Submitted extrinsics are decoded against the cached
+metadata and checked the way the real transaction pool checks them: stale
+nonces are rejected with 1010 and duplicate (account, nonce) pairs with 1014.
+A block is produced every --block-time seconds and includes the ready
+extrinsics in nonce order. --latency delays every response.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import time
+
+import websockets
+from scalecodec.utils.ss58 import ss58_encode
+
+from verify_call import CallDecoder, latest_metadata_path
+
+MAX_EXTRINSICS_PER_BLOCK = 1000
+GENESIS_PARENT = '0x' + '00' * 32
+
+
+def blake2_256(data: bytes) -> str:
+    return '0x' + hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data: str = None):
+        super().__init__(message)
+        self.payload = {'code': code, 'message': message}
+        if data is not None:
+            self.payload['data'] = data
+
+
+class MockNode:
+    def __init__(self, decoder: CallDecoder, block_time: float = 12.0, latency: float = 0.0,
+                 max_extrinsics: int = MAX_EXTRINSICS_PER_BLOCK):
+        """
+        Initialize the MockNode object.
+
+        Args:
+            decoder: Metadata snapshot the runtime is served and extrinsics decoded from
+            block_time: Seconds between blocks
+            latency: Seconds added before every response
+            max_extrinsics: Extrinsics included per block at most
+        """
+        if decoder.runtime_version is None:
+            raise ValueError("Metadata snapshot has no runtime version; re-run `verify_call.py fetch`")
+        self.decoder = decoder
+        self.block_time = block_time
+        self.latency = latency
+        self.max_extrinsics = max_extrinsics
+        self.blocks = []
+        self.by_hash = {}
+        self.nonces: dict[str, int] = {}
+        self.pool: dict[tuple[str, int], tuple[str, str]] = {}
+        self.stats = {'requests': 0, 'submitted': 0, 'included': 0, 'stale': 0, 'duplicate': 0,
+                      'invalid': 0, 'max_pool': 0}
+        self._produce(extrinsics=[])
+
+    def _produce(self, extrinsics: list[str]) -> None:
+        number = len(self.blocks)
+        parent = self.blocks[-1]['hash'] if self.blocks else GENESIS_PARENT
+        header = {
+            'parentHash': parent,
+            'number': hex(number),
+            'stateRoot': blake2_256(f"state{number}".encode()),
+            'extrinsicsRoot': blake2_256(''.join(extrinsics).encode()),
+            'digest': {'logs': []},
+        }
+        block_hash = blake2_256(json.dumps(header, sort_keys=True).encode())
+        block = {'hash': block_hash, 'header': header, 'extrinsics': extrinsics}
+        self.blocks.append(block)
+        self.by_hash[block_hash] = block
+
+    def produce_block(self) -> None:
+        """Include ready extrinsics: per account, consecutive nonces starting at the account nonce."""
+        included = []
+        for account in sorted({account for account, _ in self.pool}):
+            nonce = self.nonces.get(account, 0)
+            while (account, nonce) in self.pool and len(included) < self.max_extrinsics:
+                _, data = self.pool.pop((account, nonce))
+                included.append(data)
+                nonce += 1
+            self.nonces[account] = nonce
+        self.stats['included'] += len(included)
+        self._produce(included)
+
+    def next_index(self, account: str) -> int:
+        """Like system_accountNextIndex: the chain nonce advanced past the account's ready pool entries."""
+        nonce = self.nonces.get(account, 0)
+        while (account, nonce) in self.pool:
+            nonce += 1
+        return nonce
+
+    def submit(self, data: str) -> str:
+        try:
+            extrinsic = self.decoder.decode_extrinsic(data)
+        except Exception as e:
+            self.stats['invalid'] += 1
+            raise RpcError(1002, f"Verification Error: {e}")
+        account = extrinsic['address']
+        if isinstance(account, dict):
+            account = account.get('Id', next(iter(account.values())))
+        if isinstance(account, str) and account.startswith('0x'):
+            account = ss58_encode(account, 42)
+        nonce = extrinsic['nonce']
+        if nonce < self.nonces.get(account, 0):
+            self.stats['stale'] += 1
+            raise RpcError(1010, "Invalid Transaction", "Transaction is outdated")
+        if (account, nonce) in self.pool:
+            self.stats['duplicate'] += 1
+            raise RpcError(1014, "Priority is too low: (0 vs 0)",
+                           "The transaction has too low priority to replace another transaction already in the pool.")
+        extrinsic_hash = blake2_256(bytes.fromhex(data.removeprefix('0x')))
+        self.pool[(account, nonce)] = (extrinsic_hash, data)
+        self.stats['submitted'] += 1
+        self.stats['max_pool'] = max(self.stats['max_pool'], len(self.pool))
+        return extrinsic_hash
+
+    def _block(self, block_hash=None) -> dict | None:
+        if block_hash is None:
+            return self.blocks[-1]
+        return self.by_hash.get(block_hash)
+
+    def handle(self, method: str, params: list):
+        if method == 'rpc_methods':
+            return {'methods': sorted(self.METHODS)}
+        if method == 'chain_getBlockHash':
+            if not params or params[0] is None:
+                return self.blocks[-1]['hash']
+            number = params[0]
+            return self.blocks[number]['hash'] if number < len(self.blocks) else None
+        if method in ('chain_getHead', 'chain_getFinalizedHead'):
+            return self.blocks[-1]['hash']
+        if method == 'chain_getHeader':
+            block = self._block(params[0] if params else None)
+            return block['header'] if block else None
+        if method == 'chain_getBlock':
+            block = self._block(params[0] if params else None)
+            if block is None:
+                return None
+            return {'block': {'header': block['header'], 'extrinsics': block['extrinsics']}, 'justifications': None}
+        if method in ('state_getRuntimeVersion', 'chain_getRuntimeVersion'):
+            return self.decoder.runtime_version
+        if method == 'state_getMetadata':
+            return self.decoder.metadata_hex
+        if method == 'system_accountNextIndex':
+            return self.next_index(params[0])
+        if method == 'author_submitExtrinsic':
+            return self.submit(params[0])
+        if method == 'author_pendingExtrinsics':
+            return [data for _, data in self.pool.values()]
+        if method == 'system_chain':
+            return f"mock-{self.decoder.network}"
+        if method == 'system_name':
+            return 'mock-subtensor'
+        if method == 'system_version':
+            return '0.0.0'
+        if method == 'system_properties':
+            return {'ss58Format': 42, 'tokenDecimals': 9, 'tokenSymbol': 'TAO'}
+        if method == 'mock_stats':
+            return dict(self.stats, block=len(self.blocks) - 1, pool=len(self.pool))
+        raise RpcError(-32601, f"Method not found: {method}")
+
+    METHODS = {
+        'rpc_methods', 'chain_getBlockHash', 'chain_getHead', 'chain_getFinalizedHead', 'chain_getHeader',
+        'chain_getBlock', 'state_getRuntimeVersion', 'state_getMetadata', 'system_accountNextIndex',
+        'author_submitExtrinsic', 'author_pendingExtrinsics', 'system_chain', 'system_name', 'system_version',
+        'system_properties', 'mock_stats',
+    }
+
+    async def _respond(self, websocket, message: str) -> None:
+        request = json.loads(message)
+        self.stats['requests'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            response['result'] = self.handle(request['method'], request.get('params') or [])
+        except RpcError as e:
+            response['error'] = e.payload
+        await websocket.send(json.dumps(response))
+
+    async def serve_connection(self, websocket, path=None) -> None:
+        tasks = set()
+        async for message in websocket:
+            # Requests on one connection are answered concurrently, like a real node
+            task = asyncio.ensure_future(self._respond(websocket, message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def produce_blocks(self) -> None:
+        next_block = time.monotonic() + self.block_time
+        while True:
+            await asyncio.sleep(max(0.0, next_block - time.monotonic()))
+            next_block += self.block_time
+            self.produce_block()
+
+    async def run(self, host: str, port: int, ready=None) -> None:
+        async with websockets.serve(self.serve_connection, host, port, max_size=None):
+            if ready is not None:
+                ready.set()
+            await self.produce_blocks()
+
+
+def run_mock_node(metadata: str, host: str, port: int, block_time: float, latency: float, ready=None) -> None:
+    """Process entry point: decode the snapshot and serve until killed."""
+    node = MockNode(CallDecoder(metadata), block_time=block_time, latency=latency)
+    asyncio.run(node.run(host, port, ready))
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Serve a minimal mock Subtensor node from a metadata snapshot",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--metadata', type=str, help='verify_call.py snapshot (default: latest for --network)')
+    parser.add_argument('--network', type=str, default='finney', help='Network of the snapshot')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Listen address')
+    parser.add_argument('--port', type=int, default=9944, help='Listen port')
+    parser.add_argument('--block-time', type=float, default=12.0, help='Seconds between blocks')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added before every response')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    args = create_parser().parse_args()
+    metadata = args.metadata or latest_metadata_path(args.network)
+    if metadata is None:
+        print(f"Error: No metadata snapshot for {args.network}; run `verify_call.py fetch` first")
+        sys.exit(1)
+    print(f"Mock node on ws://{args.host}:{args.port} ({metadata}, block time {args.block_time}s)")
+    try:
+        run_mock_node(metadata, args.host, args.port, args.block_time, args.latency)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,33 @@
+import time
 import bittensor as bt
-from substrateinterface import SubstrateInterface
+from substrateinterface import SubstrateInterface, ExtrinsicReceipt
+from substrateinterface.exceptions import SubstrateRequestException
 from typing import Optional, cast
 from bittensor.utils.balance import Balance, FixedPoint, fixed_to_float
 from colorama import Fore, Style, init
+from pool_state import PoolState, PoolView, quote_swap, sell_alpha
+from tolerance_model import VolatilityModel
+from journal import Journal
 init()  # Initialize colorama
 
+BLOCK_TIME = 12
+# Calls per Utility batch; keeps one batch well under the block weight limit
+MAX_BATCH_CALLS = 64
+# Blocks to wait for a broadcast extrinsic before giving up on it
+PENDING_TIMEOUT = 10
+# Seconds after starting a PendingFlow watcher that quotes wait for its first poll
+PENDING_FLOW_WAIT = 5
+
 RPC_ENDPOINTS = {
     'test': 'wss://test.finney.opentensor.ai:443',
     'finney': 'wss://entrypoint-finney.opentensor.ai:443',
 }
 
 class RonProxy:
-    def __init__(self, proxy_wallet: str, network: str, delegator: str, proxy_hotkey: str = None):
+    def __init__(self, proxy_wallet: str, network: str, delegator: str, proxy_hotkey: str = None,
+                 tolerance_model: Optional[VolatilityModel] = None, interactive: bool = True,
+                 journal: Optional[Journal] = None, substrate: Optional[SubstrateInterface] = None,
+                 subtensor=None, wallet=None, pending_flow=None, state_reader=None):
         """
         Initialize the RonProxy object.
         
@@ -19,23 +35,146 @@ class RonProxy:
             proxy_wallet: Proxy wallet address
             network: Network name
             delegator: Delegator address
+            tolerance_model: Adaptive tolerance model replacing the fixed multipliers
+            interactive: Ask before trading; when False every prompt takes its default answer
+            journal: Trade journal operations are recorded in (default: data/journal.db, opened on first record)
+            substrate: Connection to use instead of the network's RPC endpoint
+            subtensor: bt.subtensor to use (default: created on first use)
+            wallet: Object with coldkey/coldkeypub/hotkey keypairs to sign with instead of the named wallet
+            pending_flow: PendingFlow watcher whose pending staking flow is folded into quotes
+            state_reader: StateReader of a local state server, used for best-block pool state instead of RPC
         """
         if network not in RPC_ENDPOINTS:
             raise ValueError(f"Invalid network: {network}")
         
         self.network = network
         self.delegator = delegator
-        if proxy_hotkey:
+        if wallet is not None:
+            self.proxy_wallet = wallet
+        elif proxy_hotkey:
             self.proxy_wallet = bt.wallet(name=proxy_wallet, hotkey=proxy_hotkey)
         else:
             self.proxy_wallet = bt.wallet(name=proxy_wallet)
-        self.subtensor = bt.subtensor(network=network)
-        self.substrate = SubstrateInterface(
+        self._subtensor = subtensor
+        self.substrate = substrate or SubstrateInterface(
             url=RPC_ENDPOINTS[self.network],
             ss58_format=42,
             type_registry_preset='substrate-node-template',
         )
-        
+        self.tolerance_model = tolerance_model
+        self.interactive = interactive
+        self._journal = journal
+        self.pending_flow = pending_flow
+        self.state_reader = state_reader
+        # (pool table, seqlock version) last served from the state server
+        self._shared = None
+
+    @property
+    def subtensor(self):
+        if self._subtensor is None:
+            self._subtensor = bt.subtensor(network=self.network)
+        return self._subtensor
+
+    @property
+    def journal(self) -> Journal:
+        if self._journal is None:
+            self._journal = Journal()
+        return self._journal
+
+    def _confirm(self, prompt: str, default: bool = True) -> bool:
+        """
+        Ask a y/n question, or return `default` without asking in non-interactive mode.
+        """
+        if not self.interactive:
+            return default
+        return input(prompt) == "y"
+
+    def _state_fresh(self) -> bool:
+        """Whether the state server is publishing, mapping its segment again after a server restart."""
+        if self.state_reader is None:
+            return False
+        if self.state_reader.fresh():
+            return True
+        if self.state_reader.reattach():
+            # Nothing writes to the old segment any more, so its snapshots stay intact
+            self._shared = None
+            return True
+        return False
+
+    def best_block(self) -> tuple[int, str]:
+        """Number and hash of the best block, from the state server while it is publishing."""
+        if self._state_fresh():
+            return self.state_reader.block()
+        number = self.substrate.get_block_number(None)
+        return number, self.substrate.get_block_hash(number)
+
+    def block_hash_at(self, number: int) -> str:
+        """Hash of block `number`, without RPC when it is the one the state server last published."""
+        if self._state_fresh():
+            published, block_hash = self.state_reader.block()
+            if published == number:
+                return block_hash
+        return self.substrate.get_block_hash(number)
+
+    def load_pool_state(self, block_hash: str = None) -> PoolState:
+        """
+        Read reserves and fee parameters of every subnet in one snapshot.
+
+        Args:
+            block_hash: Block to read at (None for best block)
+        """
+        if self._state_fresh():
+            # Falls back to RPC when the state server has stopped publishing
+            shared = self.state_reader.latest()
+            if shared is not None and (block_hash is None or shared[0].block_hash == block_hash):
+                self._shared = shared
+                return shared[0]
+        return PoolState.from_substrate(self.substrate, block_hash=block_hash)
+
+    def _intact(self, pools: PoolState) -> bool:
+        """
+        Whether rows copied out of `pools` are consistent: always for an RPC
+        snapshot; for one served from the state server, if the server has not
+        reused its slot since.
+        """
+        return self._shared is None or self._shared[0] is not pools or self.state_reader.valid(self._shared[1])
+
+    def _live_pending_flow(self):
+        """
+        The attached PendingFlow watcher if its flows are current, waiting
+        briefly for the first poll of one just started. None, with a warning,
+        when it has not polled yet or has stopped polling.
+        """
+        if self.pending_flow is None:
+            return None
+        if not self.pending_flow.wait(max(0.0, self.pending_flow.started_at + PENDING_FLOW_WAIT - time.time())):
+            print(f"{Fore.YELLOW}Warning: pending flow not polled yet, quoting without it{Style.RESET_ALL}")
+            return None
+        if not self.pending_flow.fresh():
+            age = time.time() - self.pending_flow.polled_at
+            print(f"{Fore.YELLOW}Warning: pending flow is {age:.0f}s old, quoting without it{Style.RESET_ALL}")
+            return None
+        return self.pending_flow
+
+    def quote_pool(self, pools: PoolState, netuid: int):
+        """
+        Pool `netuid` to quote against: the snapshot, with the pending staking
+        flow folded in when a PendingFlow watcher is attached and has polled
+        recently.
+        """
+        pending_flow = self._live_pending_flow()
+        while True:
+            if pending_flow is None:
+                pool = pools[netuid]
+            else:
+                pool = pending_flow.adjust(pools, netuid)
+                spot = pools[netuid].price_float
+            if self._intact(pools):
+                break
+            pools = self.load_pool_state()
+        if pending_flow is not None and pool.price_float != spot:
+            print(f"----pending flow on netuid {netuid}: price {spot} -> {pool.price_float}")
+        return pool
 
     def _add_stake(self, netuid: int, hotkey: str, amount: Balance) -> None:
         """
@@ -51,10 +190,7 @@ class RonProxy:
         )
         print(f"Current balance: {balance}")
         
-        confirm = input(f"Do you really want to stake {amount}? (y/n)")
-        if confirm == "y":
-            pass
-        else:
+        if not self._confirm(f"Do you really want to stake {amount}? (y/n)"):
             return
         
         call = self.substrate.compose_call(
@@ -165,6 +301,7 @@ class RonProxy:
             hotkey: Hotkey address
             amount: Amount to stake
         """
+        quoted_at = time.time()
         allow_partial_stake = False
         balance = self.subtensor.get_balance(
             address=self.delegator,
@@ -180,12 +317,12 @@ class RonProxy:
             hotkey
         )
         print(f"stake_fee: {stake_fee}")
-        subnet_info = self.subtensor.all_subnets()[netuid]
+        subnet_info = self.quote_pool(self.load_pool_state(), netuid)
         received_amount, slippage_pct, slippage_pct_float, rate = (
             self._calculate_slippage_add(subnet_info, amount, stake_fee)
         )
         
-        pool = self.subtensor.subnet(netuid=netuid)
+        pool = subnet_info
         base_price = pool.price.rao
         
         # Rough calculation until fix
@@ -196,15 +333,17 @@ class RonProxy:
         original_tolerance = 0
         if tolerance * 100 > slippage_pct_float * 5:
             print(f"Too big slippage: {int(tolerance*100/slippage_pct_float)}")
-        if tolerance * 100 < slippage_pct_float:
+        model_tolerance = self._model_tolerance(pool, amount, 'add')
+        if model_tolerance is not None:
+            original_tolerance = tolerance
+            tolerance = model_tolerance
+        elif tolerance * 100 < slippage_pct_float:
             original_tolerance = tolerance
             tolerance = slippage_pct_float / 100 * 1.7
         if all:
-            confirm = input("Don't care slippage? (y/n)")
-            if confirm == "y":
+            # Never widen the tolerance without someone asking for it
+            if self._confirm("Don't care slippage? (y/n)", default=False):
                 tolerance = slippage_pct_float / 100 * 5
-            else:
-                tolerance = tolerance
         
         price_with_tolerance = base_price * (1 + tolerance)
         print(f"----validator to delegate to: {hotkey}")
@@ -225,7 +364,17 @@ class RonProxy:
                 "allow_partial": allow_partial_stake,
             }
         )
-        is_success, error_message = self._do_proxy_call(call)
+        submitted_at = time.time()
+        entry = dict(
+            quoted_price=pool.price_float, tolerance=tolerance, limit_price=price_with_tolerance,
+            ts=quoted_at, submitted_at=submitted_at,
+        )
+        receipt = self._submit_journaled(call, 'add_stake', netuid, hotkey, amount.rao, **entry)
+        error_message = self._proxy_error(receipt)
+        is_success = error_message is None
+        self._record(
+            'add_stake', netuid, hotkey, amount.rao, receipt, error_message, included_at=time.time(), **entry,
+        )
         if is_success:
             new_balance = self.subtensor.get_balance(address=self.delegator)
             if old_balance != new_balance:
@@ -255,17 +404,11 @@ class RonProxy:
         print(f"Current alpha balance: {balance}")
 
         if all:
-            confirm = input("Do you really want to unstake all available balance? (y/n)")
-            if confirm == "y":
-                amount = balance
-            else:
-                return
-        else:
-            confirm = input(f"Do you really want to unstake {amount}? (y/n)")
-            if confirm == "y":
-                pass
-            else:
+            if not self._confirm("Do you really want to unstake all available balance? (y/n)"):
                 return
+            amount = balance
+        elif not self._confirm(f"Do you really want to unstake {amount}? (y/n)"):
+            return
             
         if amount.rao > balance.rao:
             print(f"Error: Amount to unstake is greater than current balance")
@@ -297,11 +440,13 @@ class RonProxy:
             amount: Amount to unstake (if not using --all)
             all: Whether to unstake all available balance
         """
+        quoted_at = time.time()
         print("~~~~~~~~~~~~~~~~~~~")
         print(amount)
         allow_partial_stake = False
         
-        pool = self.subtensor.subnet(netuid=netuid)
+        subnet_info = self.quote_pool(self.load_pool_state(), netuid)
+        pool = subnet_info
         base_price = pool.price.rao
         # print(base_price / 10**9)
         
@@ -315,7 +460,6 @@ class RonProxy:
         )
         
         print(f"----unstake_fee: {unstake_fee}")
-        subnet_info = self.subtensor.all_subnets()[netuid]
         received_amount, slippage_pct, slippage_pct_float = (
             self._calculate_slippage_remove(subnet_info, amount, unstake_fee)
         )              
@@ -327,7 +471,11 @@ class RonProxy:
         original_tolerance = 0
         if tolerance * 100 > slippage_pct_float * 5:
             print(f"Too big slippage: {int(tolerance*100/slippage_pct_float)}")
-        if tolerance * 100 < slippage_pct_float:
+        model_tolerance = self._model_tolerance(pool, amount, 'remove')
+        if model_tolerance is not None:
+            original_tolerance = tolerance
+            tolerance = model_tolerance
+        elif tolerance * 100 < slippage_pct_float:
             original_tolerance = tolerance
             tolerance = slippage_pct_float / 100 * 3
         
@@ -345,11 +493,9 @@ class RonProxy:
         print(f"----validator to delegate to: {hotkey}")
         
         if all:
-            confirm = input("Do you really want to unstake all available balance? (y/n)")
-            if confirm == "y":
-                amount = balance
-            else:
+            if not self._confirm("Do you really want to unstake all available balance? (y/n)"):
                 return
+            amount = balance
         
         if amount.rao > balance.rao:
             print(f"Error: Amount to unstake is greater than current balance")
@@ -370,7 +516,17 @@ class RonProxy:
                 "allow_partial": allow_partial_stake,
             }
         )
-        is_success, error_message = self._do_proxy_call(call)
+        submitted_at = time.time()
+        entry = dict(
+            quoted_price=pool.price_float, tolerance=tolerance, limit_price=price_with_tolerance,
+            ts=quoted_at, submitted_at=submitted_at,
+        )
+        receipt = self._submit_journaled(call, 'remove_stake', netuid, hotkey, amount.rao, **entry)
+        error_message = self._proxy_error(receipt)
+        is_success = error_message is None
+        self._record(
+            'remove_stake', netuid, hotkey, amount.rao, receipt, error_message, included_at=time.time(), **entry,
+        )
         if is_success:
             new_balance = self.subtensor.get_stake(
                 coldkey_ss58=self.delegator,
@@ -406,17 +562,11 @@ class RonProxy:
         print(f"Current alpha balance on netuid {origin_netuid}: {balance}")
         
         if all:
-            confirm = input("Do you really want to swap all available balance? (y/n)")
-            if confirm == "y":
-                amount = balance
-            else:
-                return
-        else:
-            confirm = input(f"Do you really want to swap {amount}? (y/n)")
-            if confirm == "y":
-                pass
-            else:
+            if not self._confirm("Do you really want to swap all available balance? (y/n)"):
                 return
+            amount = balance
+        elif not self._confirm(f"Do you really want to swap {amount}? (y/n)"):
+            return
             
         if amount.rao > balance.rao:
             print(f"Error: Amount to swap is greater than current balance")
@@ -438,6 +588,242 @@ class RonProxy:
         else:
             print(f"Error: {error_message}")
 
+    def swap_stake_limit(self, hotkey: str, origin_netuid: int, dest_netuid: int,
+                         amount: Balance, tolerance: float, all: bool = False) -> None:
+        """
+        Swap stake between subnets with price protection.
+
+        Both pools are quoted from one snapshot; the limit is the origin/destination
+        price ratio after our own swap, lowered by the tolerance.
+        
+        Args:
+            hotkey: Hotkey address
+            origin_netuid: Source subnet ID
+            dest_netuid: Destination subnet ID
+            amount: Amount to swap (if not using --all)
+            tolerance: Accepted drop of the price ratio beyond our own impact
+            all: Whether to swap all available balance
+        """
+        quoted_at = time.time()
+        balance = self.subtensor.get_stake(
+            coldkey_ss58=self.delegator,
+            hotkey_ss58=hotkey,
+            netuid=origin_netuid,
+        )
+        print(f"Current alpha balance on netuid {origin_netuid}: {balance}")
+
+        if all:
+            amount = balance
+        if amount.rao > balance.rao:
+            print(f"Error: Amount to swap is greater than current balance")
+            return
+
+        pools = self.load_pool_state()
+        origin, dest = self.quote_pool(pools, origin_netuid), self.quote_pool(pools, dest_netuid)
+        tao_out, expected_alpha, post_ratio = quote_swap(origin, dest, amount.rao)
+        ideal_alpha = amount.tao * origin.price_float / dest.price_float if dest.price_float else 0
+        slippage_pct_float = 100 * (1 - expected_alpha / 1e9 / ideal_alpha) if ideal_alpha else 0
+        limit_price = post_ratio * (1 - tolerance) * 1e9
+        expected = Balance.from_rao(expected_alpha, netuid=dest_netuid)
+
+        print(f"----validator: {hotkey}")
+        print(f"----price: {origin.price_float} -> {dest.price_float} (ratio {origin.price_float / dest.price_float})")
+        print(f"----alpha to swap: {amount}")
+        print(f"----tao via origin pool: {Balance.from_rao(tao_out)}")
+        print(f"----expected alpha on netuid {dest_netuid}: {expected}")
+        print(f"🚩🚩🚩🚩🚩🚩{Fore.YELLOW}Slippage: {Fore.CYAN}{slippage_pct_float:.4f} %{Style.RESET_ALL} | {Fore.GREEN}limit ratio: {Fore.BLUE}{limit_price / 1e9}{Style.RESET_ALL}")
+
+        if not self._confirm(f"Do you really want to swap {amount}? (y/n)"):
+            return
+
+        dest_before = self.subtensor.get_stake(
+            coldkey_ss58=self.delegator,
+            hotkey_ss58=hotkey,
+            netuid=dest_netuid,
+        )
+        call = self.compose_swap_stake_limit(hotkey, origin_netuid, dest_netuid, amount, limit_price)
+        submitted_at = time.time()
+        entry = dict(
+            quoted_price=origin.price_float / dest.price_float, tolerance=tolerance, limit_price=limit_price,
+            dest_netuid=dest_netuid, ts=quoted_at, submitted_at=submitted_at,
+        )
+        receipt = self._submit_journaled(call, 'swap_stake', origin_netuid, hotkey, amount.rao, **entry)
+        error_message = self._proxy_error(receipt)
+        self._record(
+            'swap_stake', origin_netuid, hotkey, amount.rao, receipt, error_message, included_at=time.time(), **entry,
+        )
+        if error_message is not None:
+            print(f"Error: {error_message}")
+            return
+
+        realized_alpha = sum(
+            event['alpha'] for event in stake_events(receipt, 'StakeAdded')
+            if event['netuid'] == dest_netuid and event['hotkey'] == hotkey
+        )
+        if not realized_alpha:
+            dest_after = self.subtensor.get_stake(
+                coldkey_ss58=self.delegator,
+                hotkey_ss58=hotkey,
+                netuid=dest_netuid,
+            )
+            realized_alpha = dest_after.rao - dest_before.rao
+        realized = Balance.from_rao(realized_alpha, netuid=dest_netuid)
+        diff_pct = 100 * (realized_alpha - expected_alpha) / expected_alpha if expected_alpha else 0
+        print(f"Stake swapped successfully. Expected: {expected} | Realized: {realized} ({diff_pct:+.4f} %)")
+
+    def compose_swap_stake_limit(self, hotkey: str, origin_netuid: int, dest_netuid: int, amount: Balance,
+                                 limit_price: int, allow_partial: bool = False):
+        """
+        Compose a swap_stake_limit call.
+
+        Args:
+            hotkey: Hotkey address
+            origin_netuid: Source subnet ID
+            dest_netuid: Destination subnet ID
+            amount: Alpha to move
+            limit_price: Lowest acceptable origin/destination price ratio, scaled by 1e9
+            allow_partial: Fill up to the limit instead of failing
+        """
+        return self.substrate.compose_call(
+            call_module='SubtensorModule',
+            call_function='swap_stake_limit',
+            call_params={
+                'hotkey': hotkey,
+                'origin_netuid': origin_netuid,
+                'destination_netuid': dest_netuid,
+                'alpha_amount': amount.rao,
+                "limit_price": int(limit_price),
+                "allow_partial": allow_partial,
+            }
+        )
+
+    def compose_move_stake(self, origin_hotkey: str, dest_hotkey: str, origin_netuid: int, dest_netuid: int,
+                           amount: Balance):
+        """
+        Compose a move_stake call.
+
+        Between hotkeys on one subnet the alpha moves without touching the pool.
+        Across subnets it is swapped through both pools with no limit price, so
+        prefer compose_swap_stake_limit on the origin hotkey followed by a
+        same-subnet move.
+
+        Args:
+            origin_hotkey: Hotkey the stake moves from
+            dest_hotkey: Hotkey the stake moves to
+            origin_netuid: Source subnet ID
+            dest_netuid: Destination subnet ID
+            amount: Alpha to move
+        """
+        return self.substrate.compose_call(
+            call_module='SubtensorModule',
+            call_function='move_stake',
+            call_params={
+                'origin_hotkey': origin_hotkey,
+                'destination_hotkey': dest_hotkey,
+                'origin_netuid': origin_netuid,
+                'destination_netuid': dest_netuid,
+                'alpha_amount': amount.rao,
+            }
+        )
+
+    def exit_all(self, tolerance: float, batch_size: int = MAX_BATCH_CALLS, confirm: bool = True) -> dict:
+        """
+        Unstake every alpha position of the delegator across all subnets.
+
+        Positions are read in one call, limit prices come from one pool
+        snapshot, and the remove_stake_limit calls (partial fills allowed) go
+        out in as few Utility.force_batch extrinsics as possible. Sells on the
+        same netuid are quoted one after another, each against the pool the
+        earlier ones leave behind.
+        
+        Args:
+            tolerance: Accepted price drop beyond each position's own impact
+            batch_size: Maximum calls per batch extrinsic
+            confirm: Ask once before submitting
+
+        Returns:
+            dict of netuid -> {'alpha': alpha sold, 'tao': TAO recovered} in rao
+        """
+        positions = [
+            stake_info for stake_info in self.subtensor.get_stake_info_for_coldkey(coldkey_ss58=self.delegator)
+            if stake_info.stake.rao > 0
+        ]
+        if not positions:
+            print("No positions to exit")
+            return {}
+
+        pools = self.load_pool_state()
+        calls = []
+        quotes = []
+        expected = {}
+        # Pool of each netuid after the sells ahead of it in the batch
+        running = {}
+        for position in positions:
+            if position.netuid not in running:
+                running[position.netuid] = self.quote_pool(pools, position.netuid)
+            pool = running[position.netuid]
+            if pool.is_dynamic:
+                tao, post_price = sell_alpha(pool.tao_in_rao, pool.alpha_in_rao, position.stake.rao, pool.fee)
+                limit_price = float(post_price) * (1 - tolerance) * 1e9
+                alpha_in = pool.alpha_in_rao + int(position.stake.rao * (1 - pool.fee))
+                running[position.netuid] = PoolView(
+                    pool.netuid, pool.tao_in_rao - int(tao), alpha_in, float(post_price), pool.fee_rate, pool.is_dynamic,
+                )
+            else:
+                tao = position.stake.rao
+                limit_price = pool.price_float * (1 - tolerance) * 1e9
+            expected[position.netuid] = expected.get(position.netuid, 0) + int(tao)
+            quotes.append((pool.price_float, limit_price))
+            print(f"----netuid {position.netuid} hotkey {position.hotkey_ss58}: {position.stake} "
+                  f"-> ~{Balance.from_rao(int(tao))} (limit {limit_price / 1e9})")
+            calls.append(self._compose_proxy_call(self.compose_remove_stake_limit(
+                position.netuid, position.hotkey_ss58, position.stake, limit_price, allow_partial=True,
+            )))
+
+        total = Balance.from_rao(sum(expected.values()))
+        if confirm and not self._confirm(f"Do you really want to exit {len(positions)} positions for ~{total}? (y/n)"):
+            return {}
+
+        recovered = {}
+        offset = 0
+        submitted_at = time.time()
+        for chunk, receipt in self._submit_batches(calls, batch_size):
+            chunk_positions = positions[offset:offset + len(chunk)]
+            chunk_quotes = quotes[offset:offset + len(chunk)]
+            offset += len(chunk)
+            if receipt is None:
+                print(f"Error: batch with netuids {[p.netuid for p in chunk_positions]} was not included")
+                for position, (quoted_price, limit_price) in zip(chunk_positions, chunk_quotes):
+                    self._record(
+                        'remove_stake', position.netuid, position.hotkey_ss58, position.stake.rao,
+                        quoted_price=quoted_price, tolerance=tolerance, limit_price=limit_price,
+                        ts=submitted_at, submitted_at=submitted_at,
+                    )
+                continue
+            included_at = time.time()
+            items = batch_item_results(receipt)
+            for position, (quoted_price, limit_price), item in zip(chunk_positions, chunk_quotes, items):
+                self._record(
+                    'remove_stake', position.netuid, position.hotkey_ss58, position.stake.rao, receipt,
+                    None if item['success'] else item['error'], quoted_price=quoted_price, tolerance=tolerance,
+                    limit_price=limit_price, ts=submitted_at, submitted_at=submitted_at,
+                    included_at=included_at, events=item['events'],
+                )
+                if not item['success']:
+                    print(f"Error: netuid {position.netuid} hotkey {position.hotkey_ss58}: {item['error']}")
+                for event in stake_events(item['events'], 'StakeRemoved'):
+                    entry = recovered.setdefault(event['netuid'], {'alpha': 0, 'tao': 0})
+                    entry['alpha'] += event['alpha']
+                    entry['tao'] += event['tao']
+
+        print("")
+        print(f"{'netuid':>8}{'alpha sold':>20}{'TAO recovered':>20}{'TAO expected':>20}")
+        for netuid in sorted(expected):
+            entry = recovered.get(netuid, {'alpha': 0, 'tao': 0})
+            print(f"{netuid:>8}{entry['alpha'] / 1e9:>20.9f}{entry['tao'] / 1e9:>20.9f}{expected[netuid] / 1e9:>20.9f}")
+        print(f"Recovered {Balance.from_rao(sum(e['tao'] for e in recovered.values()))} of ~{total}")
+        return recovered
+
     def register_miner(self, netuid: int):
         """
         Add stake to a subnet.
@@ -451,29 +837,15 @@ class RonProxy:
         old_balance = self.subtensor.get_balance(
             address=self.delegator,
         )
-        call = self.substrate.compose_call(
-            call_module='SubtensorModule',
-            call_function='burned_register',
-            call_params={
-                "hotkey": self.proxy_wallet.hotkey.ss58_address,
-                "netuid": netuid,
-            },
-        )
-        
-        proxy_call = self.substrate.compose_call(
-            call_module='Proxy',
-            call_function='proxy',
-            call_params={
-                'real': self.delegator,
-                'force_proxy_type': 'Registration',
-                'call': call,
-            }
-        )
+        call = self.compose_burned_register(netuid, self.proxy_wallet.hotkey.ss58_address)
+        proxy_call = self._compose_proxy_call(call, 'Registration')
         
         extrinsic = self.substrate.create_signed_extrinsic(
             call=proxy_call,
             keypair=self.proxy_wallet.coldkey,
         )
+        hotkey = self.proxy_wallet.hotkey.ss58_address
+        submitted_at = time.time()
         try:
             receipt = self.substrate.submit_extrinsic(
                 extrinsic,
@@ -488,14 +860,22 @@ class RonProxy:
                     Transaction rejected because partial unstaking is disabled.
                     Either increase price tolerance or enable partial unstaking.
                 """
+            self._record('register', netuid, hotkey, 0, error=e, ts=submitted_at, submitted_at=submitted_at)
             return False, error_message
 
         print(f"Extrinsic: {receipt.get_extrinsic_identifier()}")
 
-        is_success = receipt.is_success
-        error_message = receipt.error_message
+        error_message = self._proxy_error(receipt)
+        is_success = error_message is None
+        burned = 0
         if is_success:
             new_balance = self.subtensor.get_balance(address=self.delegator)
+            burned = old_balance.rao - new_balance.rao
+        self._record(
+            'register', netuid, hotkey, burned, receipt, error_message, ts=submitted_at,
+            submitted_at=submitted_at, included_at=time.time(),
+        )
+        if is_success:
             print(old_balance, new_balance)
             if old_balance.tao != new_balance.tao:
                 print(f"Registered successfully.")
@@ -505,21 +885,457 @@ class RonProxy:
             print(f"Error: {error_message}")
         return is_success, error_message
 
-    def _do_proxy_call(self, call) -> tuple[bool, str]:
-        proxy_call = self.substrate.compose_call(
+    def compose_burned_register(self, netuid: int, hotkey: str):
+        """
+        Compose a burned_register call.
+
+        Args:
+            netuid: Network/subnet ID
+            hotkey: Hotkey address to register
+        """
+        return self.substrate.compose_call(
+            call_module='SubtensorModule',
+            call_function='burned_register',
+            call_params={
+                "hotkey": hotkey,
+                "netuid": netuid,
+            },
+        )
+
+    def register_miners(self, items: list[tuple[str, int]], batch_size: int = None) -> list[dict]:
+        """
+        Register many (hotkey, netuid) pairs with batched proxied burned_register calls.
+
+        Items are split into rounds that respect each subnet's
+        MaxRegistrationsPerBlock; each round goes out as Utility.force_batch
+        extrinsics sized to the block weight limit.
+
+        Args:
+            items: (hotkey address, netuid) pairs
+            batch_size: Calls per batch (default: derived from call weight)
+
+        Returns:
+            list of per-item results with 'hotkey', 'netuid', 'success', 'uid', 'error'
+        """
+        netuids = sorted({netuid for _, netuid in items})
+        per_block = {
+            netuid: self.substrate.query('SubtensorModule', 'MaxRegistrationsPerBlock', [netuid]).value or 1
+            for netuid in netuids
+        }
+        burns = {
+            netuid: Balance.from_rao(self.substrate.query('SubtensorModule', 'Burn', [netuid]).value)
+            for netuid in netuids
+        }
+        balance = self.subtensor.get_balance(address=self.delegator)
+        total_burn = sum(burns[netuid].rao for _, netuid in items)
+        print(f"Current balance: {balance}, total burn: {Balance.from_rao(total_burn)}")
+        for netuid in netuids:
+            count = len([1 for _, n in items if n == netuid])
+            print(f"----netuid {netuid}: {count} hotkeys, burn {burns[netuid]}, {per_block[netuid]} per block")
+
+        calls = [self._compose_proxy_call(self.compose_burned_register(netuid, hotkey), 'Registration')
+                 for hotkey, netuid in items]
+        if batch_size is None:
+            batch_size = self._batch_size_for(calls[0]) if calls else MAX_BATCH_CALLS
+
+        # Round r holds the r-th slice of per_block registrations of every subnet
+        rounds = {}
+        seen = {}
+        for item, call in zip(items, calls):
+            netuid = item[1]
+            index = seen.get(netuid, 0)
+            seen[netuid] = index + 1
+            rounds.setdefault(index // per_block[netuid], []).append((item, call))
+
+        results = []
+        for round_no in sorted(rounds):
+            entries = rounds[round_no]
+            print(f"Round {round_no + 1}/{len(rounds)}: {len(entries)} registrations")
+            offset = 0
+            submitted_at = time.time()
+            for chunk, receipt in self._submit_batches([call for _, call in entries], batch_size):
+                chunk_items = [item for item, _ in entries[offset:offset + len(chunk)]]
+                offset += len(chunk)
+                item_results = batch_item_results(receipt) if receipt is not None else []
+                included_at = time.time() if receipt is not None else None
+                for i, (hotkey, netuid) in enumerate(chunk_items):
+                    result = {'hotkey': hotkey, 'netuid': netuid, 'success': False, 'uid': None, 'error': None}
+                    if i >= len(item_results):
+                        result['error'] = 'not included' if receipt is None else 'not executed'
+                    else:
+                        item = item_results[i]
+                        result['success'] = item['success']
+                        result['error'] = item['error']
+                        for event in item['events']:
+                            if event['module_id'] == 'SubtensorModule' and event['event_id'] == 'NeuronRegistered':
+                                attributes = event['attributes']
+                                if isinstance(attributes, dict):
+                                    attributes = list(attributes.values())
+                                result['uid'] = attributes[1]
+                    results.append(result)
+                    self._record(
+                        'register', netuid, hotkey, burns[netuid].rao if result['success'] else 0,
+                        receipt if i < len(item_results) else None,
+                        None if result['success'] or receipt is None else result['error'],
+                        ts=submitted_at, submitted_at=submitted_at, included_at=included_at,
+                        events=item_results[i]['events'] if i < len(item_results) else None,
+                    )
+                    status = f"uid {result['uid']}" if result['success'] else f"Error: {result['error']}"
+                    print(f"----{hotkey} on netuid {netuid}: {status}")
+        return results
+
+    def _batch_size_for(self, call) -> int:
+        """
+        Calls of this shape that fit in one batch extrinsic, from its weight and the block limits.
+        """
+        try:
+            info = self.substrate.get_payment_info(call=call, keypair=self.proxy_wallet.coldkeypub)
+            call_weight = info['weight']['ref_time'] if isinstance(info['weight'], dict) else info['weight']
+            block_weights = self.substrate.get_constant('System', 'BlockWeights').value
+            max_extrinsic = block_weights['per_class']['normal']['max_extrinsic']['ref_time']
+        except Exception:
+            return MAX_BATCH_CALLS
+        if not call_weight:
+            return MAX_BATCH_CALLS
+        # Leave a quarter of the extrinsic limit for the batch and proxy overhead
+        return max(1, min(MAX_BATCH_CALLS, int(max_extrinsic * 0.75 // call_weight)))
+
+    def _model_tolerance(self, pool, amount: Balance, side: str) -> Optional[float]:
+        """
+        Tolerance from the adaptive model, or None to fall back to the fixed multipliers.
+        """
+        if self.tolerance_model is None:
+            return None
+        tolerance = self.tolerance_model.tolerance(pool, amount, side)
+        if tolerance is not None:
+            print(f"----model tolerance: {tolerance} (latency {self.tolerance_model.latency:.2f} blocks)")
+        return tolerance
+
+    def compose_add_stake_limit(self, netuid: int, hotkey: str, amount: Balance, limit_price: int,
+                                allow_partial: bool = False):
+        """
+        Compose an add_stake_limit call.
+
+        Args:
+            netuid: Network/subnet ID
+            hotkey: Hotkey address
+            amount: TAO to stake
+            limit_price: Highest acceptable pool price after the swap, in rao per alpha
+            allow_partial: Fill up to the limit instead of failing
+        """
+        return self.substrate.compose_call(
+            call_module='SubtensorModule',
+            call_function='add_stake_limit',
+            call_params={
+                'hotkey': hotkey,
+                'netuid': netuid,
+                'amount_staked': amount.rao,
+                "limit_price": int(limit_price),
+                "allow_partial": allow_partial,
+            }
+        )
+
+    def compose_remove_stake_limit(self, netuid: int, hotkey: str, amount: Balance, limit_price: int,
+                                   allow_partial: bool = False):
+        """
+        Compose a remove_stake_limit call.
+
+        Args:
+            netuid: Network/subnet ID
+            hotkey: Hotkey address
+            amount: Alpha to unstake
+            limit_price: Lowest acceptable pool price after the swap, in rao per alpha
+            allow_partial: Fill up to the limit instead of failing
+        """
+        return self.substrate.compose_call(
+            call_module='SubtensorModule',
+            call_function='remove_stake_limit',
+            call_params={
+                'hotkey': hotkey,
+                'netuid': netuid,
+                'amount_unstaked': amount.rao,
+                "limit_price": int(limit_price),
+                "allow_partial": allow_partial,
+            }
+        )
+
+    def _compose_proxy_call(self, call, proxy_type: str = 'Staking'):
+        return self.substrate.compose_call(
             call_module='Proxy',
             call_function='proxy',
             call_params={
                 'real': self.delegator,
-                'force_proxy_type': 'Staking',
+                'force_proxy_type': proxy_type,
                 'call': call,
             }
         )
+
+    def _submit_proxy_call(self, call, proxy_type: str = 'Staking'):
+        """
+        Sign and submit `call` on behalf of the delegator and wait for inclusion.
+
+        Returns:
+            The extrinsic receipt
+        """
+        proxy_call = self._compose_proxy_call(call, proxy_type)
         extrinsic = self.substrate.create_signed_extrinsic(
             call=proxy_call,
             keypair=self.proxy_wallet.coldkey,
         )
+        submitted_at = None
+        if self.tolerance_model is not None:
+            # Latency is the inclusion block minus the head at submit time
+            submitted_at = self.best_block()[0]
         receipt = self.substrate.submit_extrinsic(extrinsic, wait_for_inclusion=True)
-        is_success = receipt.is_success
-        error_message = receipt.error_message
-        return is_success, error_message
\ No newline at end of file
+        if submitted_at is not None:
+            included_at = self.substrate.get_block_number(receipt.block_hash)
+            self.tolerance_model.record_latency(included_at - submitted_at)
+        return receipt
+
+    def _submit_journaled(self, call, op: str, netuid: int, hotkey: str, amount: int, **entry):
+        """
+        `_submit_proxy_call`, journaling the operation as failed before re-raising
+        when the node rejects the extrinsic at submission.
+
+        Args:
+            op, netuid, hotkey, amount, entry: What `_record` takes for this operation
+        """
+        try:
+            return self._submit_proxy_call(call)
+        except SubstrateRequestException as e:
+            self._record(op, netuid, hotkey, amount, error=e, **entry)
+            raise
+
+    def _broadcast_proxy_call(self, call, nonce: int, proxy_type: str = 'Staking') -> str:
+        """
+        Sign `call` on behalf of the delegator with an explicit nonce and broadcast it without waiting.
+
+        Returns:
+            The extrinsic hash
+        """
+        extrinsic = self.substrate.create_signed_extrinsic(
+            call=self._compose_proxy_call(call, proxy_type),
+            keypair=self.proxy_wallet.coldkey,
+            nonce=nonce,
+        )
+        receipt = self.substrate.submit_extrinsic(extrinsic, wait_for_inclusion=False)
+        return receipt.extrinsic_hash
+
+    def _included_receipts(self, block_hash: str, extrinsic_hashes) -> dict:
+        """
+        Receipts for those of `extrinsic_hashes` that are included in `block_hash`.
+        """
+        receipts = {}
+        block = self.substrate.get_block(block_hash=block_hash)
+        for extrinsic in block['extrinsics']:
+            if not extrinsic.extrinsic_hash:
+                continue
+            extrinsic_hash = f"0x{extrinsic.extrinsic_hash.hex()}"
+            if extrinsic_hash in extrinsic_hashes:
+                receipts[extrinsic_hash] = ExtrinsicReceipt(
+                    substrate=self.substrate,
+                    extrinsic_hash=extrinsic_hash,
+                    block_hash=block_hash,
+                )
+        return receipts
+
+    def _wait_for_receipts(self, extrinsic_hashes, timeout_blocks: int = PENDING_TIMEOUT) -> dict:
+        """
+        Follow new blocks until every extrinsic in `extrinsic_hashes` is included or the timeout passes.
+
+        Returns:
+            dict of extrinsic hash -> receipt for the included ones
+        """
+        remaining = set(extrinsic_hashes)
+        receipts = {}
+        start = self.best_block()[0]
+        block = start
+        while remaining and block <= start + timeout_blocks:
+            head = self.best_block()[0]
+            while block <= head and remaining:
+                found = self._included_receipts(self.block_hash_at(block), remaining)
+                receipts.update(found)
+                remaining -= set(found)
+                block += 1
+            if remaining:
+                time.sleep(BLOCK_TIME / 4)
+        return receipts
+
+    def _submit_batches(self, calls: list, batch_size: int = MAX_BATCH_CALLS,
+                        batch_function: str = 'force_batch') -> list[tuple[list, object]]:
+        """
+        Pack calls into Utility batches signed by the proxy wallet and broadcast them together.
+
+        Batches get consecutive nonces so they can land in the same block.
+
+        Args:
+            calls: Calls to pack, usually Proxy.proxy calls
+            batch_size: Maximum calls per batch extrinsic
+            batch_function: 'force_batch' (independent items), 'batch' or 'batch_all'
+
+        Returns:
+            list of (calls in the batch, receipt or None if it was not included)
+        """
+        chunks = [calls[i:i + batch_size] for i in range(0, len(calls), batch_size)]
+        nonce = self.substrate.get_account_nonce(self.proxy_wallet.coldkey.ss58_address)
+        submitted = []
+        for i, chunk in enumerate(chunks):
+            batch_call = self.substrate.compose_call(
+                call_module='Utility',
+                call_function=batch_function,
+                call_params={'calls': chunk},
+            )
+            extrinsic = self.substrate.create_signed_extrinsic(
+                call=batch_call,
+                keypair=self.proxy_wallet.coldkey,
+                nonce=nonce + i,
+            )
+            receipt = self.substrate.submit_extrinsic(extrinsic, wait_for_inclusion=False)
+            print(f"----batch {i + 1}/{len(chunks)} ({len(chunk)} calls): {receipt.extrinsic_hash}")
+            submitted.append((chunk, receipt.extrinsic_hash))
+        receipts = self._wait_for_receipts([h for _, h in submitted])
+        return [(chunk, receipts.get(extrinsic_hash)) for chunk, extrinsic_hash in submitted]
+
+    def _proxy_error(self, receipt):
+        """
+        Error of an included proxy extrinsic: the extrinsic's own error, else the
+        inner call's (decoded to {'type', 'name', 'docs'} like receipt.error_message).
+        None if the proxied call succeeded.
+        """
+        if not receipt.is_success:
+            return receipt.error_message
+        error = proxy_call_error(receipt)
+        if isinstance(error, dict) and 'Module' in error:
+            module = error['Module']
+            module_index, error_index = module if isinstance(module, (tuple, list)) else (module['index'], module['error'])
+            if isinstance(error_index, str):
+                error_index = int(error_index[2:4], 16)
+            module_error = self.substrate.metadata.get_module_error(module_index=module_index, error_index=error_index)
+            return {'type': 'Module', 'name': module_error.name, 'docs': module_error.docs}
+        return error
+
+    def _record(self, op: str, netuid: int, hotkey: str, amount: int, receipt=None, error=None,
+                quoted_price: float = None, tolerance: float = None, limit_price: int = None,
+                dest_netuid: int = None, ts: float = None, submitted_at: float = None,
+                included_at: float = None, events: list = None) -> None:
+        """
+        Write one operation to the journal, deriving realized price, slippage and fee from the receipt's stake events.
+
+        Prices are TAO per alpha; for swaps and moves they are destination alpha per origin alpha.
+        For one item of a batch, pass its `events` (from batch_item_results) with the batch receipt.
+        """
+        entry = {
+            'op': op, 'delegator': self.delegator, 'netuid': netuid, 'dest_netuid': dest_netuid,
+            'hotkey': hotkey, 'amount': int(amount), 'quoted_price': quoted_price, 'tolerance': tolerance,
+            'limit_price': int(limit_price) if limit_price is not None else None,
+            'submitted_at': submitted_at, 'included_at': included_at,
+        }
+        if ts is not None:
+            entry['ts'] = ts
+        if receipt is not None:
+            entry['extrinsic'] = receipt.extrinsic_hash
+            entry['block'] = self.substrate.get_block_number(receipt.block_hash)
+            source = events if events is not None else receipt
+            added, removed = stake_events(source, 'StakeAdded'), stake_events(source, 'StakeRemoved')
+            entry['fee'] = sum(int(event['fee']) for event in added + removed) or None
+            realized = None
+            if op in ('swap_stake', 'move_stake') and added and removed:
+                realized = sum(e['alpha'] for e in added) / sum(e['alpha'] for e in removed)
+            elif op in ('add_stake', 'remove_stake') and (added or removed):
+                events = added if op == 'add_stake' else removed
+                alpha = sum(e['alpha'] for e in events)
+                realized = sum(e['tao'] for e in events) / alpha if alpha else None
+            if realized is not None:
+                entry['realized_price'] = realized
+                if quoted_price:
+                    # Paying more per alpha is adverse when buying; receiving less is adverse otherwise
+                    entry['slippage'] = realized / quoted_price - 1 if op == 'add_stake' else 1 - realized / quoted_price
+        if receipt is None:
+            entry['status'] = 'dropped' if error is None else 'failed'
+        else:
+            entry['status'] = 'done' if error is None else 'failed'
+        entry['error'] = str(error) if error is not None else None
+        try:
+            self.journal.record(**entry)
+        except Exception as e:
+            print(f"Warning: could not write journal entry: {e}")
+
+    def _do_proxy_call(self, call) -> tuple[bool, str]:
+        receipt = self._submit_proxy_call(call)
+        # The proxy extrinsic succeeds even when the proxied call fails
+        error_message = self._proxy_error(receipt)
+        return error_message is None, error_message
+
+
+def stake_events(receipt, event_id: str) -> list[dict]:
+    """
+    Decode SubtensorModule StakeAdded/StakeRemoved events from a receipt
+    (or from the event values of one batch item).
+
+    Both events carry (coldkey, hotkey, tao, alpha, netuid, fee).
+
+    Returns:
+        list of dicts with those fields; amounts in rao
+    """
+    fields = ('coldkey', 'hotkey', 'tao', 'alpha', 'netuid', 'fee')
+    values = [event.value for event in receipt.triggered_events] if hasattr(receipt, 'triggered_events') else receipt
+    events = []
+    for value in values:
+        if value['module_id'] != 'SubtensorModule' or value['event_id'] != event_id:
+            continue
+        attributes = value['attributes']
+        if isinstance(attributes, dict):
+            attributes = list(attributes.values())
+        events.append(dict(zip(fields, attributes)))
+    return events
+
+
+def proxy_call_error(events):
+    """
+    Error of the call dispatched by Proxy.proxy, or None if it succeeded.
+
+    A proxy extrinsic is successful even when its inner call fails; the
+    outcome is only in the ProxyExecuted event.
+    """
+    values = [event.value for event in events.triggered_events] if hasattr(events, 'triggered_events') else events
+    for value in values:
+        if value['module_id'] == 'Proxy' and value['event_id'] == 'ProxyExecuted':
+            result = value['attributes']
+            if isinstance(result, dict) and 'result' in result:
+                result = result['result']
+            if isinstance(result, dict) and 'Err' in result:
+                return result['Err']
+    return None
+
+
+def batch_item_results(receipt) -> list[dict]:
+    """
+    Split the events of a Utility batch receipt into per-item results.
+
+    An item counts as failed if the batch reports ItemFailed for it, or if it
+    is a Proxy.proxy call whose inner call returned an error (ProxyExecuted
+    with Err, while the batch still reports ItemCompleted).
+
+    Returns:
+        list of dicts with 'success', 'error' and the item's 'events'
+    """
+    items = []
+    current = []
+    for event in receipt.triggered_events:
+        value = event.value
+        module_id, event_id = value['module_id'], value['event_id']
+        if module_id == 'Utility' and event_id in ('ItemCompleted', 'ItemFailed'):
+            item = {'success': event_id == 'ItemCompleted', 'error': None, 'events': current}
+            if event_id == 'ItemFailed':
+                item['error'] = value['attributes']
+            proxy_error = proxy_call_error(current)
+            if proxy_error is not None:
+                item.update(success=False, error=proxy_error)
+            items.append(item)
+            current = []
+        elif module_id == 'Utility' and event_id in ('BatchInterrupted', 'BatchCompleted',
+                                                     'BatchCompletedWithErrors'):
+            continue
+        else:
+            current.append(value)
+    return items
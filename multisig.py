@@ -3,20 +3,278 @@
 Multisig script for creating blockchain transfer and proxy proposals.
 """
 
+import argparse
 import bittensor as bt
 from substrateinterface import SubstrateInterface
+from scalecodec.utils.ss58 import ss58_decode, ss58_encode
 from bittensor.utils.balance import Balance
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import hashlib
+import json
 import os
 import sys
+import threading
 
 RPC_ENDPOINTS = {
     'test': 'wss://test.finney.opentensor.ai:443',
     'finney': 'wss://entrypoint-finney.opentensor.ai:443',
 }
 
+CALL_STORE_PATH = 'data/multisig_calls.json'
+WEIGHT_CACHE_PATH = 'data/weight_cache.json'
+# Fallback when the weight of a call cannot be estimated
+DEFAULT_MAX_WEIGHT = {'ref_time': 1000000000, 'proof_size': 10000}
+# Headroom on estimated weights so a slightly heavier execution still fits
+WEIGHT_MARGIN = 1.2
+
+PROXY_TYPES = {
+    'staking': 'Staking',
+    'registration': 'Registration',
+}
+MANIFEST_ACTIONS = ('transfer', 'add_proxy', 'remove_proxy')
+
+
+def call_hash_of(call_data: str) -> str:
+    """Blake2-256 hash of hex-encoded call data, as the Multisig pallet computes it."""
+    return '0x' + hashlib.blake2b(bytes.fromhex(call_data.removeprefix('0x')), digest_size=32).hexdigest()
+
+
+def multisig_account_id(signatories: list[str], threshold: int, ss58_format: int = 42) -> str:
+    """Derive the multisig address the Multisig pallet uses for `signatories` and `threshold`."""
+    public_keys = sorted(bytes.fromhex(ss58_decode(signatory)) for signatory in signatories)
+    count = len(public_keys)
+    # SCALE compact length prefix (signatories are capped well below 2**14)
+    prefix = bytes([count << 2]) if count < 64 else ((count << 2) | 1).to_bytes(2, 'little')
+    data = b'modlpy/utilisuba' + prefix + b''.join(public_keys) + threshold.to_bytes(2, 'little')
+    return ss58_encode(hashlib.blake2b(data, digest_size=32).digest(), ss58_format)
+
+
+def sort_signatories(signatories: list[str]) -> list[str]:
+    """Order signatories by public key, as the Multisig pallet requires."""
+    return sorted(signatories, key=lambda signatory: bytes.fromhex(ss58_decode(signatory)))
+
+
+def call_shape(value):
+    """
+    Structure of a call value with the argument values erased.
+
+    Calls with the same shape have the same weight, so estimates are shared between them.
+    """
+    if isinstance(value, dict):
+        return [
+            [key, item if key in ('call_module', 'call_function') else call_shape(item)]
+            for key, item in sorted(value.items())
+        ]
+    if isinstance(value, (list, tuple)):
+        return [call_shape(item) for item in value]
+    return type(value).__name__
+
+
+def load_manifest(path: str) -> list[dict]:
+    """
+    Read and validate a batch manifest.
+
+    The manifest is a JSON list of actions:
+        {"action": "transfer", "dest": "5...", "amount": 1.5}
+        {"action": "add_proxy", "delegate": "5...", "proxy_type": "staking"}
+        {"action": "remove_proxy", "delegate": "5...", "proxy_type": "registration"}
+    """
+    with open(path) as f:
+        items = json.load(f)
+    if not isinstance(items, list) or not items:
+        raise ValueError("Manifest must be a non-empty JSON list")
+    for i, item in enumerate(items):
+        action = item.get('action')
+        if action not in MANIFEST_ACTIONS:
+            raise ValueError(f"Item {i}: action must be one of {', '.join(MANIFEST_ACTIONS)}")
+        if action == 'transfer':
+            if not item.get('dest') or float(item.get('amount', 0)) <= 0:
+                raise ValueError(f"Item {i}: transfer needs dest and a positive amount")
+        elif not item.get('delegate') or str(item.get('proxy_type', '')).lower() not in PROXY_TYPES:
+            raise ValueError(f"Item {i}: {action} needs delegate and proxy_type (staking/registration)")
+    return items
+
+
+def describe_item(item: dict) -> str:
+    if item['action'] == 'transfer':
+        return f"transfer {Balance.from_tao(float(item['amount']))} to {item['dest']}"
+    return f"{item['action']} {PROXY_TYPES[item['proxy_type'].lower()]} for {item['delegate']}"
+
+
+def multisig_executed_result(receipt) -> tuple[bool | None, object]:
+    """
+    Result of the call dispatched by a final as_multi.
+
+    The as_multi extrinsic succeeds even when the multisig call fails, so the
+    outcome is read from MultisigExecuted. Returns (None, None) if the receipt
+    did not execute a multisig call.
+    """
+    for event in receipt.triggered_events:
+        value = event.value
+        if value['module_id'] == 'Multisig' and value['event_id'] == 'MultisigExecuted':
+            result = value['attributes']['result']
+            if isinstance(result, dict) and 'Err' in result:
+                return False, result['Err']
+            return True, None
+    return None, None
+
+
+def batch_all_results(receipt, count: int) -> list[dict]:
+    """
+    Per-item results of a Utility.batch_all executed through as_multi.
+
+    batch_all is atomic: if the dispatch failed every item is reported failed
+    with the batch error; otherwise each item gets the events emitted before
+    its ItemCompleted.
+
+    Returns:
+        list of dicts with 'success', 'error' and the item's 'events'
+    """
+    success, error = multisig_executed_result(receipt)
+    if not success:
+        return [{'success': False, 'error': error or receipt.error_message, 'events': []} for _ in range(count)]
+    items = []
+    current = []
+    for event in receipt.triggered_events:
+        value = event.value
+        module_id, event_id = value['module_id'], value['event_id']
+        if module_id == 'Utility' and event_id == 'ItemCompleted':
+            items.append({'success': True, 'error': None, 'events': current})
+            current = []
+        elif module_id == 'Utility' and event_id == 'BatchCompleted':
+            break
+        elif module_id not in ('System', 'TransactionPayment') and event_id != 'Withdraw':
+            current.append(value)
+    return items
+
+
+class WeightEstimator:
+    def __init__(self, network: str, substrate: SubstrateInterface, workers: int = 4, path: str = WEIGHT_CACHE_PATH):
+        """
+        Initialize the WeightEstimator object.
+
+        Args:
+            network: Network name
+            substrate: Connection used for single estimates
+            workers: Concurrent connections for estimating many calls at once
+            path: JSON file the estimates are cached in
+        """
+        self.network = network
+        self.substrate = substrate
+        self.workers = workers
+        self.path = path
+        self.cache = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.cache = json.load(f)
+        self._local = threading.local()
+        self._executor = None
+
+    def _thread_substrate(self) -> SubstrateInterface:
+        substrate = getattr(self._local, 'substrate', None)
+        if substrate is None:
+            substrate = SubstrateInterface(
+                url=RPC_ENDPOINTS[self.network],
+                ss58_format=42,
+                type_registry_preset='substrate-node-template',
+            )
+            self._local.substrate = substrate
+        return substrate
+
+    def _key(self, call) -> str:
+        # Composing the call already initialized the runtime, so runtime_version is current
+        shape = json.dumps([self.substrate.runtime_version, call_shape(call.value)])
+        return hashlib.blake2b(shape.encode(), digest_size=16).hexdigest()
+
+    def _query(self, call, keypair, substrate: SubstrateInterface = None) -> dict:
+        substrate = substrate or self._thread_substrate()
+        payment_info = substrate.get_payment_info(call=call, keypair=keypair)
+        return {
+            'weight': {
+                'ref_time': payment_info['weight']['ref_time'],
+                'proof_size': payment_info['weight']['proof_size'],
+            },
+            'fee': payment_info['partial_fee'],
+        }
+
+    def estimate_many(self, calls: list, keypair) -> list[dict]:
+        """
+        Weight and fee of every call, from the cache or via TransactionPaymentApi.
+
+        Uncached shapes are queried concurrently over `workers` connections.
+        Only the public key of `keypair` is used; the payment query takes a dummy signature.
+
+        Returns:
+            [{'weight': {'ref_time', 'proof_size'}, 'fee': rao}] in the order of `calls`
+        """
+        keys = [self._key(call) for call in calls]
+        missing = {}
+        for key, call in zip(keys, calls):
+            if key not in self.cache:
+                missing.setdefault(key, call)
+
+        if len(missing) == 1:
+            key, call = next(iter(missing.items()))
+            self.cache[key] = self._query(call, keypair, self.substrate)
+        elif missing:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            results = self._executor.map(lambda call: self._query(call, keypair), missing.values())
+            self.cache.update(zip(missing.keys(), results))
+
+        if missing:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w') as f:
+                json.dump(self.cache, f, indent=2)
+        return [self.cache[key] for key in keys]
+
+    def estimate(self, call, keypair) -> dict:
+        return self.estimate_many([call], keypair)[0]
+
+    def max_weight(self, call, keypair) -> dict:
+        """Estimated weight of `call` with WEIGHT_MARGIN headroom, for as_multi's max_weight."""
+        try:
+            weight = self.estimate(call, keypair)['weight']
+        except Exception as e:
+            print(f"Warning: could not estimate call weight ({e}), using the default max_weight")
+            return DEFAULT_MAX_WEIGHT
+        return {name: int(value * WEIGHT_MARGIN) for name, value in weight.items()}
+
+
+class CallDataStore:
+    def __init__(self, path: str = CALL_STORE_PATH):
+        """
+        Initialize the CallDataStore object.
+
+        Args:
+            path: JSON file mapping call hash -> call data
+        """
+        self.path = path
+        self.calls = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.calls = json.load(f)
+
+    def add(self, call_data: str) -> str:
+        """Store call data under its hash and return the hash."""
+        call_hash = call_hash_of(call_data)
+        self.calls[call_hash] = call_data
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.calls, f, indent=2)
+        return call_hash
+
+    def get(self, call_hash: str) -> str | None:
+        if call_hash not in self.calls and os.path.exists(self.path):
+            # Another process (add-call) may have stored it since we loaded
+            with open(self.path) as f:
+                self.calls = json.load(f)
+        return self.calls.get(call_hash)
+
 class MultisigProposal:
-    def __init__(self, network: str, multisig_address: str, proxy_wallet: str, approver_address: str):
+    def __init__(self, network: str, multisig_address: str, proxy_wallet: str, approver_address: str,
+                 signatories: list[str] = None, threshold: int = 2):
         """
         Initialize the MultisigProposal object.
         
@@ -24,6 +282,9 @@ class MultisigProposal:
             network: Network name (test/finney)
             multisig_address: Multisig account address 
             proxy_wallet: Proxy wallet name for signing
+            approver_address: Other signatory, used when `signatories` is not given
+            signatories: All signatories of the multisig, including this wallet
+            threshold: Approvals needed to execute
         """
         if network not in RPC_ENDPOINTS:
             raise ValueError(f"Invalid network: {network}")
@@ -32,12 +293,28 @@ class MultisigProposal:
         self.multisig_address = multisig_address
         self.proxy_wallet = bt.wallet(name=proxy_wallet)
         self.approver_address = approver_address
+        self.signer_address = self.proxy_wallet.coldkeypub.ss58_address
+        if not signatories:
+            if not approver_address:
+                raise ValueError("Either SIGNATORIES or APPROVER must be set")
+            signatories = [self.signer_address, approver_address]
+        if self.signer_address not in signatories:
+            raise ValueError(f"{self.signer_address} is not a signatory of the multisig")
+        derived = multisig_account_id(signatories, threshold)
+        if derived != multisig_address:
+            raise ValueError(
+                f"Signatories and threshold {threshold} derive {derived}, not the multisig address {multisig_address}"
+            )
+        self.threshold = threshold
+        self.other_signatories = sort_signatories([s for s in set(signatories) if s != self.signer_address])
+        self.call_store = CallDataStore()
         self.substrate = SubstrateInterface(
             url=RPC_ENDPOINTS[self.network],
             ss58_format=42,
             type_registry_preset='substrate-node-template',
         )
         self.subtensor = bt.subtensor(network=network)
+        self.estimator = WeightEstimator(network, self.substrate)
 
     def create_transfer_proposal(self, destination: str, amount: Balance) -> None:
         """
@@ -83,17 +360,11 @@ class MultisigProposal:
             proxy_address: Address to add as proxy
             proxy_type: Type of proxy ('staking' or 'registration')
         """
-        # Map proxy type string to proper case
-        proxy_type_mapping = {
-            'staking': 'Staking',
-            'registration': 'Registration'
-        }
-        
-        if proxy_type.lower() not in proxy_type_mapping:
+        if proxy_type.lower() not in PROXY_TYPES:
             print(f"Error: Invalid proxy type. Must be 'staking' or 'registration'")
             return
             
-        formatted_proxy_type = proxy_type_mapping[proxy_type.lower()]
+        formatted_proxy_type = PROXY_TYPES[proxy_type.lower()]
         
         print(f"Creating proxy proposal...")
         print(f"Multisig: {self.multisig_address}")
@@ -123,6 +394,62 @@ class MultisigProposal:
         else:
             print(f"Error creating proxy proposal: {error_message}")
 
+    def compose_manifest_call(self, item: dict):
+        """Compose the call for one manifest item (see load_manifest)."""
+        if item['action'] == 'transfer':
+            return self.substrate.compose_call(
+                call_module='Balances',
+                call_function='transfer_keep_alive',
+                call_params={
+                    'dest': item['dest'],
+                    'value': Balance.from_tao(float(item['amount'])).rao,
+                }
+            )
+        return self.substrate.compose_call(
+            call_module='Proxy',
+            call_function=item['action'],
+            call_params={
+                'delegate': item['delegate'],
+                'proxy_type': PROXY_TYPES[item['proxy_type'].lower()],
+                'delay': int(item.get('delay', 0)),
+            }
+        )
+
+    def create_batch_proposal(self, items: list[dict]) -> None:
+        """
+        Create one multisig proposal wrapping every manifest item in Utility.batch_all.
+
+        The co-signer approves a single call hash, and only one deposit is locked.
+        batch_all makes the proposal all-or-nothing.
+        """
+        print(f"Creating batch proposal with {len(items)} calls...")
+        print(f"Multisig: {self.multisig_address}")
+        for i, item in enumerate(items):
+            print(f"  [{i}] {describe_item(item)}")
+        total = sum(Balance.from_tao(float(item['amount'])).rao for item in items if item['action'] == 'transfer')
+        if total:
+            print(f"Total transfers: {Balance.from_rao(total)}")
+            print(f"Current balance: {self.subtensor.get_balance(address=self.multisig_address)}")
+        
+        confirm = input(f"Do you really want to create this batch proposal? (y/n): ")
+        if confirm.lower() != "y":
+            print("Batch proposal cancelled.")
+            return
+        
+        batch_call = self.substrate.compose_call(
+            call_module='Utility',
+            call_function='batch_all',
+            call_params={
+                'calls': [self.compose_manifest_call(item) for item in items],
+            }
+        )
+        
+        is_success, error_message = self._create_multisig_proposal(batch_call)
+        if is_success:
+            print("Batch proposal created successfully!")
+        else:
+            print(f"Error creating batch proposal: {error_message}")
+
     def _create_multisig_proposal(self, call) -> tuple[bool, str]:
         """
         Create a multisig proposal with the given call.
@@ -134,27 +461,26 @@ class MultisigProposal:
             Tuple of (success, error_message)
         """
         try:
-            # Get multisig info to determine threshold and other signatories
-            # For simplicity, we'll use threshold=2 and assume this wallet is a signatory
-            threshold = 2
-            other_signatories = [self.approver_address]  # This would need to be populated with actual signatories
+            call_data = str(self._get_call_data(call))
             
             print("")
             print(f"Call hash: {call.call_hash.hex()}")
-            print(f"Call data: {self._get_call_data(call)}")
+            print(f"Call data: {call_data}")
             
-            # Create the multisig proposal call
-            multisig_call = self.substrate.compose_call(
-                call_module='Multisig',
-                call_function='approve_as_multi',
-                call_params={
-                    'threshold': threshold,
-                    'other_signatories': other_signatories,
-                    'maybe_timepoint': None,
-                    'call_hash': call.call_hash,
-                    'max_weight': {'ref_time': 1000000000, 'proof_size': 10000}
-                }
+            # Estimate the call and the proposal itself in one round
+            multisig_call = self._compose_approve_as_multi(call, DEFAULT_MAX_WEIGHT)
+            call_estimate, proposal_estimate = self.estimator.estimate_many(
+                [call, multisig_call], self.proxy_wallet.coldkeypub,
             )
+            max_weight = {
+                name: int(value * WEIGHT_MARGIN) for name, value in call_estimate['weight'].items()
+            }
+            print(f"Call weight: {call_estimate['weight']['ref_time']} ref_time, "
+                  f"{call_estimate['weight']['proof_size']} proof_size")
+            print(f"Proposal fee: {Balance.from_rao(proposal_estimate['fee'])}")
+            
+            # Create the multisig proposal call
+            multisig_call = self._compose_approve_as_multi(call, max_weight)
             
             print("")
             print(f"Signing with proxy wallet: {self.proxy_wallet.name}")
@@ -164,12 +490,28 @@ class MultisigProposal:
             )
             
             receipt = self.substrate.submit_extrinsic(extrinsic, wait_for_inclusion=True)
+            if receipt.is_success:
+                # Keep the call data so multisig_index.py can execute it once approved
+                self.call_store.add(call_data)
             
             return receipt.is_success, receipt.error_message
             
         except Exception as e:
             return False, str(e)
         
+    def _compose_approve_as_multi(self, call, max_weight: dict):
+        return self.substrate.compose_call(
+            call_module='Multisig',
+            call_function='approve_as_multi',
+            call_params={
+                'threshold': self.threshold,
+                'other_signatories': self.other_signatories,
+                'maybe_timepoint': None,
+                'call_hash': call.call_hash,
+                'max_weight': max_weight,
+            }
+        )
+
     def _get_call_data(self, call) -> str:
         """
         Get the call data from a substrate call.
@@ -233,8 +575,26 @@ def get_user_input():
         return action_type, proxy_address, proxy_type
 
 
+def signatories_from_env() -> tuple[list[str], int]:
+    """Read SIGNATORIES (comma-separated) and THRESHOLD; empty signatories means DELEGATOR is 2-of-2 with APPROVER."""
+    signatories = [s.strip() for s in os.getenv('SIGNATORIES', '').split(',') if s.strip()]
+    threshold = int(os.getenv('THRESHOLD', '2'))
+    return signatories, threshold
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Create multisig transfer and proxy proposals (interactive without --manifest)",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--manifest', type=str, help='JSON list of transfers and proxy changes to propose as one batch')
+    return parser
+
+
 def main():
     """Main entry point."""
+    args = create_parser().parse_args()
     # Load environment variables
     load_dotenv()
     
@@ -244,11 +604,14 @@ def main():
     multisig_address = os.getenv('DELEGATOR')  # Using delegator as multisig address
     proxy_wallet = os.getenv('PROXY_WALLET')
     approver_address = os.getenv('APPROVER')
+    signatories, threshold = signatories_from_env()
 
     print(f"Network: {network}")
     print(f"Multisig address: {multisig_address}")
     print(f"Proxy wallet: {proxy_wallet}")
     print(f"Approver address: {approver_address}")
+    if signatories:
+        print(f"Signatories: {', '.join(signatories)} (threshold {threshold})")
     print("")
     
     # Validate environment variables
@@ -268,8 +631,14 @@ def main():
             multisig_address=multisig_address,
             proxy_wallet=proxy_wallet,
             approver_address=approver_address,
+            signatories=signatories,
+            threshold=threshold,
         )
         
+        if args.manifest:
+            multisig.create_batch_proposal(load_manifest(args.manifest))
+            return
+        
         # Get user input
         user_input = get_user_input()
         action_type = user_input[0]
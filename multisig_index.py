@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Pending multisig proposal index and automatic final execution.
+
+Scans `Multisig.Multisigs` for the multisig account in one paged read,
+indexes pending proposals by call hash with their timepoint and approvals,
+and submits the final `as_multi` with the stored call data as soon as our
+approval completes the threshold.
+"""
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+from scalecodec.base import ScaleBytes
+from substrateinterface.exceptions import SubstrateRequestException
+from multisig import (
+    RPC_ENDPOINTS, MultisigProposal, batch_all_results, call_hash_of, multisig_executed_result, signatories_from_env,
+)
+
+# Failed executions of one proposal before we stop until its approvals change
+MAX_EXECUTE_ATTEMPTS = 3
+
+
+@dataclass
+class PendingProposal:
+    call_hash: str
+    height: int
+    index: int
+    depositor: str
+    deposit: int
+    approvals: list
+
+    @property
+    def timepoint(self) -> dict:
+        return {'height': self.height, 'index': self.index}
+
+
+class MultisigIndex:
+    def __init__(self, multisig: MultisigProposal):
+        """
+        Initialize the MultisigIndex object.
+
+        Args:
+            multisig: MultisigProposal holding the connection, signer, threshold and call data store
+        """
+        self.multisig = multisig
+        self.substrate = multisig.substrate
+        self.me = multisig.signer_address
+        self.pending: dict[str, PendingProposal] = {}
+        self.executed: set[str] = set()
+        # Ready proposals already reported as missing their call data
+        self.unknown: set[str] = set()
+        # call hash -> {'attempts', 'approvals', 'retry_at'} of failed executions
+        self.failures: dict[str, dict] = {}
+
+    def scan(self, block_hash: str = None) -> dict[str, PendingProposal]:
+        """
+        Re-read every pending proposal of the multisig account.
+        """
+        result = self.substrate.query_map(
+            module='Multisig',
+            storage_function='Multisigs',
+            params=[self.multisig.multisig_address],
+            block_hash=block_hash,
+            page_size=1000,
+        )
+        pending = {}
+        for key, value in result:
+            call_hash = key.value if isinstance(key.value, str) else '0x' + bytes(key.value).hex()
+            value = value.value
+            pending[call_hash] = PendingProposal(
+                call_hash=call_hash,
+                height=value['when']['height'],
+                index=value['when']['index'],
+                depositor=value['depositor'],
+                deposit=value['deposit'],
+                approvals=list(value['approvals']),
+            )
+        self.pending = pending
+        return pending
+
+    def ready(self, proposal: PendingProposal) -> bool:
+        """Whether our as_multi would reach the threshold and execute."""
+        approvals = set(proposal.approvals) | {self.me}
+        return len(approvals) >= self.multisig.threshold
+
+    def execute(self, proposal: PendingProposal) -> tuple[bool, str]:
+        """
+        Submit the final as_multi for `proposal` with its stored call data.
+        """
+        call_data = self.multisig.call_store.get(proposal.call_hash)
+        if call_data is None:
+            return False, f"No call data stored for {proposal.call_hash}"
+        call = self.substrate.create_scale_object('Call', data=ScaleBytes(call_data))
+        call.decode()
+
+        multisig_call = self.substrate.compose_call(
+            call_module='Multisig',
+            call_function='as_multi',
+            call_params={
+                'threshold': self.multisig.threshold,
+                'other_signatories': self.multisig.other_signatories,
+                'maybe_timepoint': proposal.timepoint,
+                'call': call,
+                'max_weight': self.multisig.estimator.max_weight(call, self.multisig.proxy_wallet.coldkeypub),
+            }
+        )
+        extrinsic = self.substrate.create_signed_extrinsic(
+            call=multisig_call,
+            keypair=self.multisig.proxy_wallet.coldkey,
+        )
+        receipt = self.substrate.submit_extrinsic(extrinsic, wait_for_inclusion=True)
+        if not receipt.is_success:
+            return False, receipt.error_message
+
+        if call.value['call_module'] == 'Utility' and call.value['call_function'] == 'batch_all':
+            for i, item in enumerate(batch_all_results(receipt, len(call.value['call_args']['calls']))):
+                events = ', '.join(f"{event['module_id']}.{event['event_id']}" for event in item['events'])
+                print(f"  [{i}] {'ok' if item['success'] else 'failed'}: {item['error'] or events}")
+        is_success, error = multisig_executed_result(receipt)
+        if is_success:
+            self.executed.add(proposal.call_hash)
+        return bool(is_success), error
+
+    def _backing_off(self, proposal: PendingProposal, block: int) -> bool:
+        """
+        Whether to hold off executing `proposal` after earlier failures.
+
+        Retries back off exponentially and stop after MAX_EXECUTE_ATTEMPTS,
+        until the proposal's approvals change.
+        """
+        failure = self.failures.get(proposal.call_hash)
+        if failure is None:
+            return False
+        if failure['approvals'] != sorted(proposal.approvals):
+            del self.failures[proposal.call_hash]
+            return False
+        return failure['attempts'] >= MAX_EXECUTE_ATTEMPTS or block < failure['retry_at']
+
+    def _failed(self, proposal: PendingProposal, block: int) -> None:
+        failure = self.failures.setdefault(proposal.call_hash, {'attempts': 0})
+        failure['attempts'] += 1
+        failure['approvals'] = sorted(proposal.approvals)
+        failure['retry_at'] = block + 2 ** failure['attempts']
+        if failure['attempts'] >= MAX_EXECUTE_ATTEMPTS:
+            print(f"----giving up on {proposal.call_hash} after {failure['attempts']} attempts until its approvals change")
+
+    def on_block(self, number: int) -> None:
+        try:
+            block_hash = self.substrate.get_block_hash(number)
+            proposals = self.scan(block_hash)
+        except SubstrateRequestException as e:
+            print(f"Error: block {number}: {e}")
+            return
+        for proposal in proposals.values():
+            if proposal.call_hash in self.executed or not self.ready(proposal):
+                continue
+            if self.multisig.call_store.get(proposal.call_hash) is None:
+                # Picked up on a later block once add-call stores it
+                if proposal.call_hash not in self.unknown:
+                    print(f"----{proposal.call_hash} is ready but its call data is unknown (use add-call)")
+                    self.unknown.add(proposal.call_hash)
+                continue
+            if self._backing_off(proposal, number):
+                continue
+            print(f"Executing {proposal.call_hash} (approvals {len(proposal.approvals)}/{self.multisig.threshold})")
+            try:
+                is_success, error_message = self.execute(proposal)
+            except SubstrateRequestException as e:
+                is_success, error_message = False, e
+            if is_success:
+                self.failures.pop(proposal.call_hash, None)
+                print(f"Executed {proposal.call_hash}")
+            else:
+                self._failed(proposal, number)
+                print(f"Error executing {proposal.call_hash}: {error_message}")
+
+    def watch(self) -> None:
+        def handler(header, update_nr, subscription_id):
+            self.on_block(header['header']['number'])
+
+        self.substrate.subscribe_block_headers(handler)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Index pending multisig proposals and execute them once approved",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+    subparsers.add_parser('list', help='List pending proposals')
+    add_parser = subparsers.add_parser('add-call', help='Store call data received from the proposer')
+    add_parser.add_argument('--data', type=str, required=True, help='Hex call data')
+    subparsers.add_parser('watch', help='Execute ready proposals on every new block')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    load_dotenv()
+    parser = create_parser()
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+
+    network = os.getenv('NETWORK')
+    multisig_address = os.getenv('DELEGATOR')
+    proxy_wallet = os.getenv('PROXY_WALLET')
+    approver_address = os.getenv('APPROVER')
+    signatories, threshold = signatories_from_env()
+    if not network or not multisig_address or not proxy_wallet:
+        print("Error: Missing environment variables")
+        print("Please ensure NETWORK, DELEGATOR, and PROXY_WALLET are set in .env")
+        sys.exit(1)
+    if network not in RPC_ENDPOINTS:
+        print(f"Error: Invalid network '{network}'. Must be 'test' or 'finney'")
+        sys.exit(1)
+
+    try:
+        multisig = MultisigProposal(
+            network=network,
+            multisig_address=multisig_address,
+            proxy_wallet=proxy_wallet,
+            approver_address=approver_address,
+            signatories=signatories,
+            threshold=threshold,
+        )
+        index = MultisigIndex(multisig)
+
+        if args.command == 'add-call':
+            call_hash = call_hash_of(args.data)
+            pending = index.scan()
+            multisig.call_store.add(args.data)
+            print(f"Stored call data for {call_hash}")
+            if call_hash not in pending:
+                print("Warning: no pending proposal has this call hash")
+        elif args.command == 'list':
+            for proposal in index.scan().values():
+                known = 'call data stored' if multisig.call_store.get(proposal.call_hash) else 'call data unknown'
+                print(f"{proposal.call_hash} at {proposal.height}-{proposal.index} by {proposal.depositor}: "
+                      f"{len(proposal.approvals)}/{multisig.threshold} approvals, {known}"
+                      f"{' [ready]' if index.ready(proposal) else ''}")
+        else:
+            multisig.proxy_wallet.unlock_coldkey()
+            index.watch()
+
+    except KeyboardInterrupt:
+        print("Stopped.")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Order slicing scheduler for large stakes/unstakes.
+
+Splits a parent order into child add_stake_limit/remove_stake_limit
+extrinsics spread over blocks. Child sizes come from current pool depth
+(`depth` mode: each child moves the pool price by at most --max-impact) or
+an even split (`twap` mode). Children are sent with allow_partial=True, the
+filled amount is tracked from StakeAdded/StakeRemoved events, and the order
+stops once the pool price crosses --price-bound. Order state is saved after
+every step so an interrupted run can be resumed.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+
+from bittensor.utils.balance import Balance
+from modules import RonProxy, stake_events
+from pool_state import buy_alpha, sell_alpha
+
+DELEGATOR = {
+    'jjcom': '5CF3fFYemt9A4DfdPGQiE8rqMYEeG3ioL3dQHkbX97MqmNBE',
+    'atel': '5CHLb1prLQ4MjA6bYbpPfx1gzvaGpeSfXkk84sMDcNXRQDPd',
+}
+
+validator_hotkey = '5CsvRJXuR955WojnGMdok1hbhffZyB4N5ocrv82f3p5A2zVp'
+
+ORDER_DIR = 'data/orders'
+# Children smaller than this are merged into the previous one (rao)
+MIN_CHILD = 100_000_000
+BLOCK_TIME = 12
+# Consecutive failed or zero-fill children before the order is abandoned
+MAX_FAILURES = 3
+
+
+@dataclass
+class SliceOrder:
+    order_id: str
+    side: str
+    netuid: int
+    hotkey: str
+    total: int
+    delegator: str = ''
+    mode: str = 'depth'
+    max_impact: float = 0.005
+    slices: int = 10
+    spacing: int = 1
+    tolerance: float = 0.002
+    price_bound: float | None = None
+    filled: int = 0
+    received: int = 0
+    status: str = 'open'
+    next_block: int = 0
+    children: list = field(default_factory=list)
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.filled
+
+    def path(self, directory: str) -> str:
+        return os.path.join(directory, f"{self.order_id}.json")
+
+    def save(self, directory: str) -> None:
+        """Write the order state atomically."""
+        os.makedirs(directory, exist_ok=True)
+        tmp = self.path(directory) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(asdict(self), f, indent=2)
+        os.replace(tmp, self.path(directory))
+
+    @classmethod
+    def load(cls, directory: str, order_id: str) -> "SliceOrder":
+        with open(os.path.join(directory, f"{order_id}.json")) as f:
+            return cls(**json.load(f))
+
+
+class OrderSlicer:
+    def __init__(self, ron_proxy: RonProxy, directory: str = ORDER_DIR):
+        """
+        Initialize the OrderSlicer object.
+
+        Args:
+            ron_proxy: RonProxy used to read pools and submit children
+            directory: Where order state files are kept
+        """
+        self.ron_proxy = ron_proxy
+        self.directory = directory
+
+    def _current_block(self) -> int:
+        return self.ron_proxy.best_block()[0]
+
+    def _wait_for_block(self, block: int) -> int:
+        current = self._current_block()
+        while current < block:
+            time.sleep(BLOCK_TIME / 4)
+            current = self._current_block()
+        return current
+
+    def _holdings(self, order: SliceOrder) -> tuple[int, int]:
+        """Free TAO balance and alpha stake of the delegator, in rao."""
+        balance = self.ron_proxy.subtensor.get_balance(address=self.ron_proxy.delegator)
+        stake = self.ron_proxy.subtensor.get_stake(
+            coldkey_ss58=self.ron_proxy.delegator,
+            hotkey_ss58=order.hotkey,
+            netuid=order.netuid,
+        )
+        return balance.rao, stake.rao
+
+    def child_size(self, order: SliceOrder, pool) -> int:
+        """
+        Size of the next child in rao of the order's input asset.
+        """
+        remaining = order.remaining
+        if order.mode == 'twap':
+            done = len([c for c in order.children if c['status'] == 'done'])
+            size = remaining // max(order.slices - done, 1)
+        elif order.side == 'add':
+            size = int(pool.tao_in_rao * (math.sqrt(1 + order.max_impact) - 1))
+        else:
+            size = int(pool.alpha_in_rao * (1 / math.sqrt(1 - order.max_impact) - 1))
+        if remaining - size < MIN_CHILD:
+            size = remaining
+        return max(min(size, remaining), 0)
+
+    def limit_price(self, order: SliceOrder, pool, size: int) -> int:
+        """
+        Limit price for a child: its own post-swap price widened by the tolerance, capped by the price bound.
+        """
+        fee = pool.fee
+        if order.side == 'add':
+            _, post_price = buy_alpha(pool.tao_in_rao, pool.alpha_in_rao, size, fee)
+            limit = float(post_price) * (1 + order.tolerance)
+            if order.price_bound is not None:
+                limit = min(limit, order.price_bound)
+        else:
+            _, post_price = sell_alpha(pool.tao_in_rao, pool.alpha_in_rao, size, fee)
+            limit = float(post_price) * (1 - order.tolerance)
+            if order.price_bound is not None:
+                limit = max(limit, order.price_bound)
+        return int(limit * 1e9)
+
+    def _crossed_bound(self, order: SliceOrder, price: float) -> bool:
+        if order.price_bound is None:
+            return False
+        if order.side == 'add':
+            return price >= order.price_bound
+        return price <= order.price_bound
+
+    def _reconcile(self, order: SliceOrder, child: dict) -> None:
+        """
+        Settle a child left pending by a crash from balance/stake deltas.
+        """
+        balance, stake = self._holdings(order)
+        if order.side == 'add':
+            filled = max(child['balance_before'] - balance, 0)
+            received = max(stake - child['stake_before'], 0)
+        else:
+            filled = max(child['stake_before'] - stake, 0)
+            received = max(balance - child['balance_before'], 0)
+        child.update(status='done', filled=filled, received=received)
+        order.filled += filled
+        order.received += received
+        print(f"Reconciled pending child: filled {filled}, received {received}")
+
+    def run(self, order: SliceOrder) -> SliceOrder:
+        """
+        Execute (or resume) a parent order until it is filled or stopped.
+        """
+        if order.children and order.children[-1]['status'] == 'pending':
+            self._reconcile(order, order.children[-1])
+            order.save(self.directory)
+
+        while order.status == 'open':
+            if order.remaining < MIN_CHILD:
+                order.status = 'done'
+                break
+
+            block = self._wait_for_block(order.next_block)
+            pool = self.ron_proxy.quote_pool(self.ron_proxy.load_pool_state(), order.netuid)
+            if self._crossed_bound(order, pool.price_float):
+                print(f"Price {pool.price_float} crossed bound {order.price_bound}, stopping")
+                order.status = 'stopped'
+                break
+
+            size = self.child_size(order, pool)
+            limit_price = self.limit_price(order, pool, size)
+            balance_before, stake_before = self._holdings(order)
+            child = {
+                'block': block,
+                'amount': size,
+                'limit_price': limit_price,
+                'status': 'pending',
+                'balance_before': balance_before,
+                'stake_before': stake_before,
+                'filled': 0,
+                'received': 0,
+                'extrinsic': None,
+            }
+            order.children.append(child)
+            order.save(self.directory)
+
+            if order.side == 'add':
+                call = self.ron_proxy.compose_add_stake_limit(
+                    order.netuid, order.hotkey, Balance.from_rao(size), limit_price, allow_partial=True,
+                )
+                event_id = 'StakeAdded'
+            else:
+                call = self.ron_proxy.compose_remove_stake_limit(
+                    order.netuid, order.hotkey, Balance.from_rao(size, netuid=order.netuid), limit_price,
+                    allow_partial=True,
+                )
+                event_id = 'StakeRemoved'
+            print(f"----child {len(order.children)}: {size} rao at limit {limit_price / 1e9}")
+            submitted_at = time.time()
+            entry = dict(
+                quoted_price=pool.price_float, tolerance=order.tolerance, limit_price=limit_price,
+                ts=submitted_at, submitted_at=submitted_at,
+            )
+            receipt = self.ron_proxy._submit_journaled(
+                call, f"{order.side}_stake", order.netuid, order.hotkey, size, **entry,
+            )
+            child['extrinsic'] = receipt.extrinsic_hash
+
+            # The proxy extrinsic succeeds even when the child itself is rejected
+            error = self.ron_proxy._proxy_error(receipt)
+            if error is None:
+                for event in stake_events(receipt, event_id):
+                    if event['netuid'] != order.netuid or event['hotkey'] != order.hotkey:
+                        continue
+                    if order.side == 'add':
+                        child['filled'] += event['tao'] + event['fee']
+                        child['received'] += event['alpha']
+                    else:
+                        child['filled'] += event['alpha']
+                        child['received'] += event['tao']
+                child['status'] = 'done'
+                order.filled += child['filled']
+                order.received += child['received']
+                print(f"----filled {child['filled']}, received {child['received']} "
+                      f"({order.filled}/{order.total})")
+            else:
+                child['status'] = 'failed'
+                print(f"Error: {error}")
+            self.ron_proxy._record(
+                f"{order.side}_stake", order.netuid, order.hotkey, size, receipt, error,
+                included_at=time.time(), **entry,
+            )
+
+            # Rejected and zero-fill children both count towards giving up
+            recent = order.children[-MAX_FAILURES:]
+            if len(recent) == MAX_FAILURES and all(c['status'] == 'failed' or c['filled'] == 0 for c in recent):
+                print(f"{MAX_FAILURES} children in a row filled nothing, giving up")
+                order.status = 'failed'
+
+            if child['filled'] == 0 and order.mode == 'depth':
+                # Nothing filled within the limit: the pool is past our price, wait for it
+                order.next_block = block + order.spacing * 2
+            else:
+                order.next_block = block + order.spacing
+            order.save(self.directory)
+
+        order.save(self.directory)
+        print(f"Order {order.order_id} {order.status}: filled {order.filled}/{order.total}, received {order.received}")
+        return order
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Slice large stake/unstake orders across blocks",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+
+    for side in ('add', 'remove'):
+        side_parser = subparsers.add_parser(side, help=f"Start a sliced {side} stake order")
+        side_parser.add_argument('--coldkey', type=str, required=True, help='Name of the wallet')
+        side_parser.add_argument('--netuid', type=int, required=True, help='Network/subnet ID')
+        side_parser.add_argument('--amount', type=float, required=True,
+                                 help='TAO to stake' if side == 'add' else 'Alpha to unstake')
+        side_parser.add_argument('--mode', type=str, choices=['depth', 'twap'], default='depth', help='Slicing mode')
+        side_parser.add_argument('--max-impact', type=float, default=0.005, help='Max price move per child (depth mode)')
+        side_parser.add_argument('--slices', type=int, default=10, help='Number of children (twap mode)')
+        side_parser.add_argument('--spacing', type=int, default=1, help='Blocks between children')
+        side_parser.add_argument('--tol', type=float, default=0.002, help='Tolerance on top of each child\'s own impact')
+        side_parser.add_argument('--price-bound', type=float, default=None,
+                                 help='Stop when price goes above (add) or below (remove) this')
+
+    resume_parser = subparsers.add_parser('resume', help='Resume an interrupted order')
+    resume_parser.add_argument('--coldkey', type=str, required=True, help='Name of the wallet')
+    resume_parser.add_argument('--order-id', type=str, required=True, help='Order ID')
+
+    subparsers.add_parser('list', help='List stored orders')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    network = 'finney'
+    parser = create_parser()
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+
+    if args.command == 'list':
+        if not os.path.isdir(ORDER_DIR):
+            return
+        for name in sorted(os.listdir(ORDER_DIR)):
+            if name.endswith('.json'):
+                order = SliceOrder.load(ORDER_DIR, name[:-5])
+                print(f"{order.order_id} {order.side} netuid {order.netuid} {order.status} "
+                      f"{order.filled}/{order.total} children {len(order.children)}")
+        return
+
+    if args.coldkey != 'jjcom' and args.coldkey != 'atel':
+        sys.exit(1)
+    proxy_wallet = args.coldkey
+    delegator = DELEGATOR[proxy_wallet]
+
+    ron_proxy = RonProxy(
+        proxy_wallet=proxy_wallet,
+        network=network,
+        delegator=delegator,
+    )
+    print(f"Initialized RonProxy object for {network} network")
+
+    if args.command == 'resume':
+        order = SliceOrder.load(ORDER_DIR, args.order_id)
+        if order.delegator != delegator:
+            print(f"Error: Order {order.order_id} belongs to delegator {order.delegator or '(unknown)'}, "
+                  f"not {delegator} ({args.coldkey})")
+            sys.exit(1)
+    else:
+        total = Balance.from_tao(args.amount) if args.command == 'add' else Balance.from_tao(args.amount, netuid=args.netuid)
+        order = SliceOrder(
+            order_id=uuid.uuid4().hex[:12],
+            side=args.command,
+            netuid=args.netuid,
+            hotkey=validator_hotkey,
+            total=total.rao,
+            delegator=delegator,
+            mode=args.mode,
+            max_impact=args.max_impact,
+            slices=args.slices,
+            spacing=args.spacing,
+            tolerance=args.tol,
+            price_bound=args.price_bound,
+        )
+        order.save(ORDER_DIR)
+        print(f"Created order {order.order_id}")
+
+    ron_proxy.proxy_wallet.unlock_coldkey()
+    try:
+        OrderSlicer(ron_proxy).run(order)
+    except KeyboardInterrupt:
+        order.save(ORDER_DIR)
+        print(f"Interrupted. Resume with: python3 order_slicer.py resume --coldkey {args.coldkey} --order-id {order.order_id}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Pending-pool watcher.
+
+Polls `author_pendingExtrinsics` on our node and keeps a per-netuid estimate
+of the staking flow that is waiting to land: TAO about to be staked and
+alpha about to be unstaked or swapped away. The node has no subscription for
+the pool contents, so the watcher polls. Each extrinsic is decoded once, on
+the first poll that sees it. Extrinsics that leave the pool are subtracted
+again. Calls wrapped in Proxy, Utility batches or Multisig are unwrapped.
+
+After every poll the watcher publishes an immutable snapshot. Folding the
+pending flow into a quote (`PendingFlow.adjust`) is a dict lookup plus a few
+float operations on the trade path, with no RPC.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from typing import NamedTuple
+
+from scalecodec.base import ScaleBytes
+from substrateinterface import SubstrateInterface
+
+from pool_state import PoolState, PoolView
+
+RPC_ENDPOINTS = {
+    'test': 'wss://test.finney.opentensor.ai:443',
+    'finney': 'wss://entrypoint-finney.opentensor.ai:443',
+}
+# Seconds after which a snapshot no longer describes the pool an extrinsic will meet
+MAX_AGE = 6.0
+
+# Calls that pay TAO into a pool, and their amount argument
+STAKE_CALLS = {'add_stake': 'amount_staked', 'add_stake_limit': 'amount_staked'}
+# Calls that sell alpha into a pool, and their amount argument
+UNSTAKE_CALLS = {'remove_stake': 'amount_unstaked', 'remove_stake_limit': 'amount_unstaked'}
+# Calls that sell alpha on origin_netuid and buy on destination_netuid
+SWAP_CALLS = ('swap_stake', 'swap_stake_limit', 'move_stake', 'transfer_stake')
+
+
+class NetFlow(NamedTuple):
+    tao: int                # rao of TAO waiting to be staked
+    alpha: int              # rao of alpha waiting to be sold
+    swaps: tuple = ()       # (origin netuid, alpha rao) waiting to be swapped in
+
+
+def staking_flows(call: dict) -> list[tuple]:
+    """
+    Pool flows of a decoded call, unwrapping nested calls.
+
+    Returns:
+        list of ('stake', netuid, tao), ('unstake', netuid, alpha) and
+        ('swap', dest netuid, alpha, origin netuid) tuples
+    """
+    flows = []
+    args = {arg['name']: arg['value'] for arg in call['call_args']}
+    function = call['call_function']
+    if call['call_module'] == 'SubtensorModule':
+        if function in STAKE_CALLS:
+            flows.append(('stake', args['netuid'], args[STAKE_CALLS[function]]))
+        elif function in UNSTAKE_CALLS:
+            flows.append(('unstake', args['netuid'], args[UNSTAKE_CALLS[function]]))
+        elif function in SWAP_CALLS and args['origin_netuid'] != args['destination_netuid']:
+            flows.append(('swap', args['destination_netuid'], args['alpha_amount'], args['origin_netuid']))
+        return flows
+    for value in args.values():
+        if isinstance(value, dict) and 'call_module' in value:
+            flows.extend(staking_flows(value))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and 'call_module' in item:
+                    flows.extend(staking_flows(item))
+    return flows
+
+
+def apply_flow(pool: PoolView, tao: float, alpha: float) -> PoolView:
+    """
+    Pool after `alpha` rao is sold into it and `tao` rao is spent on it.
+
+    Sells are applied first, then buys, on the constant-product curve with the
+    pool's swap fee. Non-dynamic and empty pools are returned unchanged.
+    """
+    if not pool.is_dynamic or pool.tao_in_rao == 0 or pool.alpha_in_rao == 0 or (tao == 0 and alpha == 0):
+        return pool
+    k = float(pool.tao_in_rao) * float(pool.alpha_in_rao)
+    alpha_in = pool.alpha_in_rao + alpha * (1 - pool.fee)
+    tao_in = k / alpha_in + tao * (1 - pool.fee)
+    alpha_in = k / tao_in
+    return PoolView(
+        netuid=pool.netuid,
+        tao_in_rao=int(tao_in),
+        alpha_in_rao=int(alpha_in),
+        price_float=tao_in / alpha_in,
+        fee_rate=pool.fee_rate,
+        is_dynamic=pool.is_dynamic,
+    )
+
+
+class PendingFlow:
+    def __init__(self, network: str = 'finney', interval: float = 1.0, substrate: SubstrateInterface = None):
+        """
+        Initialize the PendingFlow object.
+
+        Args:
+            network: Network whose node is polled
+            interval: Seconds between polls when running in the background
+            substrate: Connection to poll through (default: a new one; it must not be shared with other threads)
+        """
+        if substrate is None and network not in RPC_ENDPOINTS:
+            raise ValueError(f"Invalid network: {network}")
+        self.substrate = substrate or SubstrateInterface(
+            url=RPC_ENDPOINTS[network],
+            ss58_format=42,
+            type_registry_preset='substrate-node-template',
+        )
+        self.interval = interval
+        # Published snapshot: netuid -> NetFlow, replaced as a whole after each poll
+        self.flows: dict[int, NetFlow] = {}
+        self.polled_at = 0.0
+        self.started_at = 0.0
+        self._polled = threading.Event()
+        self._seen: dict[str, list[tuple]] = {}
+        self._tao: dict[int, int] = {}
+        self._alpha: dict[int, int] = {}
+        self._swaps: dict[int, dict[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _decode(self, data: str) -> list[tuple]:
+        try:
+            extrinsic = self.substrate.runtime_config.create_scale_object(
+                'Extrinsic', data=ScaleBytes(data), metadata=self.substrate.metadata,
+            )
+            extrinsic.decode()
+            return staking_flows(extrinsic.value['call'])
+        except Exception:
+            # Undecodable (e.g. signed against another runtime): it cannot be ours to count
+            return []
+
+    def _apply(self, flows: list[tuple], sign: int) -> None:
+        for flow in flows:
+            kind, netuid, amount = flow[:3]
+            if kind == 'stake':
+                self._tao[netuid] = self._tao.get(netuid, 0) + sign * amount
+            elif kind == 'unstake':
+                self._alpha[netuid] = self._alpha.get(netuid, 0) + sign * amount
+            else:
+                origin = flow[3]
+                self._alpha[origin] = self._alpha.get(origin, 0) + sign * amount
+                swaps = self._swaps.setdefault(netuid, {})
+                swaps[origin] = swaps.get(origin, 0) + sign * amount
+
+    def _publish(self) -> None:
+        flows = {}
+        for netuid in set(self._tao) | set(self._alpha) | set(self._swaps):
+            swaps = tuple((origin, alpha) for origin, alpha in self._swaps.get(netuid, {}).items() if alpha)
+            flow = NetFlow(self._tao.get(netuid, 0), self._alpha.get(netuid, 0), swaps)
+            if flow.tao or flow.alpha or flow.swaps:
+                flows[netuid] = flow
+        self.flows = flows
+
+    def poll(self) -> int:
+        """
+        Read the node's pending pool once and update the published flows.
+
+        Returns:
+            number of extrinsics decoded on this poll
+        """
+        if self.substrate.metadata is None:
+            self.substrate.init_runtime()
+        pending = self.substrate.rpc_request('author_pendingExtrinsics', [])['result'] or []
+        current = set(pending)
+        for data in [data for data in self._seen if data not in current]:
+            self._apply(self._seen.pop(data), -1)
+        decoded = 0
+        for data in pending:
+            if data not in self._seen:
+                flows = self._decode(data)
+                self._seen[data] = flows
+                self._apply(flows, 1)
+                decoded += 1
+        self._publish()
+        self.polled_at = time.time()
+        self._polled.set()
+        return decoded
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Pending pool poll failed: {e}", file=sys.stderr)
+            self._stop.wait(self.interval)
+
+    def start(self) -> "PendingFlow":
+        """Poll in a background thread until `stop()`."""
+        if self._thread is None:
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the first poll; whether it has completed."""
+        return self._polled.wait(timeout)
+
+    def fresh(self, max_age: float = MAX_AGE) -> bool:
+        """Whether the published flows are from a poll within `max_age` seconds."""
+        return self._polled.is_set() and time.time() - self.polled_at <= max_age
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def adjust(self, pools: PoolState, netuid: int) -> PoolView:
+        """
+        Pool `netuid` as an extrinsic submitted now is expected to meet it.
+
+        TAO swapped in from other subnets is valued at the origin pool's price
+        in the same snapshot.
+        """
+        pool = pools[netuid]
+        flow = self.flows.get(netuid)
+        if flow is None:
+            return pool
+        tao = flow.tao
+        for origin, alpha in flow.swaps:
+            source = pools.get(origin)
+            if source is not None:
+                tao += alpha * source.price_float
+        return apply_flow(pool, tao, flow.alpha)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Watch pending staking flow per subnet on our node",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--network', type=str, default='finney', help='Network name')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls')
+    parser.add_argument('--netuids', type=int, nargs='*', help='Only show these netuids')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    args = create_parser().parse_args()
+    try:
+        watcher = PendingFlow(network=args.network, interval=args.interval)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    try:
+        while True:
+            started = time.perf_counter()
+            decoded = watcher.poll()
+            pools = PoolState.from_substrate(watcher.substrate) if watcher.flows else None
+            print(f"----{len(watcher._seen)} pending, {decoded} new ({(time.perf_counter() - started) * 1000:.0f} ms)")
+            for netuid, flow in sorted(watcher.flows.items()):
+                if args.netuids and netuid not in args.netuids or netuid not in pools:
+                    continue
+                pool = pools[netuid]
+                adjusted = watcher.adjust(pools, netuid)
+                print(f"netuid {netuid}: +{flow.tao / 1e9:.4f} TAO, -{flow.alpha / 1e9:.4f} alpha, "
+                      f"{len(flow.swaps)} swaps in; price {pool.price_float:.6f} -> {adjusted.price_float:.6f}")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Historical pool-reserve ingestion into memory-mapped columnar files.
+
+Walks a block range, batch-reads SubnetTAO/SubnetAlphaIn for the chosen
+netuids at each historical block hash, and appends one row per
+(block, netuid) to append-only column files:
+
+    <out>/block.u32  <out>/netuid.u16  <out>/tao_in.u64  <out>/alpha_in.u64  <out>/price.f64
+
+Re-running with the same output directory resumes after the last stored block.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from substrateinterface import SubstrateInterface
+from modules import RPC_ENDPOINTS
+from pool_state import spot_price
+
+COLUMNS = {
+    'block': np.uint32,
+    'netuid': np.uint16,
+    'tao_in': np.uint64,
+    'alpha_in': np.uint64,
+    'price': np.float64,
+}
+SUFFIX = {
+    'block': 'u32',
+    'netuid': 'u16',
+    'tao_in': 'u64',
+    'alpha_in': 'u64',
+    'price': 'f64',
+}
+META_FILE = 'meta.json'
+
+
+def column_path(path: str, column: str) -> str:
+    return os.path.join(path, f"{column}.{SUFFIX[column]}")
+
+
+def load_history(path: str) -> dict[str, np.ndarray]:
+    """
+    Open the stored columns as read-only memory maps.
+
+    Rows are trimmed to the shortest column, so a partially written last
+    batch is never visible.
+    """
+    rows = _stored_rows(path)
+    columns = {}
+    for column, dtype in COLUMNS.items():
+        if rows == 0:
+            columns[column] = np.empty(0, dtype=dtype)
+        else:
+            columns[column] = np.memmap(column_path(path, column), dtype=dtype, mode='r', shape=(rows,))
+    return columns
+
+
+def _stored_rows(path: str) -> int:
+    rows = None
+    for column, dtype in COLUMNS.items():
+        file = column_path(path, column)
+        size = os.path.getsize(file) if os.path.exists(file) else 0
+        n = size // np.dtype(dtype).itemsize
+        rows = n if rows is None else min(rows, n)
+    return rows or 0
+
+
+class PoolHistoryWriter:
+    def __init__(self, path: str, network: str, netuids: list[int]):
+        """
+        Initialize the PoolHistoryWriter object.
+
+        Args:
+            path: Output directory for the column files
+            network: Network name the data comes from
+            netuids: Subnet IDs to record
+        """
+        self.path = path
+        self.netuids = sorted(netuids)
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        meta = {'network': network, 'netuids': self.netuids}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                stored = json.load(f)
+            if stored != meta:
+                raise ValueError(f"{path} holds {stored}, not {meta}")
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+
+        self._repair()
+        self.files = {column: open(column_path(path, column), 'ab') for column in COLUMNS}
+
+    def _repair(self) -> None:
+        """Truncate every column to the last complete block after an interrupted write."""
+        rows = _stored_rows(self.path)
+        rows -= rows % len(self.netuids)
+        for column, dtype in COLUMNS.items():
+            file = column_path(self.path, column)
+            if os.path.exists(file):
+                os.truncate(file, rows * np.dtype(dtype).itemsize)
+
+    def last_block(self) -> int | None:
+        rows = _stored_rows(self.path)
+        if rows == 0:
+            return None
+        block = np.memmap(column_path(self.path, 'block'), dtype=np.uint32, mode='r', shape=(rows,))
+        return int(block[-1])
+
+    def append(self, block: int, tao_in: list[int], alpha_in: list[int]) -> None:
+        """
+        Append one row per netuid for `block`.
+        """
+        n = len(self.netuids)
+        netuid = np.asarray(self.netuids, dtype=np.uint16)
+        tao = np.asarray(tao_in, dtype=np.uint64)
+        alpha = np.asarray(alpha_in, dtype=np.uint64)
+        data = {
+            'block': np.full(n, block, dtype=np.uint32),
+            'netuid': netuid,
+            'tao_in': tao,
+            'alpha_in': alpha,
+            'price': spot_price(netuid, tao, alpha),
+        }
+        for column in COLUMNS:
+            self.files[column].write(data[column].tobytes())
+
+    def flush(self) -> None:
+        # Write the block column last so a crash never records a block whose data is missing
+        for column in COLUMNS:
+            if column != 'block':
+                self.files[column].flush()
+        self.files['block'].flush()
+
+    def close(self) -> None:
+        self.flush()
+        for f in self.files.values():
+            f.close()
+
+
+class PoolHistoryReader:
+    def __init__(self, network: str, netuids: list[int], workers: int):
+        """
+        Initialize the PoolHistoryReader object.
+
+        Args:
+            network: Network name
+            netuids: Subnet IDs to read
+            workers: Number of concurrent connections
+        """
+        if network not in RPC_ENDPOINTS:
+            raise ValueError(f"Invalid network: {network}")
+        self.network = network
+        self.netuids = sorted(netuids)
+        self.workers = workers
+        self._local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _substrate(self) -> SubstrateInterface:
+        substrate = getattr(self._local, 'substrate', None)
+        if substrate is None:
+            substrate = SubstrateInterface(
+                url=RPC_ENDPOINTS[self.network],
+                ss58_format=42,
+                type_registry_preset='substrate-node-template',
+            )
+            self._local.substrate = substrate
+        return substrate
+
+    def head(self) -> int:
+        return self._substrate().get_block_number(None)
+
+    def read_block(self, block: int) -> tuple[int, list[int], list[int]]:
+        """
+        Read the reserves of every netuid at `block` with a single query_multi.
+        """
+        substrate = self._substrate()
+        block_hash = substrate.get_block_hash(block)
+        keys = [
+            substrate.create_storage_key('SubtensorModule', storage_function, [netuid])
+            for storage_function in ('SubnetTAO', 'SubnetAlphaIn')
+            for netuid in self.netuids
+        ]
+        values = [value.value or 0 for _, value in substrate.query_multi(keys, block_hash=block_hash)]
+        n = len(self.netuids)
+        return block, values[:n], values[n:]
+
+    def read_range(self, start: int, end: int, batch: int):
+        """
+        Yield (block, tao_in, alpha_in) for start..end inclusive, in block order.
+
+        At most `batch` blocks are in flight across the worker connections.
+        """
+        for batch_start in range(start, end + 1, batch):
+            blocks = range(batch_start, min(batch_start + batch, end + 1))
+            yield from self.executor.map(self.read_block, blocks)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Ingest historical pool reserves into memory-mapped column files",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--network', type=str, default='finney', help='Network name (test/finney)')
+    parser.add_argument('--netuids', type=int, nargs='+', required=True, help='Subnet IDs to record')
+    parser.add_argument('--start', type=int, required=True, help='First block of the range')
+    parser.add_argument('--end', type=int, default=None, help='Last block of the range (default: current head)')
+    parser.add_argument('--out', type=str, default='data/pools', help='Output directory')
+    parser.add_argument('--workers', type=int, default=8, help='Number of concurrent connections')
+    parser.add_argument('--batch', type=int, default=256, help='Blocks in flight per flush')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    parser = create_parser()
+    args = parser.parse_args()
+
+    try:
+        reader = PoolHistoryReader(args.network, args.netuids, args.workers)
+        writer = PoolHistoryWriter(args.out, args.network, args.netuids)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    end = args.end if args.end is not None else reader.head()
+    last = writer.last_block()
+    start = args.start if last is None else max(args.start, last + 1)
+    if start > end:
+        print(f"Nothing to do: {args.out} already holds blocks up to {last}")
+        return
+    print(f"Ingesting blocks {start}..{end} for netuids {writer.netuids} into {args.out}")
+
+    done = 0
+    try:
+        for block, tao_in, alpha_in in reader.read_range(start, end, args.batch):
+            writer.append(block, tao_in, alpha_in)
+            done += 1
+            if done % args.batch == 0:
+                writer.flush()
+                print(f"----block {block} ({done}/{end - start + 1})")
+    except KeyboardInterrupt:
+        print("Interrupted, progress saved.")
+    finally:
+        writer.close()
+        reader.close()
+    print(f"Stored up to block {writer.last_block()}")
+
+
+if __name__ == "__main__":
+    main()
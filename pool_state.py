@@ -0,0 +1,314 @@
+"""
+Compact pool-state table for all subnets.
+
+`subtensor.all_subnets()` builds a full `DynamicInfo` object (with nested
+`Balance` objects) per subnet. `PoolState` keeps only what the slippage and
+limit-price helpers need, as parallel NumPy arrays decoded straight from the
+SCALE storage maps, and hands out light `PoolView` records on demand.
+"""
+
+import numpy as np
+from bittensor.utils.balance import Balance
+from substrateinterface.exceptions import StorageFunctionNotFound
+
+U16_MAX = 65535
+# Swap.FeeRate default on subtensor, in parts of u16::MAX (~0.05 %)
+DEFAULT_FEE_RATE = 33
+# Largest page the node accepts for state_getKeysPaged
+PAGE_SIZE = 1000
+
+
+def _query_map(substrate, module: str, storage_function: str, block_hash: str = None) -> dict:
+    """
+    Read a whole single-key storage map into a {key: value} dict.
+
+    Returns an empty dict if the storage function does not exist on this
+    runtime. RPC and transport errors are raised, so a failed read is never
+    mistaken for an empty map.
+    """
+    try:
+        result = substrate.query_map(
+            module=module,
+            storage_function=storage_function,
+            block_hash=block_hash,
+            page_size=PAGE_SIZE,
+        )
+    except StorageFunctionNotFound:
+        return {}
+    return {key.value: value.value for key, value in result}
+
+
+class PoolView:
+    """
+    Read-only view of one subnet pool.
+
+    Exposes the same accessors as `DynamicInfo` that `RonProxy` relies on
+    (`price`, `tao_in`, `alpha_in`, `is_dynamic`, `tao_to_alpha*`,
+    `alpha_to_tao*`), backed by plain ints instead of `Balance` objects.
+    """
+    __slots__ = ('netuid', 'tao_in_rao', 'alpha_in_rao', 'price_float', 'fee_rate', 'is_dynamic')
+
+    def __init__(self, netuid: int, tao_in_rao: int, alpha_in_rao: int, price_float: float,
+                 fee_rate: int, is_dynamic: bool):
+        self.netuid = netuid
+        self.tao_in_rao = tao_in_rao
+        self.alpha_in_rao = alpha_in_rao
+        self.price_float = price_float
+        self.fee_rate = fee_rate
+        self.is_dynamic = is_dynamic
+
+    @property
+    def tao_in(self) -> Balance:
+        return Balance.from_rao(self.tao_in_rao)
+
+    @property
+    def alpha_in(self) -> Balance:
+        return Balance.from_rao(self.alpha_in_rao, netuid=self.netuid)
+
+    @property
+    def price(self) -> Balance:
+        return Balance.from_tao(self.price_float)
+
+    @property
+    def k(self) -> int:
+        return self.tao_in_rao * self.alpha_in_rao
+
+    @property
+    def fee(self) -> float:
+        """Swap fee as a fraction of the input amount."""
+        return self.fee_rate / U16_MAX
+
+    def tao_to_alpha(self, tao: Balance) -> Balance:
+        if self.price_float == 0:
+            return Balance.from_rao(0, netuid=self.netuid)
+        return Balance.from_tao(tao.tao / self.price_float, netuid=self.netuid)
+
+    def alpha_to_tao(self, alpha: Balance) -> Balance:
+        return Balance.from_tao(alpha.tao * self.price_float)
+
+    def tao_to_alpha_with_slippage(self, tao: Balance) -> tuple[Balance, Balance]:
+        """
+        Alpha received for `tao` on the constant-product curve, and the slippage.
+        """
+        if not self.is_dynamic:
+            return Balance.from_rao(tao.rao, netuid=self.netuid), Balance.from_rao(0, netuid=self.netuid)
+        new_tao_in = self.tao_in_rao + tao.rao
+        if new_tao_in == 0:
+            return tao, Balance.from_rao(0)
+        alpha_returned = Balance.from_rao(int(self.alpha_in_rao - self.k / new_tao_in), netuid=self.netuid)
+        alpha_ideal = self.tao_to_alpha(tao)
+        slippage = alpha_ideal - alpha_returned if alpha_ideal.rao > alpha_returned.rao else Balance.from_rao(0, netuid=self.netuid)
+        return alpha_returned, slippage
+
+    def alpha_to_tao_with_slippage(self, alpha: Balance) -> tuple[Balance, Balance]:
+        """
+        TAO received for `alpha` on the constant-product curve, and the slippage.
+        """
+        if not self.is_dynamic:
+            return Balance.from_rao(alpha.rao), Balance.from_rao(0)
+        new_alpha_in = self.alpha_in_rao + alpha.rao
+        if new_alpha_in == 0:
+            return Balance.from_rao(alpha.rao), Balance.from_rao(0)
+        tao_returned = Balance.from_rao(int(self.tao_in_rao - self.k / new_alpha_in))
+        tao_ideal = self.alpha_to_tao(alpha)
+        slippage = tao_ideal - tao_returned if tao_ideal.rao > tao_returned.rao else Balance.from_rao(0)
+        return tao_returned, slippage
+
+    def __repr__(self) -> str:
+        return (f"PoolView(netuid={self.netuid}, tao_in={self.tao_in_rao}, "
+                f"alpha_in={self.alpha_in_rao}, price={self.price_float})")
+
+
+class PoolState:
+    """
+    Pool reserves and fee parameters for every subnet, as parallel arrays.
+
+    Rows are sorted by netuid. Per-netuid lookups go through a dense index
+    array, so `pools[netuid]` is O(1) and allocates a single `PoolView`.
+    """
+    __slots__ = ('block_hash', 'netuid', 'tao_in', 'alpha_in', 'price', 'fee_rate', 'is_dynamic', '_index')
+
+    def __init__(self, netuid, tao_in, alpha_in, fee_rate, is_dynamic, block_hash: str = None):
+        """
+        Initialize the PoolState object.
+
+        Args:
+            netuid: Subnet IDs
+            tao_in: TAO reserves in rao
+            alpha_in: Alpha reserves in rao
+            fee_rate: Swap fee rates in parts of u16::MAX
+            is_dynamic: Whether each subnet uses the dynamic (AMM) mechanism
+            block_hash: Block the state was read at (None for best block)
+        """
+        order = np.argsort(np.asarray(netuid, dtype=np.uint16), kind='stable')
+        self.block_hash = block_hash
+        self.netuid = np.asarray(netuid, dtype=np.uint16)[order]
+        self.tao_in = np.asarray(tao_in, dtype=np.uint64)[order]
+        self.alpha_in = np.asarray(alpha_in, dtype=np.uint64)[order]
+        self.fee_rate = np.asarray(fee_rate, dtype=np.uint16)[order]
+        self.is_dynamic = np.asarray(is_dynamic, dtype=np.bool_)[order]
+        self.price = spot_price(self.netuid, self.tao_in, self.alpha_in)
+
+        size = int(self.netuid.max()) + 1 if len(self.netuid) else 0
+        self._index = np.full(size, -1, dtype=np.int32)
+        self._index[self.netuid] = np.arange(len(self.netuid), dtype=np.int32)
+
+    @classmethod
+    def from_substrate(cls, substrate, block_hash: str = None) -> "PoolState":
+        """
+        Read the pool table from chain storage in one pass per storage map.
+
+        Args:
+            substrate: Connected SubstrateInterface
+            block_hash: Block to read at (None for best block)
+        """
+        tao_in = _query_map(substrate, 'SubtensorModule', 'SubnetTAO', block_hash)
+        alpha_in = _query_map(substrate, 'SubtensorModule', 'SubnetAlphaIn', block_hash)
+        mechanism = _query_map(substrate, 'SubtensorModule', 'SubnetMechanism', block_hash)
+        fee_rate = _query_map(substrate, 'Swap', 'FeeRate', block_hash)
+
+        netuids = sorted(set(tao_in) | set(alpha_in) | set(mechanism))
+        return cls(
+            netuid=netuids,
+            tao_in=[tao_in.get(n, 0) for n in netuids],
+            alpha_in=[alpha_in.get(n, 0) for n in netuids],
+            fee_rate=[fee_rate.get(n, DEFAULT_FEE_RATE) for n in netuids],
+            is_dynamic=[mechanism.get(n, 0) == 1 for n in netuids],
+            block_hash=block_hash,
+        )
+
+    @classmethod
+    def from_buffers(cls, netuid, tao_in, alpha_in, price, fee_rate, is_dynamic, index,
+                     block_hash: str = None) -> "PoolState":
+        """
+        Wrap arrays that are already sorted by netuid, without copying them.
+
+        Args:
+            netuid, tao_in, alpha_in, price, fee_rate, is_dynamic: Row arrays with the dtypes `__init__` produces
+            index: Dense netuid -> row array (-1 where the subnet does not exist)
+            block_hash: Block the arrays were read at
+        """
+        state = cls.__new__(cls)
+        state.block_hash = block_hash
+        state.netuid = netuid
+        state.tao_in = tao_in
+        state.alpha_in = alpha_in
+        state.price = price
+        state.fee_rate = fee_rate
+        state.is_dynamic = is_dynamic
+        state._index = index
+        return state
+
+    def row(self, netuid: int) -> int:
+        """Row of `netuid` in the arrays, or -1 if the subnet does not exist."""
+        if netuid < 0 or netuid >= len(self._index):
+            return -1
+        return int(self._index[netuid])
+
+    def get(self, netuid: int) -> PoolView | None:
+        i = self.row(netuid)
+        if i < 0:
+            return None
+        return PoolView(
+            netuid=netuid,
+            tao_in_rao=int(self.tao_in[i]),
+            alpha_in_rao=int(self.alpha_in[i]),
+            price_float=float(self.price[i]),
+            fee_rate=int(self.fee_rate[i]),
+            is_dynamic=bool(self.is_dynamic[i]),
+        )
+
+    def __getitem__(self, netuid: int) -> PoolView:
+        view = self.get(netuid)
+        if view is None:
+            raise KeyError(f"Subnet {netuid} does not exist")
+        return view
+
+    def __contains__(self, netuid: int) -> bool:
+        return self.row(netuid) >= 0
+
+    def __len__(self) -> int:
+        return len(self.netuid)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the backing arrays in bytes."""
+        return sum(getattr(self, name).nbytes for name in
+                   ('netuid', 'tao_in', 'alpha_in', 'price', 'fee_rate', 'is_dynamic', '_index'))
+
+
+def spot_price(netuid, tao_in, alpha_in) -> np.ndarray:
+    """
+    Spot price (TAO per alpha) from reserves. Root and empty pools price at 1.
+    """
+    tao = np.asarray(tao_in, dtype=np.float64) / 1e9
+    alpha = np.asarray(alpha_in, dtype=np.float64) / 1e9
+    price = np.ones_like(tao)
+    mask = (np.asarray(netuid) != 0) & (alpha > 0)
+    np.divide(tao, alpha, out=price, where=mask)
+    return price
+
+
+def buy_alpha(tao_in, alpha_in, tao, fee: float = 0.0):
+    """
+    Constant-product TAO->alpha swap, vectorized over NumPy arrays.
+
+    Args:
+        tao_in: TAO reserves
+        alpha_in: Alpha reserves
+        tao: TAO paid in (before fee)
+        fee: Swap fee as a fraction of the input
+
+    Returns:
+        tuple of (alpha received, pool price after the swap)
+    """
+    tao_in = np.asarray(tao_in, dtype=np.float64)
+    alpha_in = np.asarray(alpha_in, dtype=np.float64)
+    new_tao = tao_in + np.asarray(tao, dtype=np.float64) * (1 - fee)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new_alpha = tao_in * alpha_in / new_tao
+        post_price = new_tao / new_alpha
+    return alpha_in - new_alpha, post_price
+
+
+def sell_alpha(tao_in, alpha_in, alpha, fee: float = 0.0):
+    """
+    Constant-product alpha->TAO swap, vectorized over NumPy arrays.
+
+    Args:
+        tao_in: TAO reserves
+        alpha_in: Alpha reserves
+        alpha: Alpha sold (before fee)
+        fee: Swap fee as a fraction of the input
+
+    Returns:
+        tuple of (TAO received, pool price after the swap)
+    """
+    tao_in = np.asarray(tao_in, dtype=np.float64)
+    alpha_in = np.asarray(alpha_in, dtype=np.float64)
+    new_alpha = alpha_in + np.asarray(alpha, dtype=np.float64) * (1 - fee)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new_tao = tao_in * alpha_in / new_alpha
+        post_price = new_tao / new_alpha
+    return tao_in - new_tao, post_price
+
+
+def quote_swap(origin: PoolView, dest: PoolView, alpha: int) -> tuple[int, int, float]:
+    """
+    Quote moving `alpha` rao from the origin pool to the destination pool.
+
+    Sells alpha for TAO on `origin`, then buys alpha with that TAO on `dest`,
+    both against the same snapshot.
+
+    Returns:
+        tuple of (TAO out of origin, alpha out of dest, origin/dest price ratio after the swap)
+    """
+    if origin.is_dynamic:
+        tao, origin_post = sell_alpha(origin.tao_in_rao, origin.alpha_in_rao, alpha, origin.fee)
+    else:
+        tao, origin_post = alpha, origin.price_float
+    if dest.is_dynamic:
+        alpha_out, dest_post = buy_alpha(dest.tao_in_rao, dest.alpha_in_rao, tao, dest.fee)
+    else:
+        alpha_out, dest_post = tao, dest.price_float
+    return int(tao), int(alpha_out), float(origin_post) / float(dest_post)
@@ -5,7 +5,8 @@ Proxy script for blockchain staking operations.
 
 import argparse
 import sys
-from modules import RonProxy
+from modules import RonProxy, MAX_BATCH_CALLS
+from state_server import StateReader
 from bittensor.utils.balance import Balance
 
 
@@ -23,6 +24,8 @@ def create_parser() -> argparse.ArgumentParser:
     add_parser.add_argument('--netuid', type=int, required=True, help='Network/subnet ID')
     add_parser.add_argument('--hotkey', type=str, required=True, help='Hotkey address')
     add_parser.add_argument('--amount', type=float, help='Amount to stake')
+    add_parser.add_argument('--tol', type=float, default=0.005, help='tolerance limit to be used')
+    add_parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
     
     # Remove stake command
     remove_parser = subparsers.add_parser('removestake', help='Remove stake from a subnet')
@@ -30,6 +33,8 @@ def create_parser() -> argparse.ArgumentParser:
     remove_parser.add_argument('--hotkey', type=str, required=True, help='Hotkey address')
     remove_parser.add_argument('--amount', type=float, default=0, help='Amount to unstake')
     remove_parser.add_argument('--all', action='store_true', help='Remove all staked balance')
+    remove_parser.add_argument('--tol', type=float, default=0.005, help='tolerance limit to be used')
+    remove_parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
     
     # Swap stake command
     swap_parser = subparsers.add_parser('swapstake', help='Swap stake between subnets')
@@ -38,6 +43,33 @@ def create_parser() -> argparse.ArgumentParser:
     swap_parser.add_argument('--dest-netuid', type=int, required=True, help='Destination subnet ID')
     swap_parser.add_argument('--amount', type=float, default=0, help='Amount to swap')
     swap_parser.add_argument('--all', action='store_true', help='Swap all available balance')
+    swap_parser.add_argument('--tol', type=float, default=0.005, help='tolerance limit to be used')
+    swap_parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    
+    # Exit all command
+    exit_parser = subparsers.add_parser('exit-all', help='Unstake every position across all subnets')
+    exit_parser.add_argument('--tol', type=float, default=0.05, help='tolerance limit to be used')
+    exit_parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    
+    # Execute command
+    execute_parser = subparsers.add_parser('execute', help='Execute a JSON-lines order stream without prompts')
+    execute_parser.add_argument('--orders', type=str, default='-', help='JSON-lines order file ("-" for stdin)')
+    execute_parser.add_argument('--policy', type=str, help='JSON file with OrderPolicy limits')
+    execute_parser.add_argument('--max-tao', type=float, help='Largest order in TAO')
+    execute_parser.add_argument('--max-total-tao', type=float, help='Total TAO traded in this run')
+    execute_parser.add_argument('--max-tol', type=float, help='Largest accepted tolerance')
+    execute_parser.add_argument('--netuids', type=int, nargs='*', help='Allowed netuids')
+    execute_parser.add_argument('--pending', action='store_true', help='Fold pending staking extrinsics into quotes')
+    
+    # Rebalance command
+    rebalance_parser = subparsers.add_parser('rebalance', help='Move stake to target weights per hotkey and subnet')
+    rebalance_parser.add_argument('--targets', type=str, required=True, help='JSON file with hotkey/netuid/weight targets')
+    rebalance_parser.add_argument('--tol', type=float, default=0.01, help='tolerance limit to be used')
+    rebalance_parser.add_argument('--min-trade', type=float, default=0.1, help='Smallest move worth making, in TAO')
+    rebalance_parser.add_argument('--use-balance', action='store_true', help='Also invest the free balance')
+    rebalance_parser.add_argument('--batch-size', type=int, default=MAX_BATCH_CALLS, help='Calls per batch extrinsic')
+    rebalance_parser.add_argument('--dry-run', action='store_true', help='Only print the plan')
+    rebalance_parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
     
     return parser
 
@@ -60,6 +92,30 @@ def validate_args(args: argparse.Namespace) -> bool:
     return True
 
 
+def execute_orders(ron_proxy: RonProxy, args: argparse.Namespace) -> None:
+    """Run the order stream; result lines go to stdout, progress to stderr."""
+    from execute import OrderExecutor, OrderPolicy
+
+    policy = OrderPolicy.load(args.policy) if args.policy else OrderPolicy()
+    if args.max_tao is not None:
+        policy.max_tao = args.max_tao
+    if args.max_total_tao is not None:
+        policy.max_total_tao = args.max_total_tao
+    if args.max_tol is not None:
+        policy.max_tolerance = args.max_tol
+    if args.netuids:
+        policy.netuids = args.netuids
+
+    ron_proxy.proxy_wallet.unlock_coldkey()
+    stream = sys.stdin if args.orders == '-' else open(args.orders)
+    try:
+        results = OrderExecutor(ron_proxy, policy).run(stream)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(f"Finished: {results}", file=sys.stderr)
+
+
 def main():
     """Main entry point."""
     # Import environment variables
@@ -95,35 +151,65 @@ def main():
         sys.exit(1)
         
     # Initialize RonProxy object
+    interactive = not getattr(args, 'yes', False) and args.command != 'execute'
+    pending_flow = None
+    if getattr(args, 'pending', False):
+        from pending_pool import PendingFlow
+        pending_flow = PendingFlow(network=network).start()
     ron_proxy = RonProxy(
         proxy_wallet=proxy_wallet,
         network=network,
         delegator=delegator,
+        interactive=interactive,
+        pending_flow=pending_flow,
+        state_reader=StateReader.attach(network),
     )
-    print(f"Initialized RonProxy object for {network} network")
+    print(f"Initialized RonProxy object for {network} network", file=sys.stdout if interactive else sys.stderr)
     
     try:
         if args.command == 'addstake':
             ron_proxy.add_stake(
+                wallet=proxy_wallet,
                 netuid=args.netuid,
                 hotkey=args.hotkey,
                 amount=Balance.from_tao(args.amount),
+                tolerance=args.tol,
             )
         elif args.command == 'removestake':
             ron_proxy.remove_stake(
+                wallet=proxy_wallet,
                 netuid=args.netuid,
                 hotkey=args.hotkey,
                 amount=Balance.from_tao(args.amount, netuid=args.netuid),
+                tolerance=args.tol,
                 all=args.all,
             )
         elif args.command == 'swapstake':
-            ron_proxy.swap_stake(
+            ron_proxy.swap_stake_limit(
                 hotkey=args.hotkey,
                 origin_netuid=getattr(args, 'origin_netuid'),
                 dest_netuid=getattr(args, 'dest_netuid'),
                 amount=Balance.from_tao(args.amount, netuid=getattr(args, 'origin_netuid')),
+                tolerance=args.tol,
                 all=args.all,
             )
+        elif args.command == 'exit-all':
+            ron_proxy.exit_all(
+                tolerance=args.tol,
+                confirm=not args.yes,
+            )
+        elif args.command == 'execute':
+            execute_orders(ron_proxy, args)
+        elif args.command == 'rebalance':
+            from rebalance import Rebalancer, load_targets
+            Rebalancer(
+                ron_proxy,
+                load_targets(args.targets),
+                tolerance=args.tol,
+                min_trade=Balance.from_tao(args.min_trade).rao,
+                use_balance=args.use_balance,
+                batch_size=args.batch_size,
+            ).run(confirm=not args.yes, dry_run=args.dry_run)
     
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,215 @@
+"""
+Rate-limit-aware operation scheduler for proxied staking calls.
+
+Subtensor allows one staking operation per (hotkey, coldkey, netuid) per
+block (`StakingOperationRateLimiter`, cleared every block) and throttles some
+calls per coldkey with `TxRateLimit`/`LastTxBlock`. Firing several proxy
+calls at once therefore gets some of them rejected after a full block wait.
+
+`RateLimitScheduler` keeps a local model of when each slot becomes free,
+seeded from chain storage, and releases each queued operation at the
+earliest block where all of its slots are free. Operations released in the
+same block are broadcast back to back with consecutive nonces.
+"""
+
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+
+from modules import PENDING_TIMEOUT, RonProxy
+
+# Blocks a staking slot stays busy after an operation
+STAKING_SPAN = 1
+# Retries for an operation the chain still rejected as rate limited
+MAX_RETRIES = 3
+
+
+def staking_slots(coldkey: str, hotkey: str, *netuids: int) -> list[tuple]:
+    """Slots touched by a staking call on `netuids` (two for swaps/moves)."""
+    return [('staking', hotkey, coldkey, netuid) for netuid in netuids]
+
+
+@dataclass
+class ScheduledOp:
+    call: object
+    slots: list
+    label: str = ''
+    proxy_type: str = 'Staking'
+    earliest: int = 0
+    retries: int = 0
+    status: str = 'queued'
+    block: int | None = None
+    extrinsic: str | None = None
+    submitted_at: float | None = None
+    error: object = None
+    receipt: object = field(default=None, repr=False)
+
+
+def is_rate_limit_error(error_message) -> bool:
+    if isinstance(error_message, dict):
+        error_message = error_message.get('name', '')
+    return 'RateLimit' in str(error_message)
+
+
+class RateLimitScheduler:
+    def __init__(self, ron_proxy: RonProxy, staking_span: int = STAKING_SPAN):
+        """
+        Initialize the RateLimitScheduler object.
+
+        Args:
+            ron_proxy: RonProxy the operations are submitted through
+            staking_span: Blocks a staking slot stays busy after use
+        """
+        self.ron_proxy = ron_proxy
+        self.staking_span = staking_span
+        self.tx_rate_limit = None
+        self.free_at: dict[tuple, int] = {}
+        self._synced: set[tuple] = set()
+        self._queue: list = []
+        self._seq = itertools.count()
+        self.pending: dict[str, ScheduledOp] = {}
+        self.ops: list[ScheduledOp] = []
+        self.nonce = None
+        self.rate_limited = 0
+
+    def schedule(self, call, slots: list, label: str = '', proxy_type: str = 'Staking') -> ScheduledOp:
+        """
+        Queue a call for the earliest block where all of its slots are free.
+        """
+        op = ScheduledOp(call=call, slots=slots, label=label, proxy_type=proxy_type)
+        self.ops.append(op)
+        self._push(op)
+        return op
+
+    def _push(self, op: ScheduledOp) -> None:
+        op.earliest = max([op.earliest] + [self.free_at.get(slot, 0) for slot in op.slots])
+        heapq.heappush(self._queue, (op.earliest, next(self._seq), op))
+
+    def _span(self, slot: tuple) -> int:
+        if slot[0] == 'tx':
+            return self.tx_rate_limit or 0
+        return self.staking_span
+
+    def sync_slot(self, slot: tuple, block: int, block_hash: str) -> None:
+        """Seed the local model for `slot` from chain storage."""
+        substrate = self.ron_proxy.substrate
+        if slot[0] == 'staking':
+            _, hotkey, coldkey, netuid = slot
+            used = substrate.query(
+                'SubtensorModule', 'StakingOperationRateLimiter', [hotkey, coldkey, netuid], block_hash=block_hash,
+            )
+            if used is not None and used.value:
+                self.free_at[slot] = max(self.free_at.get(slot, 0), block + 1)
+        else:
+            if self.tx_rate_limit is None:
+                self.tx_rate_limit = substrate.query('SubtensorModule', 'TxRateLimit', block_hash=block_hash).value
+            last = substrate.query('SubtensorModule', 'LastTxBlock', [slot[1]], block_hash=block_hash).value
+            if last:
+                self.free_at[slot] = max(self.free_at.get(slot, 0), last + self.tx_rate_limit)
+        self._synced.add(slot)
+
+    def _sync_queue(self, block: int, block_hash: str) -> None:
+        queued = [op for _, _, op in self._queue]
+        slots = {slot for op in queued for slot in op.slots} - self._synced
+        for slot in slots:
+            self.sync_slot(slot, block, block_hash)
+        if slots:
+            self._queue = []
+            for op in queued:
+                self._push(op)
+
+    def _reseed_nonce(self) -> None:
+        self._reseed_nonce()
+
+    def _dispatch(self, op: ScheduledOp, block: int) -> None:
+        try:
+            op.extrinsic = self.ron_proxy._broadcast_proxy_call(op.call, self.nonce, op.proxy_type)
+        except Exception as e:
+            op.status = 'failed'
+            op.error = str(e)
+            print(f"Error: {op.label}: {e}")
+            # Another process may have used the nonce, or the node may have taken it
+            self._reseed_nonce()
+            return
+        self.nonce += 1
+        op.submitted_at = time.time()
+        op.status = 'submitted'
+        op.block = block
+        for slot in op.slots:
+            self.free_at[slot] = block + self._span(slot)
+        self.pending[op.extrinsic] = op
+        print(f"----{op.label} submitted at block {block}: {op.extrinsic}")
+
+    def _settle(self, block: int, block_hash: str) -> None:
+        if not self.pending:
+            return
+        receipts = self.ron_proxy._included_receipts(block_hash, self.pending)
+        for extrinsic_hash, receipt in receipts.items():
+            op = self.pending.pop(extrinsic_hash)
+            op.receipt = receipt
+            error = self.ron_proxy._proxy_error(receipt)
+            if error is None:
+                op.status = 'done'
+                print(f"{op.label} succeeded in block {block}")
+            elif is_rate_limit_error(error) and op.retries < MAX_RETRIES:
+                # Our model was behind the chain: push the slots out and retry
+                self.rate_limited += 1
+                op.retries += 1
+                op.status = 'queued'
+                for slot in op.slots:
+                    self.free_at[slot] = max(self.free_at.get(slot, 0), block + self._span(slot))
+                self._push(op)
+            else:
+                op.status = 'failed'
+                op.error = error
+                print(f"Error: {op.label}: {error}")
+        dropped = False
+        for extrinsic_hash, op in list(self.pending.items()):
+            if block - op.block > PENDING_TIMEOUT:
+                del self.pending[extrinsic_hash]
+                op.status = 'dropped'
+                dropped = True
+                print(f"Error: {op.label} not included after {PENDING_TIMEOUT} blocks")
+        if dropped:
+            # Later operations must not be signed behind the nonce gap the dropped one left
+            self._reseed_nonce()
+
+    def on_block(self, number: int) -> None:
+        block_hash = self.ron_proxy.substrate.get_block_hash(number)
+        self._settle(number, block_hash)
+        self._sync_queue(number, block_hash)
+
+        # Next block is the earliest our broadcast can land in
+        target = number + 1
+        deferred = []
+        busy = set()
+        while self._queue and self._queue[0][0] <= target:
+            _, _, op = heapq.heappop(self._queue)
+            if any(self.free_at.get(slot, 0) > target or slot in busy for slot in op.slots):
+                deferred.append(op)
+                continue
+            busy.update(op.slots)
+            self._dispatch(op, target)
+        for op in deferred:
+            op.earliest = target + 1
+            self._push(op)
+
+    def done(self) -> bool:
+        return not self._queue and not self.pending
+
+    def run(self) -> list[ScheduledOp]:
+        """
+        Process the queue on new block headers until every operation has resolved.
+        """
+        self._reseed_nonce()
+
+        def handler(header, update_nr, subscription_id):
+            self.on_block(header['header']['number'])
+            if self.done():
+                return True
+
+        if not self.done():
+            self.ron_proxy.substrate.subscribe_block_headers(handler)
+        print(f"Finished {len(self.ops)} operations, {self.rate_limited} rate-limited retries")
+        return self.ops
@@ -0,0 +1,434 @@
+"""
+Rebalance the delegator's stake to target weights.
+
+Targets are a JSON list (or {"targets": [...]}) of
+
+    {"hotkey": "5...", "netuid": 5, "weight": 0.25}
+
+Weights are normalized to sum to 1. A position without a target is exited.
+Positions, free balance and pool reserves are read at one block. The
+portfolio is valued at spot prices, and each (hotkey, netuid) gets a delta
+to its target. Deltas below `min_trade` are left alone. Sells are netted
+against buys before anything touches a pool:
+
+1. Between hotkeys on the same subnet, alpha moves with move_stake. This
+   has no pool impact at all.
+2. Within one hotkey, alpha leaving a subnet goes straight into a subnet
+   that is under target with swap_stake_limit. A swap has the same pool
+   impact as a remove plus an add, but pays one fee and does not wait for
+   TAO to be freed.
+3. Between different hotkeys and subnets, the origin hotkey swaps the
+   alpha into the destination subnet with swap_stake_limit, and the alpha
+   the swap returned then moves to the destination hotkey with a
+   same-subnet move_stake. A cross-subnet move_stake takes no limit price,
+   so it is never used.
+
+What is left becomes remove_stake_limit and add_stake_limit calls.
+
+Limit prices are computed by replaying the plan, in submission order, on a
+copy of the reserves, so moves that hit the same pool are quoted against
+each other. Execution takes two rounds of Utility.force_batch extrinsics
+with consecutive nonces. Sells (swaps and removes) go first. The moves that
+follow a swap come next, sized to the alpha the swap actually returned,
+then the adds, re-quoted on a fresh snapshot and scaled to the TAO that is
+actually available. All calls allow partial fills.
+"""
+
+import json
+from dataclasses import dataclass, field
+
+from bittensor.utils.balance import Balance
+from modules import RonProxy, MAX_BATCH_CALLS, batch_item_results, stake_events
+from pool_state import PoolView, buy_alpha, sell_alpha
+
+# Deltas smaller than this are not traded (rao of TAO)
+MIN_TRADE = 100_000_000
+DEFAULT_TOLERANCE = 0.01
+
+
+@dataclass
+class Move:
+    side: str                       # 'move', 'swap', 'remove' or 'add'
+    hotkey: str
+    netuid: int
+    amount: int                     # rao: alpha for move/swap/remove, TAO for add
+    dest_netuid: int | None = None
+    dest_hotkey: str | None = None  # moves only
+    value: float = 0.0              # TAO value at spot when planned, rao
+    expected: int = 0               # rao: TAO for remove, alpha otherwise
+    quoted_price: float = 0.0       # TAO per alpha (origin/dest ratio for swaps)
+    limit_price: float = 0.0
+    status: str = 'planned'
+    error: object = None
+    events: list = field(default_factory=list)
+    follows: 'Move | None' = None   # moves only: the swap whose output this move carries on
+
+    def describe(self) -> str:
+        if self.side == 'move':
+            amount = Balance.from_rao(self.amount, netuid=self.netuid)
+            if self.follows is not None and self.status == 'planned':
+                amount = f"~{amount}, what the swap above returns"
+            return f"move   {self.hotkey[:8]} -> {self.dest_hotkey[:8]} netuid {self.netuid}: {amount}"
+        if self.side == 'swap':
+            return (f"swap   {self.hotkey[:8]} netuid {self.netuid} -> {self.dest_netuid}: "
+                    f"{Balance.from_rao(self.amount, netuid=self.netuid)} "
+                    f"-> ~{Balance.from_rao(self.expected, netuid=self.dest_netuid)} (limit ratio {self.limit_price / 1e9})")
+        if self.side == 'remove':
+            return (f"remove {self.hotkey[:8]} netuid {self.netuid}: {Balance.from_rao(self.amount, netuid=self.netuid)} "
+                    f"-> ~{Balance.from_rao(self.expected)} (limit {self.limit_price / 1e9})")
+        return (f"add    {self.hotkey[:8]} netuid {self.netuid}: {Balance.from_rao(self.amount)} "
+                f"-> ~{Balance.from_rao(self.expected, netuid=self.netuid)} (limit {self.limit_price / 1e9})")
+
+
+def load_targets(path: str) -> dict[tuple[str, int], float]:
+    """
+    Read target weights, normalized to sum to 1.
+
+    Returns:
+        dict of (hotkey, netuid) -> weight
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('targets', [])
+    targets = {}
+    for item in data:
+        weight = item.get('weight')
+        if not item.get('hotkey') or not isinstance(item.get('netuid'), int):
+            raise ValueError(f"Target needs hotkey and netuid: {item}")
+        if not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"Target weight must be a non-negative number: {item}")
+        key = (item['hotkey'], item['netuid'])
+        targets[key] = targets.get(key, 0.0) + float(weight)
+    total = sum(targets.values())
+    if total <= 0:
+        raise ValueError("Target weights sum to zero")
+    return {key: weight / total for key, weight in targets.items()}
+
+
+def _trade(pool: PoolView, tao: int = 0, alpha: int = 0) -> tuple[int, float, PoolView]:
+    """
+    Sell `alpha` into, or buy with `tao` from, `pool`.
+
+    Returns:
+        tuple of (amount out in rao, price after the trade, pool after the trade)
+    """
+    if not pool.is_dynamic:
+        out = alpha * pool.price_float if alpha else tao / pool.price_float
+        return int(out), pool.price_float, pool
+    if alpha:
+        out, post_price = sell_alpha(pool.tao_in_rao, pool.alpha_in_rao, alpha, pool.fee)
+        tao_in, alpha_in = pool.tao_in_rao - int(out), pool.alpha_in_rao + int(alpha * (1 - pool.fee))
+    else:
+        out, post_price = buy_alpha(pool.tao_in_rao, pool.alpha_in_rao, tao, pool.fee)
+        tao_in, alpha_in = pool.tao_in_rao + int(tao * (1 - pool.fee)), pool.alpha_in_rao - int(out)
+    after = PoolView(pool.netuid, tao_in, alpha_in, float(post_price), pool.fee_rate, pool.is_dynamic)
+    return int(out), float(post_price), after
+
+
+def _match(origins, dests, sells: dict, buys: dict, alpha_left: dict, pools) -> list[tuple]:
+    """
+    Pair sells with buys, largest first, and take the matched value off both.
+
+    Largest first keeps the number of pairs at most sells + buys - 1.
+
+    Returns:
+        list of (origin key, destination key, alpha moved, TAO value moved)
+    """
+    pairs = []
+    dests = sorted(dests, key=buys.get, reverse=True)
+    for origin in sorted(origins, key=sells.get, reverse=True):
+        for dest in dests:
+            if sells[origin] <= 0 or alpha_left[origin] <= 0:
+                break
+            if buys[dest] <= 0:
+                continue
+            moved = min(sells[origin], buys[dest])
+            if moved >= sells[origin]:
+                alpha = alpha_left[origin]
+            else:
+                alpha = min(alpha_left[origin], int(moved / pools[origin[1]].price_float))
+            pairs.append((origin, dest, alpha, moved))
+            sells[origin] -= moved
+            buys[dest] -= moved
+            alpha_left[origin] -= alpha
+    return pairs
+
+
+def plan_rebalance(positions: dict[tuple[str, int], int], pools, targets: dict[tuple[str, int], float],
+                   free: int = 0, min_trade: int = MIN_TRADE) -> list[Move]:
+    """
+    Moves that take `positions` to `targets`.
+
+    Same-subnet moves between hotkeys come first, then same-hotkey swaps,
+    then swaps across hotkeys and subnets, each followed by the move of its
+    output, then removes, then adds.
+
+    Args:
+        positions: (hotkey, netuid) -> alpha rao
+        pools: netuid -> PoolView, read at the same block as the positions
+        targets: (hotkey, netuid) -> weight, summing to 1
+        free: Free TAO (rao) to invest on top of the staked value
+        min_trade: Smallest delta worth trading, in rao of TAO
+
+    Returns:
+        unquoted moves in submission order
+    """
+    missing = sorted({netuid for _, netuid in targets if netuid not in pools})
+    if missing:
+        raise ValueError(f"Subnets {missing} do not exist")
+    value = {key: alpha * pools[key[1]].price_float for key, alpha in positions.items() if alpha > 0}
+    total = sum(value.values()) + free
+
+    sells, buys, alpha_left = {}, {}, {}
+    for key in sorted(set(value) | set(targets)):
+        delta = targets.get(key, 0.0) * total - value.get(key, 0.0)
+        if delta < 0 and (-delta >= min_trade or not targets.get(key)):
+            sells[key] = -delta
+            # Positions without a target are sold in full, dust included
+            full = not targets.get(key)
+            alpha_left[key] = positions[key] if full else min(positions[key], int(-delta / pools[key[1]].price_float))
+        elif delta >= min_trade:
+            buys[key] = delta
+
+    moves = []
+    # Same subnet, other hotkey: no pool impact
+    for netuid in sorted({key[1] for key in sells} & {key[1] for key in buys}):
+        origins = [key for key in sells if key[1] == netuid]
+        dests = [key for key in buys if key[1] == netuid]
+        for origin, dest, alpha, moved in _match(origins, dests, sells, buys, alpha_left, pools):
+            moves.append(Move('move', origin[0], netuid, alpha, dest_netuid=netuid, dest_hotkey=dest[0], value=moved))
+
+    # Same hotkey, other subnet: one limit-protected swap
+    for hotkey in sorted({key[0] for key in sells} & {key[0] for key in buys}):
+        origins = [key for key in sells if key[0] == hotkey]
+        dests = [key for key in buys if key[0] == hotkey]
+        for origin, dest, alpha, moved in _match(origins, dests, sells, buys, alpha_left, pools):
+            moves.append(Move('swap', hotkey, origin[1], alpha, dest_netuid=dest[1], value=moved))
+
+    # Other hotkey and other subnet: a limit-protected swap on the origin
+    # hotkey, then a move of its output on the destination subnet
+    for origin in sorted(sells, key=sells.get, reverse=True):
+        dests = [key for key in buys if key[0] != origin[0] and key[1] != origin[1]]
+        for _, dest, alpha, moved in _match([origin], dests, sells, buys, alpha_left, pools):
+            swap = Move('swap', origin[0], origin[1], alpha, dest_netuid=dest[1], value=moved)
+            moves.append(swap)
+            moves.append(Move('move', origin[0], dest[1], 0, dest_netuid=dest[1], dest_hotkey=dest[0],
+                              value=moved, follows=swap))
+
+    for key in sorted(sells):
+        if alpha_left[key] > 0 and (sells[key] >= min_trade or not targets.get(key)):
+            moves.append(Move('remove', key[0], key[1], alpha_left[key], value=sells[key]))
+    for key in sorted(buys):
+        if buys[key] >= min_trade:
+            moves.append(Move('add', key[0], key[1], int(buys[key]), value=buys[key]))
+    return moves
+
+
+def quote_moves(moves: list[Move], pools, tolerance: float) -> None:
+    """
+    Set expected output and limit price of each move by replaying them in order on a copy of the reserves.
+
+    Args:
+        moves: Moves in submission order
+        pools: netuid -> PoolView the replay starts from
+        tolerance: Accepted adverse price move beyond the plan's own impact
+    """
+    views = {}
+
+    def view(netuid: int) -> PoolView:
+        if netuid not in views:
+            views[netuid] = pools[netuid]
+        return views[netuid]
+
+    for move in moves:
+        origin = view(move.netuid)
+        if move.side == 'remove':
+            move.quoted_price = origin.price_float
+            move.expected, post_price, views[move.netuid] = _trade(origin, alpha=move.amount)
+            move.limit_price = post_price * (1 - tolerance) * 1e9
+        elif move.side == 'add':
+            move.quoted_price = origin.price_float
+            move.expected, post_price, views[move.netuid] = _trade(origin, tao=move.amount)
+            move.limit_price = post_price * (1 + tolerance) * 1e9
+        elif move.side == 'move':
+            # Between hotkeys on one subnet: no swap, no limit
+            if move.follows is not None:
+                move.amount = move.follows.expected
+            move.quoted_price = 1.0
+            move.expected = move.amount
+        else:
+            dest = view(move.dest_netuid)
+            move.quoted_price = origin.price_float / dest.price_float
+            tao, origin_post, views[move.netuid] = _trade(origin, alpha=move.amount)
+            move.expected, dest_post, views[move.dest_netuid] = _trade(view(move.dest_netuid), tao=tao)
+            move.limit_price = origin_post / dest_post * (1 - tolerance) * 1e9
+
+
+class Rebalancer:
+    def __init__(self, ron_proxy: RonProxy, targets: dict[tuple[str, int], float],
+                 tolerance: float = DEFAULT_TOLERANCE, min_trade: int = MIN_TRADE, use_balance: bool = False,
+                 batch_size: int = MAX_BATCH_CALLS):
+        """
+        Initialize the Rebalancer object.
+
+        Args:
+            ron_proxy: RonProxy the moves are submitted through
+            targets: (hotkey, netuid) -> weight, from load_targets
+            tolerance: Accepted adverse price move beyond the plan's own impact
+            min_trade: Smallest delta worth trading, in rao of TAO
+            use_balance: Also invest the delegator's free balance
+            batch_size: Maximum calls per batch extrinsic
+        """
+        self.ron_proxy = ron_proxy
+        self.targets = targets
+        self.tolerance = tolerance
+        self.min_trade = min_trade
+        self.use_balance = use_balance
+        self.batch_size = batch_size
+        self.free = 0
+
+    def _pools(self, block_hash: str = None) -> dict[int, PoolView]:
+        state = self.ron_proxy.load_pool_state(block_hash)
+        return {int(netuid): self.ron_proxy.quote_pool(state, int(netuid)) for netuid in state.netuid}
+
+    def plan(self) -> list[Move]:
+        """Read positions, balance and pools at one block and plan the moves."""
+        block, block_hash = self.ron_proxy.best_block()
+        subtensor = self.ron_proxy.subtensor
+        positions = {}
+        for stake_info in subtensor.get_stake_info_for_coldkey(coldkey_ss58=self.ron_proxy.delegator, block=block):
+            key = (stake_info.hotkey_ss58, stake_info.netuid)
+            positions[key] = positions.get(key, 0) + stake_info.stake.rao
+        self.free = subtensor.get_balance(address=self.ron_proxy.delegator, block=block).rao if self.use_balance else 0
+        pools = self._pools(block_hash)
+        print(f"----snapshot at block {block}: {sum(1 for a in positions.values() if a)} positions, "
+              f"free {Balance.from_rao(self.free)}")
+
+        moves = plan_rebalance(positions, pools, self.targets, self.free, self.min_trade)
+        quote_moves(moves, pools, self.tolerance)
+        return moves
+
+    def _compose(self, move: Move):
+        amount = Balance.from_rao(move.amount, netuid=move.netuid if move.side != 'add' else 0)
+        if move.side == 'move':
+            call = self.ron_proxy.compose_move_stake(
+                move.hotkey, move.dest_hotkey, move.netuid, move.dest_netuid, amount,
+            )
+        elif move.side == 'swap':
+            call = self.ron_proxy.compose_swap_stake_limit(
+                move.hotkey, move.netuid, move.dest_netuid, amount, move.limit_price, allow_partial=True,
+            )
+        elif move.side == 'remove':
+            call = self.ron_proxy.compose_remove_stake_limit(
+                move.netuid, move.hotkey, amount, move.limit_price, allow_partial=True,
+            )
+        else:
+            call = self.ron_proxy.compose_add_stake_limit(
+                move.netuid, move.hotkey, amount, move.limit_price, allow_partial=True,
+            )
+        return self.ron_proxy._compose_proxy_call(call)
+
+    def _submit(self, moves: list[Move]) -> None:
+        """Submit moves as batches, then record each move's outcome and journal it."""
+        calls = [self._compose(move) for move in moves]
+        offset = 0
+        for chunk, receipt in self.ron_proxy._submit_batches(calls, self.batch_size):
+            chunk_moves = moves[offset:offset + len(chunk)]
+            offset += len(chunk)
+            items = batch_item_results(receipt) if receipt is not None else [None] * len(chunk_moves)
+            for move, item in zip(chunk_moves, items):
+                if item is None:
+                    move.status, move.error = 'dropped', None
+                else:
+                    move.status = 'done' if item['success'] else 'failed'
+                    move.error, move.events = item['error'], item['events']
+                self.ron_proxy._record(
+                    f"{move.side}_stake", move.netuid, move.hotkey, move.amount, receipt, move.error,
+                    quoted_price=move.quoted_price, tolerance=self.tolerance, limit_price=move.limit_price or None,
+                    dest_netuid=move.dest_netuid, events=move.events if item is not None else None,
+                )
+                if move.status != 'done':
+                    print(f"Error: {move.describe()}: {move.error or 'not included'}")
+
+    def _size_follow_ups(self, follow_ups: list[Move]) -> list[Move]:
+        """Size the moves that follow a swap to the alpha the swap actually returned."""
+        sized = []
+        for move in follow_ups:
+            move.amount = sum(
+                event['alpha'] for event in stake_events(move.follows.events, 'StakeAdded')
+                if event['netuid'] == move.netuid
+            ) if move.follows.status == 'done' else 0
+            move.expected = move.amount
+            if move.amount > 0:
+                sized.append(move)
+            else:
+                move.status = 'skipped'
+        return sized
+
+    def _fund_adds(self, adds: list[Move], recovered: int) -> list[Move]:
+        """Scale adds to the TAO freed by the removes (plus the free balance if used), re-quoted on a fresh snapshot."""
+        balance = self.ron_proxy.subtensor.get_balance(address=self.ron_proxy.delegator).rao
+        available = min(balance, recovered + self.free)
+        wanted = sum(move.amount for move in adds)
+        scale = min(1.0, available / wanted) if wanted else 0.0
+        if scale < 1:
+            print(f"----scaling adds to {scale:.4f}: {Balance.from_rao(available)} available "
+                  f"for {Balance.from_rao(wanted)}")
+        funded = []
+        for move in adds:
+            move.amount = int(move.amount * scale)
+            if move.amount >= self.min_trade:
+                funded.append(move)
+            else:
+                move.status = 'skipped'
+        quote_moves(funded, self._pools(), self.tolerance)
+        return funded
+
+    def run(self, confirm: bool = True, dry_run: bool = False) -> list[Move]:
+        """
+        Plan and execute the rebalance.
+
+        Args:
+            confirm: Ask once before submitting
+            dry_run: Only print the plan
+
+        Returns:
+            every planned move with its status
+        """
+        moves = self.plan()
+        if not moves:
+            print("Already at target")
+            return moves
+        for move in moves:
+            print(f"----{move.describe()}")
+        sells = [move for move in moves if move.side != 'add' and move.follows is None]
+        follow_ups = [move for move in moves if move.follows is not None]
+        adds = [move for move in moves if move.side == 'add']
+        turnover = sum(move.value for move in moves if move.follows is None)
+        print(f"{len(sells) + len(follow_ups)} moves, swaps and sells, {len(adds)} adds, "
+              f"~{Balance.from_rao(int(turnover))} traded")
+        if dry_run:
+            return moves
+        if confirm and not self.ron_proxy._confirm(f"Do you really want to submit {len(moves)} moves? (y/n)"):
+            return moves
+
+        self.ron_proxy.proxy_wallet.unlock_coldkey()
+        recovered = 0
+        if sells:
+            self._submit(sells)
+            recovered = sum(
+                event['tao'] for move in sells if move.side == 'remove'
+                for event in stake_events(move.events, 'StakeRemoved')
+            )
+        second = self._size_follow_ups(follow_ups)
+        if adds:
+            second += self._fund_adds(adds, recovered)
+        if second:
+            self._submit(second)
+
+        counts = {}
+        for move in moves:
+            counts[move.status] = counts.get(move.status, 0) + 1
+        print(f"Rebalance finished: {counts}")
+        return moves
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Proxy script for bulk miner registration.
+
+Registers a list of (hotkey, netuid) pairs with batched proxied
+burned_register calls instead of one register_miner.py run per hotkey.
+"""
+
+import argparse
+import sys
+
+import bittensor as bt
+from modules import RonProxy
+
+DELEGATOR = {
+    'jjcom': '5CF3fFYemt9A4DfdPGQiE8rqMYEeG3ioL3dQHkbX97MqmNBE',
+    'atel': '5CHLb1prLQ4MjA6bYbpPfx1gzvaGpeSfXkk84sMDcNXRQDPd',
+}
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Register many hotkeys on many subnets in batched extrinsics",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument('--coldkey', type=str, required=True, default='jjcom', help='Name of the wallet')
+    parser.add_argument('--items', type=str, nargs='*', default=[],
+                        help='HOTKEY:NETUID pairs; HOTKEY is a hotkey name of the wallet or an ss58 address')
+    parser.add_argument('--file', type=str, help='File with one "HOTKEY NETUID" pair per line')
+    parser.add_argument('--batch-size', type=int, default=None, help='Calls per batch extrinsic')
+
+    return parser
+
+def parse_items(args: argparse.Namespace) -> list[tuple[str, int]]:
+    """Read HOTKEY/NETUID pairs from --items and --file."""
+    pairs = [item.rsplit(':', 1) for item in args.items]
+    if args.file:
+        with open(args.file) as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    pairs.append(line.replace(':', ' ').split())
+    items = []
+    for pair in pairs:
+        if len(pair) != 2:
+            raise ValueError(f"Invalid item: {pair}")
+        hotkey, netuid = pair
+        if not (hotkey.startswith('5') and len(hotkey) == 48):
+            hotkey = bt.wallet(name=args.coldkey, hotkey=hotkey).hotkey.ss58_address
+        items.append((hotkey, int(netuid)))
+    if len(set(items)) != len(items):
+        raise ValueError("Duplicate (hotkey, netuid) pairs")
+    return items
+
+def main():
+    """Main entry point."""
+    network = 'finney'
+    parser = create_parser()
+    if len(sys.argv) == 1:
+        parser.print_help()
+        sys.exit(1)
+
+    args = parser.parse_args()
+    if args.coldkey != 'jjcom' and args.coldkey != 'atel':
+        sys.exit(1)
+    try:
+        items = parse_items(args)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not items:
+        print("Error: Must specify --items or --file")
+        sys.exit(1)
+
+    proxy_wallet = args.coldkey
+    delegator = DELEGATOR[proxy_wallet]
+
+    ron_proxy = RonProxy(
+        proxy_wallet=proxy_wallet,
+        network=network,
+        delegator=delegator,
+    )
+    print(f"Initialized RonProxy object for {network} network")
+
+    try:
+        confirm = input(f"Do you really want to register {len(items)} hotkeys? (y/n)")
+        if confirm != "y":
+            return
+        ron_proxy.proxy_wallet.unlock_coldkey()
+        results = ron_proxy.register_miners(items, batch_size=args.batch_size)
+        succeeded = len([r for r in results if r['success']])
+        print(f"Registered {succeeded}/{len(results)}")
+        if succeeded != len(results):
+            sys.exit(1)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
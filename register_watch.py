@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Registration sniper: watch the burn cost per block and register the moment it is cheap enough.
+
+Keeps a presigned, ready-to-broadcast Proxy.proxy(Registration, burned_register)
+extrinsic for the next eligible block and broadcasts it as soon as the
+subnet has a free registration slot and the burn is under --max-burn.
+"""
+
+import argparse
+import sys
+
+from bittensor.utils.balance import Balance
+from modules import PENDING_TIMEOUT, RonProxy
+
+DELEGATOR = {
+    'jjcom': '5CF3fFYemt9A4DfdPGQiE8rqMYEeG3ioL3dQHkbX97MqmNBE',
+    'atel': '5CHLb1prLQ4MjA6bYbpPfx1gzvaGpeSfXkk84sMDcNXRQDPd',
+}
+
+# Mortality of the presigned extrinsic, and how old it may get before re-signing
+ERA_PERIOD = 64
+RESIGN_AFTER = 32
+
+
+class RegistrationWatcher:
+    def __init__(self, ron_proxy: RonProxy, netuid: int, max_burn: Balance, max_attempts: int = 3):
+        """
+        Initialize the RegistrationWatcher object.
+
+        Args:
+            ron_proxy: RonProxy built with the hotkey to register
+            netuid: Network/subnet ID
+            max_burn: Highest burn cost to register at
+            max_attempts: Broadcasts before giving up
+        """
+        self.ron_proxy = ron_proxy
+        self.netuid = netuid
+        self.max_burn = max_burn
+        self.max_attempts = max_attempts
+        self.attempts = 0
+        self.hotkey = ron_proxy.proxy_wallet.hotkey.ss58_address
+        self.proxy_call = ron_proxy._compose_proxy_call(
+            ron_proxy.compose_burned_register(netuid, self.hotkey), 'Registration',
+        )
+        self.presigned = None
+        self.signed_at = None
+        self.nonce = None
+        # (extrinsic hash, block) of the broadcast awaiting inclusion
+        self.pending = None
+        self.result = None
+
+    def _presign(self, block: int) -> None:
+        """Sign the registration for the upcoming blocks so broadcasting costs nothing extra."""
+        self.presigned = self.ron_proxy.substrate.create_signed_extrinsic(
+            call=self.proxy_call,
+            keypair=self.ron_proxy.proxy_wallet.coldkey,
+            era={'period': ERA_PERIOD, 'current': block},
+            nonce=self.nonce,
+        )
+        self.signed_at = block
+
+    def read_state(self, block_hash: str) -> dict:
+        """Burn cost and registration counters of the subnet in one round trip."""
+        substrate = self.ron_proxy.substrate
+        names = [
+            'Burn', 'NetworkRegistrationAllowed', 'RegistrationsThisBlock', 'MaxRegistrationsPerBlock',
+            'RegistrationsThisInterval', 'TargetRegistrationsPerInterval',
+        ]
+        keys = [substrate.create_storage_key('SubtensorModule', name, [self.netuid]) for name in names]
+        keys.append(substrate.create_storage_key('SubtensorModule', 'Uids', [self.netuid, self.hotkey]))
+        keys.append(substrate.create_storage_key('System', 'Account', [self.ron_proxy.delegator]))
+        values = [value.value for _, value in substrate.query_multi(keys, block_hash=block_hash)]
+        state = dict(zip(names, values[:len(names)]))
+        state['registered'] = values[len(names)] is not None
+        state['free'] = values[len(names) + 1]['data']['free']
+        return state
+
+    def eligible(self, state: dict) -> bool:
+        return (
+            state['NetworkRegistrationAllowed']
+            and state['RegistrationsThisBlock'] < state['MaxRegistrationsPerBlock']
+            and state['RegistrationsThisInterval'] < state['TargetRegistrationsPerInterval'] * 3
+        )
+
+    def _settle(self, number: int, block_hash: str) -> bool | None:
+        """
+        Check the pending broadcast against `block_hash`.
+
+        Returns:
+            True if it registered, False if it failed or expired, None while still pending
+        """
+        extrinsic_hash, broadcast_at = self.pending
+        receipt = self.ron_proxy._included_receipts(block_hash, [extrinsic_hash]).get(extrinsic_hash)
+        if receipt is None:
+            if number - broadcast_at <= PENDING_TIMEOUT:
+                return None
+            print(f"Error: {extrinsic_hash} not included after {PENDING_TIMEOUT} blocks")
+            return False
+        # The proxy extrinsic succeeds even when burned_register itself fails
+        error = self.ron_proxy._proxy_error(receipt)
+        if error is None:
+            print(f"Registered successfully in {receipt.get_extrinsic_identifier()}")
+            return True
+        print(f"Error: {error}")
+        return False
+
+    def on_block(self, number: int) -> bool:
+        """
+        Handle one block. Returns True when watching should stop.
+
+        Broadcasts never wait for inclusion here; the outcome is read from the
+        following blocks so the header subscription is never blocked.
+        """
+        substrate = self.ron_proxy.substrate
+        block_hash = substrate.get_block_hash(number)
+        if self.pending is not None:
+            settled = self._settle(number, block_hash)
+            if settled is None:
+                return False
+            self.pending = None
+            if settled:
+                self.result = True
+                return True
+            if self.attempts >= self.max_attempts:
+                self.result = False
+                return True
+            # The nonce was used (or the extrinsic expired): re-arm and keep watching
+            self.nonce = substrate.get_account_nonce(self.ron_proxy.proxy_wallet.coldkey.ss58_address)
+            self.presigned = None
+
+        state = self.read_state(block_hash)
+        burn = Balance.from_rao(state['Burn'])
+        if state['registered']:
+            print(f"Hotkey {self.hotkey} is registered on netuid {self.netuid}")
+            self.result = True
+            return True
+
+        if self.presigned is None or number - self.signed_at >= RESIGN_AFTER:
+            self._presign(number)
+
+        eligible = self.eligible(state)
+        print(f"----block {number}: burn {burn}, slots {state['RegistrationsThisBlock']}/"
+              f"{state['MaxRegistrationsPerBlock']} this block, {state['RegistrationsThisInterval']}/"
+              f"{state['TargetRegistrationsPerInterval'] * 3} this interval")
+        if not eligible or burn.rao > self.max_burn.rao:
+            return False
+        if state['free'] < burn.rao:
+            print(f"Error: Delegator balance {Balance.from_rao(state['free'])} is below the burn {burn}")
+            self.result = False
+            return True
+
+        self.attempts += 1
+        receipt = substrate.submit_extrinsic(self.presigned, wait_for_inclusion=False)
+        self.pending = (receipt.extrinsic_hash, number)
+        print(f"Burn {burn} <= {self.max_burn}: broadcast {receipt.extrinsic_hash}")
+        return False
+
+    def run(self) -> bool:
+        self.nonce = self.ron_proxy.substrate.get_account_nonce(self.ron_proxy.proxy_wallet.coldkey.ss58_address)
+
+        def handler(header, update_nr, subscription_id):
+            if self.on_block(header['header']['number']):
+                return True
+
+        self.ron_proxy.substrate.subscribe_block_headers(handler)
+        return self.result
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Watch the burn cost and register a hotkey as soon as it is under a ceiling",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument('--coldkey', type=str, required=True, default='jjcom', help='Name of the wallet')
+    parser.add_argument('--hotkey', type=str, required=True, default='jja', help='Name of the hotkey')
+    parser.add_argument('--netuid', type=int, required=True, help='Network/subnet ID')
+    parser.add_argument('--max-burn', type=float, required=True, help='Highest burn cost (TAO) to register at')
+    parser.add_argument('--max-attempts', type=int, default=3, help='Broadcasts before giving up')
+
+    return parser
+
+def main():
+    """Main entry point."""
+    network = 'finney'
+    parser = create_parser()
+    if len(sys.argv) == 1:
+        parser.print_help()
+        sys.exit(1)
+
+    args = parser.parse_args()
+    if args.coldkey != 'jjcom' and args.coldkey != 'atel':
+        sys.exit(1)
+    proxy_wallet = args.coldkey
+    delegator = DELEGATOR[proxy_wallet]
+
+    ron_proxy = RonProxy(
+        proxy_wallet=proxy_wallet,
+        network=network,
+        delegator=delegator,
+        proxy_hotkey=args.hotkey,
+    )
+    print(f"Initialized RonProxy object for {network} network")
+    ron_proxy.proxy_wallet.unlock_coldkey()
+
+    try:
+        watcher = RegistrationWatcher(ron_proxy, args.netuid, Balance.from_tao(args.max_burn), args.max_attempts)
+        if not watcher.run():
+            sys.exit(1)
+
+    except KeyboardInterrupt:
+        print("Stopped.")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ Proxy script for blockchain staking operations.
 import argparse
 import sys
 from modules import RonProxy
+from state_server import StateReader
+from pending_pool import PendingFlow
+from tolerance_model import VolatilityModel, DEFAULT_FILL_PROBABILITY
 from bittensor.utils.balance import Balance
 
 DELEGATOR = {
@@ -28,6 +31,10 @@ def create_parser() -> argparse.ArgumentParser:
     parser.add_argument('--amount', type=float, default=0, help='Amount to unstake')
     parser.add_argument('--tol', type=float, default=0.005, help='tolerance limit to be used')
     parser.add_argument('--all', action='store_true', help='Remove all staked balance')
+    parser.add_argument('--adaptive', action='store_true', help='Pick tolerance from recorded pool volatility')
+    parser.add_argument('--fill-prob', type=float, default=DEFAULT_FILL_PROBABILITY, help='Target fill probability for --adaptive')
+    parser.add_argument('--history', type=str, default='data/pools', help='pool_history.py output used by --adaptive')
+    parser.add_argument('--pending', action='store_true', help='Fold pending staking extrinsics into the quote')
     
     return parser
 
@@ -48,14 +55,32 @@ def main():
         sys.exit(1)
     proxy_wallet = args.coldkey
     delegator = DELEGATOR[proxy_wallet]
+
+    tolerance_model = None
+    if args.adaptive:
+        tolerance_model = VolatilityModel(fill_probability=args.fill_prob)
+
+    pending_flow = None
+    if args.pending:
+        pending_flow = PendingFlow(network=network).start()
         
     # Initialize RonProxy object
     ron_proxy = RonProxy(
         proxy_wallet=proxy_wallet,
         network=network,
         delegator=delegator,
+        tolerance_model=tolerance_model,
+        pending_flow=pending_flow,
+        state_reader=StateReader.attach(network),
     )
     print(f"Initialized RonProxy object for {network} network")
+
+    if tolerance_model is not None:
+        try:
+            tolerance_model.warm_from_history(args.history, head=ron_proxy.best_block()[0])
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
     
     try:        
         ron_proxy.remove_stake(
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Local chain-state server over shared memory.
+
+One process keeps a single block-header subscription upstream. On every
+block it reads the pool table and publishes the block number and hash,
+the reserves, the prices and the fee rates of every subnet into a named
+shared-memory segment. `StateReader` maps the segment in any other process
+and hands out `PoolState` objects whose arrays are NumPy views of the
+segment. Reading them copies nothing and makes no RPC.
+
+Layout: a segment header, then two slots. The writer fills the slot that
+readers are not pointed at, then flips `current`. Each slot carries its own
+seqlock counter, which is odd while the slot is being written. A reader
+takes the current slot if its counter is even and checks the counter again
+after wrapping the arrays. A snapshot stays intact until the writer comes
+back to its slot, two publishes (about two blocks) later. `StateReader.valid`
+tells whether that has happened.
+
+A server refuses to start while another one is publishing to the segment,
+and replaces a segment left behind by one that stopped. Readers map the
+replacement by name once the segment they hold goes stale.
+"""
+
+import argparse
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from substrateinterface import SubstrateInterface
+
+from pool_state import PoolState
+
+RPC_ENDPOINTS = {
+    'test': 'wss://test.finney.opentensor.ai:443',
+    'finney': 'wss://entrypoint-finney.opentensor.ai:443',
+}
+
+MAGIC = 0x52505354  # 'RPST'
+LAYOUT_VERSION = 1
+# Highest netuid + 1 the segment can hold
+CAPACITY = 1024
+BLOCK_TIME = 12
+# Seconds after which readers treat the published state as stale: one block,
+# plus the time the server takes to read and publish the next one
+MAX_AGE = BLOCK_TIME + 3
+# Attempts a reader makes while the writer is publishing
+READ_RETRIES = 100
+
+HEADER = np.dtype([
+    ('magic', '<u4'),
+    ('version', '<u4'),
+    ('capacity', '<u4'),
+    ('current', '<u4'),        # slot readers should use
+    ('published', '<u8'),      # publishes so far
+])
+SLOT_HEADER = np.dtype([
+    ('seq', '<u8'),            # seqlock: odd while the slot is being written
+    ('block', '<u8'),
+    ('updated_at', '<f8'),
+    ('count', '<u4'),          # subnets in the slot
+    ('index_size', '<u4'),     # highest netuid + 1
+    ('block_hash', 'S32'),
+])
+# Per-slot arrays, widest first so every array stays aligned
+ARRAYS = (
+    ('tao_in', '<u8'),
+    ('alpha_in', '<u8'),
+    ('price', '<f8'),
+    ('index', '<i4'),
+    ('netuid', '<u2'),
+    ('fee_rate', '<u2'),
+    ('is_dynamic', '?'),
+)
+HEADER_SIZE = 64
+
+
+def segment_name(network: str) -> str:
+    return f"ronproxy_state_{network}"
+
+
+def _slot_size(capacity: int) -> int:
+    size = SLOT_HEADER.itemsize + sum(np.dtype(kind).itemsize for _, kind in ARRAYS) * capacity
+    return -(-size // 64) * 64
+
+
+def _map_slots(buf, capacity: int) -> list[dict]:
+    """NumPy views of each slot's header and arrays over the segment buffer."""
+    slots = []
+    for slot in range(2):
+        offset = HEADER_SIZE + slot * _slot_size(capacity)
+        views = {'header': np.ndarray((), dtype=SLOT_HEADER, buffer=buf, offset=offset)}
+        offset += SLOT_HEADER.itemsize
+        for name, kind in ARRAYS:
+            views[name] = np.ndarray((capacity,), dtype=kind, buffer=buf, offset=offset)
+            offset += np.dtype(kind).itemsize * capacity
+        slots.append(views)
+    return slots
+
+
+class StateWriter:
+    def __init__(self, network: str, capacity: int = CAPACITY):
+        """
+        Initialize the StateWriter object.
+
+        Args:
+            network: Network the state belongs to; names the segment
+            capacity: Highest netuid + 1 the segment can hold
+                (raises ValueError if another server is publishing to the segment)
+        """
+        self.name = segment_name(network)
+        size = HEADER_SIZE + 2 * _slot_size(capacity)
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            try:
+                existing = StateReader(network)
+            except ValueError:
+                existing = None
+            if existing is not None:
+                live = existing.fresh()
+                existing.close()
+                if live:
+                    raise ValueError(f"Another state server is publishing to {self.name}")
+            # Left behind by a server that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        self.header = np.ndarray((), dtype=HEADER, buffer=self.shm.buf, offset=0)
+        self.slots = _map_slots(self.shm.buf, capacity)
+        self.capacity = capacity
+        self.header['capacity'] = capacity
+        self.header['version'] = LAYOUT_VERSION
+        # Readers check the magic last, so they never attach to a half-initialized segment
+        self.header['magic'] = MAGIC
+
+    def publish(self, block: int, block_hash: str, pools: PoolState) -> None:
+        """Write a snapshot into the idle slot and point readers at it."""
+        if len(pools._index) > self.capacity:
+            raise ValueError(f"netuid {len(pools._index) - 1} does not fit in capacity {self.capacity}")
+        target = 1 - int(self.header['current']) if int(self.header['published']) else 0
+        slot = self.slots[target]
+        header = slot['header']
+        count, index_size = len(pools), len(pools._index)
+
+        header['seq'] += 1
+        slot['netuid'][:count] = pools.netuid
+        slot['tao_in'][:count] = pools.tao_in
+        slot['alpha_in'][:count] = pools.alpha_in
+        slot['price'][:count] = pools.price
+        slot['fee_rate'][:count] = pools.fee_rate
+        slot['is_dynamic'][:count] = pools.is_dynamic
+        slot['index'][:index_size] = pools._index
+        header['block'] = block
+        header['block_hash'] = bytes.fromhex(block_hash.removeprefix('0x')) if block_hash else b''
+        header['updated_at'] = time.time()
+        header['count'] = count
+        header['index_size'] = index_size
+        header['seq'] += 1
+
+        self.header['current'] = target
+        self.header['published'] += 1
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+class StateReader:
+    def __init__(self, network: str):
+        """
+        Initialize the StateReader object.
+
+        Args:
+            network: Network whose segment to map (raises FileNotFoundError if no server runs)
+        """
+        self.network = network
+        # Mappings of segments replaced by `reattach`; snapshots handed out from them may still be in use
+        self._retired = []
+        self.shm = shared_memory.SharedMemory(name=segment_name(network))
+        # Only the server owns the segment; keep this process's tracker from unlinking it at exit
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.header = np.ndarray((), dtype=HEADER, buffer=self.shm.buf, offset=0)
+        if int(self.header['magic']) != MAGIC or int(self.header['version']) != LAYOUT_VERSION:
+            self.close()
+            raise ValueError(f"Segment {segment_name(network)} has an unknown layout")
+        self.slots = _map_slots(self.shm.buf, int(self.header['capacity']))
+
+    @classmethod
+    def attach(cls, network: str) -> "StateReader | None":
+        """Reader for a running server, or None if there is none."""
+        try:
+            return cls(network)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def reattach(self) -> bool:
+        """
+        Map the segment by name again, for when the server was restarted and
+        replaced the segment this reader holds.
+
+        Returns:
+            whether a segment that is being published to is now mapped
+        """
+        try:
+            reader = StateReader(self.network)
+        except (FileNotFoundError, ValueError):
+            return False
+        if not reader.fresh():
+            reader.close()
+            return False
+        self._retired.append(self.shm)
+        self.shm, self.header, self.slots = reader.shm, reader.header, reader.slots
+        return True
+
+    def _stable(self) -> tuple[int, int]:
+        for _ in range(READ_RETRIES):
+            if int(self.header['published']) == 0:
+                break
+            current = int(self.header['current'])
+            seq = int(self.slots[current]['header']['seq'])
+            if seq % 2 == 0:
+                return current, seq
+        raise RuntimeError("State server has not published a consistent snapshot")
+
+    def age(self) -> float:
+        """Seconds since the last publish (inf before the first one)."""
+        if int(self.header['published']) == 0:
+            return float('inf')
+        header = self.slots[int(self.header['current'])]['header']
+        return time.time() - float(header['updated_at'])
+
+    def fresh(self, max_age: float = MAX_AGE) -> bool:
+        """Whether the server has published within `max_age` seconds."""
+        return self.age() <= max_age
+
+    def block(self) -> tuple[int, str]:
+        """Latest published (block number, block hash)."""
+        while True:
+            current, seq = self._stable()
+            header = self.slots[current]['header']
+            block, block_hash = int(header['block']), '0x' + bytes(header['block_hash']).hex()
+            if int(header['seq']) == seq:
+                return block, block_hash
+
+    def pools(self) -> tuple[PoolState, tuple[int, int]]:
+        """
+        Latest pool table as views of the segment.
+
+        Returns:
+            tuple of (PoolState, version); pass the version to `valid()`
+        """
+        while True:
+            current, seq = self._stable()
+            slot = self.slots[current]
+            header = slot['header']
+            count, index_size = int(header['count']), int(header['index_size'])
+            state = PoolState.from_buffers(
+                netuid=slot['netuid'][:count],
+                tao_in=slot['tao_in'][:count],
+                alpha_in=slot['alpha_in'][:count],
+                price=slot['price'][:count],
+                fee_rate=slot['fee_rate'][:count],
+                is_dynamic=slot['is_dynamic'][:count],
+                index=slot['index'][:index_size],
+                block_hash='0x' + bytes(header['block_hash']).hex(),
+            )
+            if int(header['seq']) == seq:
+                return state, (current, seq)
+
+    def latest(self, max_age: float = MAX_AGE) -> tuple[PoolState, tuple[int, int]] | None:
+        """
+        Latest pool table, or None if the server has not published within `max_age` seconds.
+
+        Returns:
+            tuple of (PoolState, version) like `pools()`; check the version with
+            `valid()` after copying rows out of the views
+        """
+        if not self.fresh(max_age):
+            return None
+        return self.pools()
+
+    def valid(self, version: tuple[int, int]) -> bool:
+        """Whether the snapshot `pools()` returned with `version` has not been overwritten since."""
+        current, seq = version
+        return int(self.slots[current]['header']['seq']) == seq
+
+    def close(self) -> None:
+        # The views export the buffer; drop them so the mapping can be closed
+        self.header = self.slots = None
+        self.shm.close()
+
+
+class StateServer:
+    def __init__(self, network: str, capacity: int = CAPACITY):
+        """
+        Initialize the StateServer object.
+
+        Args:
+            network: Network to follow
+            capacity: Highest netuid + 1 the segment can hold
+        """
+        if network not in RPC_ENDPOINTS:
+            raise ValueError(f"Invalid network: {network}")
+        self.network = network
+        self.substrate = SubstrateInterface(
+            url=RPC_ENDPOINTS[network],
+            ss58_format=42,
+            type_registry_preset='substrate-node-template',
+        )
+        self.writer = StateWriter(network, capacity)
+
+    def on_block(self, number: int) -> None:
+        started = time.perf_counter()
+        block_hash = self.substrate.get_block_hash(number)
+        try:
+            pools = PoolState.from_substrate(self.substrate, block_hash=block_hash)
+        except Exception as e:
+            # Keep the previous snapshot; readers fall back to RPC once it goes stale
+            print(f"Error: block {number}: pool read failed, not published: {e}")
+            return
+        if not len(pools) or not pools.tao_in.any() or not pools.alpha_in.any():
+            print(f"Error: block {number}: pool table is empty, not published")
+            return
+        self.writer.publish(number, block_hash, pools)
+        print(f"----block {number}: {len(pools)} subnets published in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def run(self) -> None:
+        """Publish every new block until interrupted."""
+        def handler(header, update_nr, subscription_id):
+            try:
+                self.on_block(header['header']['number'])
+            except Exception as e:
+                print(f"Error: block {header['header']['number']}: {e}")
+
+        self.substrate.subscribe_block_headers(handler)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Publish block and pool state to other processes through shared memory",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--network', type=str, default='finney', help='Network name')
+    parser.add_argument('--capacity', type=int, default=CAPACITY, help='Highest netuid + 1 the segment can hold')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    args = create_parser().parse_args()
+    try:
+        server = StateServer(args.network, args.capacity)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Publishing {args.network} state to shared memory segment {server.writer.name}")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        print("Stopped.")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Adaptive per-subnet tolerance model.
+
+Keeps a ring buffer of recent per-block log price changes for every netuid
+and turns it into the smallest limit-price tolerance that fills with a
+target probability over the measured inclusion latency. Buffers update in
+O(1) per netuid per block; `tolerance()` only reads in-memory state.
+"""
+
+import json
+import math
+import os
+import threading
+from statistics import NormalDist
+
+import numpy as np
+from bittensor.utils.balance import Balance
+from pool_state import PoolState, PoolView
+
+DEFAULT_WINDOW = 300
+DEFAULT_FILL_PROBABILITY = 0.95
+MIN_SAMPLES = 30
+MAX_TOLERANCE = 0.5
+# Weight of the newest inclusion-latency sample in the moving average
+LATENCY_ALPHA = 0.2
+# Blocks the recorded history may trail the chain head before it is rejected
+MAX_HISTORY_LAG = 5
+# Measured inclusion latency, kept across runs
+LATENCY_PATH = 'data/latency.json'
+DEFAULT_LATENCY = 1.0
+
+
+class VolatilityModel:
+    def __init__(self, window: int = DEFAULT_WINDOW, fill_probability: float = DEFAULT_FILL_PROBABILITY,
+                 latency: float | None = None, latency_path: str | None = LATENCY_PATH):
+        """
+        Initialize the VolatilityModel object.
+
+        Args:
+            window: Number of per-block price changes kept per netuid
+            fill_probability: Target probability that a limit order fills
+            latency: Initial inclusion latency estimate in blocks (default: the stored one)
+            latency_path: JSON file the latency moving average is loaded from and saved to (None to keep it in memory)
+        """
+        if not 0.5 <= fill_probability < 1:
+            raise ValueError(f"Invalid fill probability: {fill_probability}")
+        self.window = window
+        self.z = NormalDist().inv_cdf(fill_probability)
+        self.fill_probability = fill_probability
+        self.latency_path = latency_path
+        self.latency = latency if latency is not None else self._load_latency()
+        self.last_block = None
+        self._lock = threading.Lock()
+        self._allocate(0)
+
+    def _allocate(self, size: int) -> None:
+        """Grow the per-netuid arrays to hold netuids < `size`."""
+        old = getattr(self, 'returns', None)
+        n = 0 if old is None else old.shape[0]
+        if old is not None and size <= n:
+            return
+        grow = lambda a, fill=0: np.concatenate([a, np.full((size - n,) + a.shape[1:], fill, dtype=a.dtype)])
+        if old is None:
+            self.returns = np.zeros((size, self.window))
+            self.pos = np.zeros(size, dtype=np.int64)
+            self.count = np.zeros(size, dtype=np.int64)
+            self.sum = np.zeros(size)
+            self.sumsq = np.zeros(size)
+            self.last_price = np.zeros(size)
+            self.last_seen = np.full(size, -1, dtype=np.int64)
+        else:
+            self.returns = grow(self.returns)
+            self.pos = grow(self.pos)
+            self.count = grow(self.count)
+            self.sum = grow(self.sum)
+            self.sumsq = grow(self.sumsq)
+            self.last_price = grow(self.last_price)
+            self.last_seen = grow(self.last_seen, -1)
+
+    def update(self, block: int, netuids, prices) -> None:
+        """
+        Push one block of prices.
+
+        Args:
+            block: Block number the prices were read at
+            netuids: Subnet IDs
+            prices: Spot prices for `netuids`
+        """
+        netuids = np.asarray(netuids, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        with self._lock:
+            if len(netuids):
+                self._allocate(int(netuids.max()) + 1)
+
+            seen = self.last_seen[netuids]
+            gap = block - seen
+            ok = (seen >= 0) & (gap > 0) & (self.last_price[netuids] > 0) & (prices > 0)
+            n = netuids[ok]
+            if len(n):
+                # Spread multi-block gaps so the buffer keeps per-block variance
+                change = np.log(prices[ok] / self.last_price[n]) / np.sqrt(gap[ok])
+                p = self.pos[n]
+                old = self.returns[n, p]
+                self.returns[n, p] = change
+                self.sum[n] += change - old
+                self.sumsq[n] += change * change - old * old
+                self.pos[n] = (p + 1) % self.window
+                self.count[n] = np.minimum(self.count[n] + 1, self.window)
+
+            fresh = (seen < block) & (prices > 0)
+            self.last_price[netuids[fresh]] = prices[fresh]
+            self.last_seen[netuids[fresh]] = block
+            if self.last_block is None or block > self.last_block:
+                self.last_block = block
+
+    def update_from_pool_state(self, pools: PoolState, block: int) -> None:
+        self.update(block, pools.netuid, pools.price)
+
+    def warm_from_history(self, path: str, head: int | None = None, max_lag: int = MAX_HISTORY_LAG) -> None:
+        """
+        Fill the ring buffers from the last `window` blocks recorded by pool_history.py.
+
+        Args:
+            path: pool_history.py output directory
+            head: Current chain head; history trailing it by more than `max_lag` blocks is rejected
+            max_lag: Blocks the last recorded block may trail `head`
+        """
+        from pool_history import load_history
+
+        history = load_history(path)
+        blocks = np.asarray(history['block'])
+        if len(blocks) == 0:
+            if head is not None:
+                raise ValueError(f"No pool history in {path}")
+            return
+        if head is not None and head - int(blocks[-1]) > max_lag:
+            raise ValueError(f"Pool history in {path} ends at block {int(blocks[-1])}, "
+                             f"{head - int(blocks[-1])} blocks behind the chain; is pool_history.py running?")
+
+        # Rows are grouped by block; a block may hold any number of netuids
+        starts = np.flatnonzero(np.diff(blocks)) + 1
+        starts = np.concatenate([[0], starts])[-(self.window + 1):]
+        ends = np.concatenate([starts[1:], [len(blocks)]])
+        netuid, price = history['netuid'], history['price']
+        for start, end in zip(starts, ends):
+            self.update(int(blocks[start]), netuid[start:end], price[start:end])
+
+    def _load_latency(self) -> float:
+        if self.latency_path is None or not os.path.exists(self.latency_path):
+            return DEFAULT_LATENCY
+        try:
+            with open(self.latency_path) as f:
+                return float(json.load(f)['latency'])
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Warning: ignoring {self.latency_path}: {e}")
+            return DEFAULT_LATENCY
+
+    def record_latency(self, blocks: int) -> None:
+        """Fold one measured inclusion latency (in blocks) into the moving average and store it."""
+        if blocks < 1:
+            blocks = 1
+        self.latency = (1 - LATENCY_ALPHA) * self.latency + LATENCY_ALPHA * blocks
+        if self.latency_path is None:
+            return
+        os.makedirs(os.path.dirname(self.latency_path) or '.', exist_ok=True)
+        tmp = self.latency_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'latency': self.latency, 'last_sample': blocks}, f)
+        os.replace(tmp, self.latency_path)
+
+    def stats(self, netuid: int) -> tuple[float, float] | None:
+        """
+        Per-block drift and volatility of the log price, or None while warming up.
+        """
+        with self._lock:
+            if netuid >= len(self.count) or self.count[netuid] < MIN_SAMPLES:
+                return None
+            n = self.count[netuid]
+            mean = self.sum[netuid] / n
+            variance = max(self.sumsq[netuid] / n - mean * mean, 0.0)
+        return mean, math.sqrt(variance)
+
+    def tolerance(self, pool: PoolView, amount: Balance, side: str) -> float | None:
+        """
+        Smallest tolerance that fills with the target probability.
+
+        The limit is checked against the pool price after our own swap, so
+        the tolerance covers our price impact plus the expected drift over
+        the inclusion latency at the chosen quantile.
+
+        Args:
+            pool: Current pool of the netuid
+            amount: TAO to stake ('add') or alpha to unstake ('remove')
+            side: 'add' or 'remove'
+
+        Returns:
+            Tolerance as a fraction of the current price, or None if the
+            netuid has too little history.
+        """
+        stats = self.stats(pool.netuid)
+        if stats is None:
+            return None
+        mean, sigma = stats
+        drift = mean * self.latency
+        spread = self.z * sigma * math.sqrt(self.latency)
+
+        if side == 'add':
+            impact = 2 * math.log1p(amount.rao / pool.tao_in_rao) if pool.tao_in_rao else 0.0
+            tolerance = math.expm1(impact + drift + spread)
+        elif side == 'remove':
+            impact = -2 * math.log1p(amount.rao / pool.alpha_in_rao) if pool.alpha_in_rao else 0.0
+            tolerance = -math.expm1(impact + drift - spread)
+        else:
+            raise ValueError(f"Invalid side: {side}")
+        return min(max(tolerance, 0.0), MAX_TOLERANCE)
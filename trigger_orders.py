@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Conditional (trigger) orders evaluated on every new block.
+
+Orders such as "stake 200 TAO into netuid 39 if price <= X" or "unstake all
+if price >= Y" are kept per netuid in two sorted trigger-price ladders. On
+each block only the slice of a ladder whose thresholds were crossed is
+visited (one bisect per netuid). Every order keeps a pre-composed proxied
+limit call, so firing only costs signing and broadcasting.
+
+The order file is shared between the running engine and the add/cancel
+commands. Every access holds an flock on a side file. The engine merges
+orders added or cancelled by other processes before each block, and the
+commands re-read the file before changing it.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+from bittensor.utils.balance import Balance
+from modules import PENDING_TIMEOUT, RonProxy
+from pool_state import PoolState
+
+DELEGATOR = {
+    'jjcom': '5CF3fFYemt9A4DfdPGQiE8rqMYEeG3ioL3dQHkbX97MqmNBE',
+    'atel': '5CHLb1prLQ4MjA6bYbpPfx1gzvaGpeSfXkk84sMDcNXRQDPd',
+}
+
+validator_hotkey = '5CsvRJXuR955WojnGMdok1hbhffZyB4N5ocrv82f3p5A2zVp'
+
+TRIGGER_DIR = 'data'
+# Re-read positions for "unstake all" orders every this many blocks
+REFRESH_BLOCKS = 25
+
+
+@dataclass
+class TriggerOrder:
+    order_id: str
+    netuid: int
+    side: str
+    trigger_price: float
+    amount: int
+    hotkey: str
+    tolerance: float = 0.005
+    all: bool = False
+    status: str = 'open'
+    extrinsic: str | None = None
+
+    def limit_price(self) -> int:
+        """Limit in rao per alpha, anchored at the trigger price rather than the live one."""
+        if self.side == 'add':
+            return int(self.trigger_price * (1 + self.tolerance) * 1e9)
+        return int(self.trigger_price * (1 - self.tolerance) * 1e9)
+
+
+class TriggerBook:
+    def __init__(self, path: str):
+        """
+        Initialize the TriggerBook object.
+
+        Args:
+            path: JSON file the orders are persisted to
+        """
+        self.path = path
+        self.orders: dict[str, TriggerOrder] = {}
+        # netuid -> ascending trigger prices and matching order IDs
+        self._buy_prices: dict[int, list[float]] = {}
+        self._buy_ids: dict[int, list[str]] = {}
+        self._sell_prices: dict[int, list[float]] = {}
+        self._sell_ids: dict[int, list[str]] = {}
+        with self._locked():
+            for order in self._read():
+                self.add(order)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the book's file lock, shared by every process using this order file."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> list[TriggerOrder]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            return [TriggerOrder(**data) for data in json.load(f)]
+
+    def _write(self) -> None:
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump([asdict(o) for o in self.orders.values()], f, indent=2)
+        os.replace(tmp, self.path)
+
+    def _merge(self) -> tuple[list[TriggerOrder], list[str]]:
+        """
+        Take orders added and open orders cancelled by other processes from the file.
+        Every other status is ours: the file can only be behind on it.
+        """
+        added, cancelled = [], []
+        for order in self._read():
+            mine = self.orders.get(order.order_id)
+            if mine is None:
+                self.add(order)
+                added.append(order)
+            elif order.status == 'cancelled' and mine.status == 'open':
+                self.close(order.order_id, 'cancelled')
+                cancelled.append(order.order_id)
+        return added, cancelled
+
+    def reload(self) -> tuple[list[TriggerOrder], list[str]]:
+        """
+        Merge changes other processes made to the file.
+
+        Returns:
+            tuple of (orders added, IDs of orders cancelled)
+        """
+        with self._locked():
+            return self._merge()
+
+    def save(self) -> None:
+        """Merge the file, then write the book back."""
+        with self._locked():
+            self._merge()
+            self._write()
+
+    @contextmanager
+    def edit(self):
+        """Re-read the file, let the caller change the book, and write it back, all under the lock."""
+        with self._locked():
+            self._clear()
+            for order in self._read():
+                self.add(order)
+            yield self
+            self._write()
+
+    def _clear(self) -> None:
+        self.orders = {}
+        self._buy_prices, self._buy_ids, self._sell_prices, self._sell_ids = {}, {}, {}, {}
+
+    def _ladder(self, order: TriggerOrder) -> tuple[list[float], list[str]]:
+        prices, ids = (self._buy_prices, self._buy_ids) if order.side == 'add' else (self._sell_prices, self._sell_ids)
+        return prices.setdefault(order.netuid, []), ids.setdefault(order.netuid, [])
+
+    def _index(self, order: TriggerOrder) -> None:
+        prices, ids = self._ladder(order)
+        i = bisect_right(prices, order.trigger_price)
+        prices.insert(i, order.trigger_price)
+        ids.insert(i, order.order_id)
+
+    def _unindex(self, order: TriggerOrder) -> None:
+        prices, ids = self._ladder(order)
+        i = bisect_left(prices, order.trigger_price)
+        while ids[i] != order.order_id:
+            i += 1
+        del prices[i]
+        del ids[i]
+
+    def add(self, order: TriggerOrder) -> None:
+        self.orders[order.order_id] = order
+        if order.status == 'open':
+            self._index(order)
+
+    def close(self, order_id: str, status: str) -> TriggerOrder:
+        order = self.orders[order_id]
+        if order.status == 'open':
+            self._unindex(order)
+        order.status = status
+        return order
+
+    def netuids(self) -> set[int]:
+        return {n for n, p in self._buy_prices.items() if p} | {n for n, p in self._sell_prices.items() if p}
+
+    def crossed(self, netuid: int, price: float) -> list[str]:
+        """
+        IDs of orders on `netuid` whose threshold `price` has crossed.
+
+        Buys fire when price <= trigger (the top of the ladder), sells when
+        price >= trigger (the bottom).
+        """
+        crossed = []
+        buy_prices = self._buy_prices.get(netuid)
+        if buy_prices and buy_prices[-1] >= price:
+            crossed.extend(self._buy_ids[netuid][bisect_left(buy_prices, price):])
+        sell_prices = self._sell_prices.get(netuid)
+        if sell_prices and sell_prices[0] <= price:
+            crossed.extend(self._sell_ids[netuid][:bisect_right(sell_prices, price)])
+        return crossed
+
+
+class TriggerEngine:
+    def __init__(self, ron_proxy: RonProxy, book: TriggerBook):
+        """
+        Initialize the TriggerEngine object.
+
+        Args:
+            ron_proxy: RonProxy the orders fire through
+            book: Conditional orders to watch
+        """
+        self.ron_proxy = ron_proxy
+        self.book = book
+        self.calls = {}
+        self.nonce = None
+        # extrinsic hash -> (order ID, block it was fired at, time it was fired at)
+        self.submitted = {}
+        self.blocks_seen = 0
+        # Stakes of "unstake all" orders, read off the block handler
+        self.positions = queue.Queue()
+        self._refresher = None
+
+    def _compose(self, order: TriggerOrder):
+        if order.side == 'add':
+            call = self.ron_proxy.compose_add_stake_limit(
+                order.netuid, order.hotkey, Balance.from_rao(order.amount), order.limit_price(),
+            )
+        else:
+            call = self.ron_proxy.compose_remove_stake_limit(
+                order.netuid, order.hotkey, Balance.from_rao(order.amount, netuid=order.netuid),
+                order.limit_price(), allow_partial=order.all,
+            )
+        return self.ron_proxy._compose_proxy_call(call)
+
+    def _read_positions(self, orders: list[TriggerOrder]) -> None:
+        """Read the stake behind each "unstake all" order and queue it for the block handler."""
+        stakes = {}
+        try:
+            for order in orders:
+                stakes[order.order_id] = self.ron_proxy.subtensor.get_stake(
+                    coldkey_ss58=self.ron_proxy.delegator,
+                    hotkey_ss58=order.hotkey,
+                    netuid=order.netuid,
+                ).rao
+        except Exception as e:
+            print(f"Error: reading positions: {e}")
+        self.positions.put(stakes)
+
+    def refresh_positions(self) -> None:
+        """Start re-reading the stake of "unstake all" orders in the background."""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        orders = [o for o in self.book.orders.values() if o.status == 'open' and o.all]
+        if not orders:
+            return
+        self._refresher = threading.Thread(target=self._read_positions, args=(orders,), daemon=True)
+        self._refresher.start()
+
+    def _apply_positions(self) -> None:
+        """Size "unstake all" orders from the stakes read so far and re-compose their calls."""
+        while True:
+            try:
+                stakes = self.positions.get_nowait()
+            except queue.Empty:
+                return
+            for order_id, stake in stakes.items():
+                order = self.book.orders[order_id]
+                if order.status == 'open' and (stake != order.amount or order_id not in self.calls):
+                    order.amount = stake
+                    self.calls[order_id] = self._compose(order)
+
+    def _track(self, added: list[TriggerOrder], cancelled: list[str]) -> None:
+        """Compose calls for orders added by other processes and forget cancelled ones."""
+        for order_id in cancelled:
+            self.calls.pop(order_id, None)
+            print(f"Order {order_id} cancelled")
+        if any(order.all for order in added):
+            self.refresh_positions()
+        for order in added:
+            if order.status == 'open' and not order.all:
+                self.calls[order.order_id] = self._compose(order)
+            print(f"Order {order.order_id} added")
+
+    def prepare(self) -> None:
+        """Compose every open order's proxied call ahead of time."""
+        self._read_positions([o for o in self.book.orders.values() if o.status == 'open' and o.all])
+        self._apply_positions()
+        for order in self.book.orders.values():
+            if order.status == 'open' and not order.all and order.order_id not in self.calls:
+                self.calls[order.order_id] = self._compose(order)
+        self._reseed_nonce()
+        print(f"Prepared {len(self.calls)} orders, nonce {self.nonce}")
+
+    def _reseed_nonce(self) -> None:
+        self.nonce = self.ron_proxy.substrate.get_account_nonce(self.ron_proxy.proxy_wallet.coldkey.ss58_address)
+
+    def fire(self, order_id: str, price: float, block: int) -> None:
+        order = self.book.close(order_id, 'submitted')
+        if order.all and order.amount == 0:
+            order.status = 'skipped'
+            return
+        extrinsic = self.ron_proxy.substrate.create_signed_extrinsic(
+            call=self.calls.pop(order_id),
+            keypair=self.ron_proxy.proxy_wallet.coldkey,
+            nonce=self.nonce,
+        )
+        try:
+            receipt = self.ron_proxy.substrate.submit_extrinsic(extrinsic, wait_for_inclusion=False)
+        except Exception as e:
+            order.status = 'failed'
+            print(f"Error: order {order_id}: {e}")
+            self._record(order, None, e, time.time())
+            # The node may or may not have taken the nonce
+            self._reseed_nonce()
+            return
+        self.nonce += 1
+        order.extrinsic = receipt.extrinsic_hash
+        self.submitted[receipt.extrinsic_hash] = (order_id, block, time.time())
+        print(f"{order.side} order {order_id} fired at price {price} (trigger {order.trigger_price}): {order.extrinsic}")
+
+    def _record(self, order: TriggerOrder, receipt, error, fired_at: float) -> None:
+        self.ron_proxy._record(
+            f"{order.side}_stake", order.netuid, order.hotkey, order.amount, receipt, error,
+            quoted_price=order.trigger_price, tolerance=order.tolerance, limit_price=order.limit_price(),
+            ts=fired_at, submitted_at=fired_at, included_at=time.time() if receipt is not None else None,
+        )
+
+    def confirm(self, block_hash: str, block: int) -> None:
+        """
+        Settle submitted orders whose extrinsics landed in `block_hash` and drop
+        the ones still not included after PENDING_TIMEOUT blocks.
+        """
+        if not self.submitted:
+            return
+        receipts = self.ron_proxy._included_receipts(block_hash, self.submitted)
+        for extrinsic_hash, receipt in receipts.items():
+            order_id, _, fired_at = self.submitted.pop(extrinsic_hash)
+            order = self.book.orders[order_id]
+            # The proxy extrinsic succeeds even when the limit call itself fails
+            error = self.ron_proxy._proxy_error(receipt)
+            order.status = 'filled' if error is None else 'failed'
+            print(f"Order {order_id} {order.status}" + ('' if error is None else f": {error}"))
+            self._record(order, receipt, error, fired_at)
+
+        dropped = False
+        for extrinsic_hash, (order_id, fired_block, fired_at) in list(self.submitted.items()):
+            if block - fired_block > PENDING_TIMEOUT:
+                del self.submitted[extrinsic_hash]
+                self.book.orders[order_id].status = 'dropped'
+                self._record(self.book.orders[order_id], None, None, fired_at)
+                dropped = True
+                print(f"Error: order {order_id} not included after {PENDING_TIMEOUT} blocks")
+        if dropped:
+            # Later fires must not sit behind the nonce gap the dropped extrinsic left
+            self._reseed_nonce()
+
+    def on_block(self, number: int) -> None:
+        substrate = self.ron_proxy.substrate
+        block_hash = substrate.get_block_hash(number)
+        pools = PoolState.from_substrate(substrate, block_hash=block_hash)
+        self._track(*self.book.reload())
+        self._apply_positions()
+        changed = bool(self.submitted)
+        for netuid in self.book.netuids():
+            pool = pools.get(netuid)
+            if pool is None:
+                continue
+            for order_id in self.book.crossed(netuid, pool.price_float):
+                if order_id not in self.calls:
+                    # "unstake all" order whose stake has not been read yet
+                    continue
+                self.fire(order_id, pool.price_float, number)
+                changed = True
+        self.confirm(block_hash, number)
+
+        self.blocks_seen += 1
+        if self.blocks_seen % REFRESH_BLOCKS == 0:
+            self.refresh_positions()
+        if changed:
+            self.book.save()
+
+    def run(self) -> None:
+        self.prepare()
+
+        def handler(header, update_nr, subscription_id):
+            self.on_block(header['header']['number'])
+
+        self.ron_proxy.substrate.subscribe_block_headers(handler)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Conditional stake/unstake orders evaluated per block",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--coldkey', type=str, required=True, default='jjcom', help='Name of the wallet')
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+
+    add_parser = subparsers.add_parser('add', help='Stake when price <= trigger')
+    add_parser.add_argument('--netuid', type=int, required=True, help='Network/subnet ID')
+    add_parser.add_argument('--price', type=float, required=True, help='Trigger price (TAO per alpha)')
+    add_parser.add_argument('--amount', type=float, required=True, help='TAO to stake')
+    add_parser.add_argument('--tol', type=float, default=0.005, help='Tolerance above the trigger price')
+
+    remove_parser = subparsers.add_parser('remove', help='Unstake when price >= trigger')
+    remove_parser.add_argument('--netuid', type=int, required=True, help='Network/subnet ID')
+    remove_parser.add_argument('--price', type=float, required=True, help='Trigger price (TAO per alpha)')
+    remove_parser.add_argument('--amount', type=float, default=0, help='Alpha to unstake')
+    remove_parser.add_argument('--all', action='store_true', help='Unstake the whole position')
+    remove_parser.add_argument('--tol', type=float, default=0.005, help='Tolerance below the trigger price')
+
+    cancel_parser = subparsers.add_parser('cancel', help='Cancel an open order')
+    cancel_parser.add_argument('--id', type=str, required=True, help='Order ID')
+
+    subparsers.add_parser('list', help='List orders')
+    subparsers.add_parser('run', help='Watch blocks and fire crossed orders')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    network = 'finney'
+    parser = create_parser()
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+    if args.coldkey != 'jjcom' and args.coldkey != 'atel':
+        sys.exit(1)
+
+    book = TriggerBook(os.path.join(TRIGGER_DIR, f"triggers_{args.coldkey}.json"))
+
+    if args.command == 'list':
+        for order in book.orders.values():
+            condition = '<=' if order.side == 'add' else '>='
+            amount = 'all' if order.all else Balance.from_rao(order.amount)
+            print(f"{order.order_id} {order.side} {amount} on netuid {order.netuid} "
+                  f"if price {condition} {order.trigger_price} [{order.status}]")
+        return
+
+    if args.command == 'cancel':
+        with book.edit():
+            order = book.orders.get(args.id)
+            if order is None or order.status != 'open':
+                print(f"Error: {'Unknown' if order is None else order.status.capitalize()} order {args.id}")
+                sys.exit(1)
+            book.close(args.id, 'cancelled')
+        print(f"Cancelled {args.id}")
+        return
+
+    if args.command in ('add', 'remove'):
+        if args.command == 'remove' and not args.amount and not args.all:
+            print("Error: Must specify either --amount or --all")
+            sys.exit(1)
+        amount = Balance.from_tao(args.amount) if args.command == 'add' else Balance.from_tao(args.amount, netuid=args.netuid)
+        order = TriggerOrder(
+            order_id=uuid.uuid4().hex[:12],
+            netuid=args.netuid,
+            side=args.command,
+            trigger_price=args.price,
+            amount=amount.rao,
+            hotkey=validator_hotkey,
+            tolerance=args.tol,
+            all=getattr(args, 'all', False),
+        )
+        with book.edit():
+            book.add(order)
+        print(f"Added order {order.order_id}")
+        return
+
+    proxy_wallet = args.coldkey
+    delegator = DELEGATOR[proxy_wallet]
+    ron_proxy = RonProxy(
+        proxy_wallet=proxy_wallet,
+        network=network,
+        delegator=delegator,
+    )
+    print(f"Initialized RonProxy object for {network} network")
+    ron_proxy.proxy_wallet.unlock_coldkey()
+
+    try:
+        TriggerEngine(ron_proxy, book).run()
+    except KeyboardInterrupt:
+        book.save()
+        print("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Offline decoder/verifier for multisig call data.
+
+The approver receives a `call_data` hex string (printed by multisig.py) and
+its call hash. `fetch` snapshots the runtime metadata once while online.
+After that, `verify` decodes call data against the snapshot without any
+connection, recomputes the blake2-256 call hash, and prints the nested call
+tree, including Utility batches and Proxy.proxy wrappers.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+from scalecodec.base import RuntimeConfigurationObject, ScaleBytes
+from scalecodec.type_registry import load_type_registry_preset
+
+from multisig import call_hash_of
+
+METADATA_DIR = 'data/metadata'
+# Call arguments holding rao amounts, printed in TAO as well
+BALANCE_ARGS = {'value', 'amount', 'amount_staked', 'amount_unstaked', 'alpha_amount', 'limit_price'}
+
+
+def metadata_path(network: str, spec_version: int) -> str:
+    return os.path.join(METADATA_DIR, f"{network}-{spec_version}.json")
+
+
+def fetch_metadata(network: str) -> str:
+    """Snapshot the current runtime metadata of `network` and return the file path."""
+    from substrateinterface import SubstrateInterface
+    from multisig import RPC_ENDPOINTS
+
+    substrate = SubstrateInterface(
+        url=RPC_ENDPOINTS[network],
+        ss58_format=42,
+        type_registry_preset='substrate-node-template',
+    )
+    runtime_version = substrate.rpc_request('state_getRuntimeVersion', [])['result']
+    spec_version = runtime_version['specVersion']
+    metadata = substrate.rpc_request('state_getMetadata', [])['result']
+    path = metadata_path(network, spec_version)
+    os.makedirs(METADATA_DIR, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'network': network, 'spec_version': spec_version, 'runtime_version': runtime_version,
+            'metadata': metadata,
+        }, f)
+    return path
+
+
+def latest_metadata_path(network: str) -> str | None:
+    paths = glob.glob(os.path.join(METADATA_DIR, f"{network}-*.json"))
+    if not paths:
+        return None
+    return max(paths, key=lambda path: int(path.rsplit('-', 1)[1].removesuffix('.json')))
+
+
+class CallDecoder:
+    def __init__(self, path: str):
+        """
+        Initialize the CallDecoder object from a metadata snapshot.
+
+        Decoding the metadata is the only expensive step; every call decoded
+        afterwards reuses it.
+
+        Args:
+            path: Snapshot written by fetch_metadata
+        """
+        with open(path) as f:
+            snapshot = json.load(f)
+        self.network = snapshot['network']
+        self.spec_version = snapshot['spec_version']
+        self.runtime_version = snapshot.get('runtime_version')
+        self.metadata_hex = snapshot['metadata']
+        self.runtime_config = RuntimeConfigurationObject(ss58_format=42)
+        self.runtime_config.update_type_registry(load_type_registry_preset('legacy'))
+        self.metadata = self.runtime_config.create_scale_object(
+            'MetadataVersioned', data=ScaleBytes(snapshot['metadata']),
+        )
+        self.metadata.decode()
+        self.runtime_config.add_portable_registry(self.metadata)
+
+    def decode_extrinsic(self, data: str) -> dict:
+        extrinsic = self.runtime_config.create_scale_object(
+            'Extrinsic', data=ScaleBytes(data), metadata=self.metadata,
+        )
+        extrinsic.decode()
+        return extrinsic.value
+
+    def decode(self, call_data: str) -> dict:
+        call = self.runtime_config.create_scale_object(
+            'Call', data=ScaleBytes(call_data), metadata=self.metadata,
+        )
+        call.decode(check_remaining=True)
+        return call.value
+
+
+def format_call(call: dict, indent: int = 0) -> list[str]:
+    """Render a decoded call and its nested calls as indented lines."""
+    pad = '  ' * indent
+    lines = [f"{pad}{call['call_module']}.{call['call_function']}"]
+    for arg in call['call_args']:
+        name, value = arg['name'], arg['value']
+        if isinstance(value, dict) and 'call_module' in value:
+            lines.append(f"{pad}  {name}:")
+            lines.extend(format_call(value, indent + 2))
+        elif isinstance(value, list) and value and isinstance(value[0], dict) and 'call_module' in value[0]:
+            lines.append(f"{pad}  {name}: {len(value)} calls")
+            for i, item in enumerate(value):
+                lines.append(f"{pad}    [{i}]")
+                lines.extend(format_call(item, indent + 3))
+        elif name in BALANCE_ARGS and isinstance(value, int):
+            lines.append(f"{pad}  {name}: {value} ({value / 1e9:.9f} TAO)")
+        else:
+            lines.append(f"{pad}  {name}: {value}")
+    return lines
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create and configure the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Decode and verify multisig call data offline",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+
+    subparsers.add_parser('fetch', help='Snapshot the runtime metadata (needs a connection)')
+
+    verify_parser = subparsers.add_parser('verify', help='Decode call data against the snapshot')
+    verify_parser.add_argument('--data', type=str, nargs='+', required=True, help='Hex call data')
+    verify_parser.add_argument('--hash', type=str, nargs='*', default=[],
+                               help='Expected call hash(es), in the same order as --data')
+    verify_parser.add_argument('--metadata', type=str, help='Snapshot file (default: latest for NETWORK)')
+    return parser
+
+
+def main():
+    """Main entry point."""
+    load_dotenv()
+    parser = create_parser()
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+
+    network = os.getenv('NETWORK', 'finney')
+    if args.command == 'fetch':
+        try:
+            print(f"Saved metadata to {fetch_metadata(network)}")
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
+    path = args.metadata or latest_metadata_path(network)
+    if path is None:
+        print(f"Error: No metadata snapshot for {network}; run `verify_call.py fetch` first")
+        sys.exit(1)
+    if args.hash and len(args.hash) != len(args.data):
+        print("Error: --hash must be given once per --data")
+        sys.exit(1)
+
+    decoder = CallDecoder(path)
+    print(f"Runtime {decoder.network} spec {decoder.spec_version}")
+    ok = True
+    for i, call_data in enumerate(args.data):
+        print("")
+        computed = call_hash_of(call_data)
+        print(f"Call hash: {computed}")
+        if args.hash:
+            if '0x' + args.hash[i].lower().removeprefix('0x') != computed:
+                print(f"Error: Expected call hash {args.hash[i]} does not match")
+                ok = False
+            else:
+                print("Call hash matches")
+        try:
+            print('\n'.join(format_call(decoder.decode(call_data))))
+        except Exception as e:
+            print(f"Error: Could not decode call data: {e}")
+            ok = False
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()